@@ -1,13 +1,17 @@
+import json
 import logging
 import os
-import re
-import subprocess
-from functools import lru_cache
 from typing import Any, Dict, Optional
 # Add this at the top with other imports
 from services.resolver import AudioResolver
+from services import ytdlp_pool
+from services.prefetch import prefetch_set
+from services.stream_cache import get_cache as get_stream_cache
+from services.audio_stream import serve_audio, audio_mimetype
+from services import peaks
+from services import snippets
+from services import renditions
 
-import yt_dlp  # WICHTIG: pip install yt-dlp
 from flask import (
     Blueprint,
     Flask,
@@ -16,8 +20,8 @@ from flask import (
     render_template,
     request,
     send_from_directory,
-    send_file,
     session,
+    stream_with_context,
     Response
 )
 from pydantic import BaseModel, EmailStr, Field, ValidationError
@@ -59,6 +63,14 @@ from services.settings_store import SettingsStore
 # Initialize Database
 database.init_db()
 
+# Job worker runs inside the web process unless a separate `python job_manager.py` owns it
+if os.getenv("TRACKLISTIFY_JOB_WORKER", "embedded") == "embedded":
+    job_manager.start_worker()
+    # The watcher imports new tracklist output; it lives wherever the job worker does
+    if os.getenv("TRACKLISTIFY_IMPORT_WATCH", "1") == "1":
+        from services.import_watcher import start_watcher
+        start_watcher()
+
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-key")
 app.logger.setLevel(logging.INFO)
@@ -90,10 +102,6 @@ def inject_user():
     """Makes the 'current_user' variable available in all Jinja templates."""
     return dict(current_user=get_current_user())
 
-@lru_cache(maxsize=500)
-def cached_resolve_audio(query):
-    return resolve_audio_stream_url(query)
-
 def parse_body(model_cls):
     """Parses JSON body against a Pydantic model."""
     data = request.get_json(silent=True)
@@ -378,7 +386,10 @@ def list_sets():
 
 @app.route("/api/sets/<int:sid>/tracks")
 def list_tracks(sid):
-    return jsonify(database.get_tracks_by_set_with_relations(sid))
+    tracks = database.get_tracks_by_set_with_relations(sid)
+    # Resolve stream URLs in the background so play clicks hit stream_cache
+    prefetch_set(tracks)
+    return jsonify(tracks)
 
 @app.route("/api/sets/<int:sid>/rename", methods=["POST"])
 def rename_set(sid):
@@ -407,6 +418,7 @@ def delete_set(sid):
     cur = conn.cursor()
     cur.execute("SELECT source_file, audio_file FROM sets WHERE id = ?", (sid,))
     row = cur.fetchone()
+    track_ids = [r[0] for r in cur.execute("SELECT id FROM tracks WHERE set_id = ?", (sid,)).fetchall()]
     conn.close()
 
     # 2. Delete from Database
@@ -422,13 +434,25 @@ def delete_set(sid):
             except Exception as e:
                 print(f"[Delete] Error removing source: {e}")
 
-        # Delete the .mp3 audio file
+        # Delete the .mp3 audio file (and its waveform peaks)
         if row['audio_file'] and os.path.exists(row['audio_file']):
             try:
                 os.remove(row['audio_file'])
                 print(f"[Delete] Removed audio: {row['audio_file']}")
             except Exception as e:
                 print(f"[Delete] Error removing audio: {e}")
+        if row['audio_file'] and os.path.exists(peaks.peaks_path(row['audio_file'])):
+            try:
+                os.remove(peaks.peaks_path(row['audio_file']))
+            except Exception as e:
+                print(f"[Delete] Error removing peaks: {e}")
+        if row['audio_file']:
+            try:
+                renditions.remove_rendition(row['audio_file'])
+            except Exception as e:
+                print(f"[Delete] Error removing rendition: {e}")
+        if deleted:
+            snippets.remove_snippets(track_ids)
 
     return jsonify({"ok": bool(deleted), "deleted": deleted})
 
@@ -523,54 +547,36 @@ def get_metadata_import():
     if not url:
         return jsonify({"ok": False, "error": "URL required"}), 400
 
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': True,
-        'skip_download': True,
-        "extractor_args": {
-            "youtube": {
-                "player_client": ["android"],
-            }
-        },
-        "http_headers": {
-            "User-Agent": (
-                "Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/114.0.0.0 Mobile Safari/537.36"
-            )
-        },
-    }
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(url, download=False)
-        except Exception as e:
-             return jsonify({"ok": False, "error": str(e)}), 400
-
-        title = info.get('title', '')
-        uploader = info.get('uploader', '')
-
-        artist_guess = uploader
-        name_guess = title
-        event_guess = ""
-
-        if " - " in title:
-            parts = title.split(" - ", 1)
-            if len(parts) == 2:
-                if uploader and uploader.lower() in ["hör berlin", "boiler room", "mixmag", "cercle"]:
-                    event_guess = uploader
-                    artist_guess = parts[0]
-                    name_guess = parts[1]
-                else:
-                    artist_guess = parts[0]
-                    name_guess = parts[1]
-
-        return jsonify({
-            "ok": True,
-            "title": name_guess.strip(),
-            "artist": artist_guess.strip(),
-            "event": event_guess.strip()
-        })
+    # Warm, shared yt-dlp instance (android client, see services/ytdlp_pool.py)
+    try:
+        info = ytdlp_pool.get_pool().extract(url, "metadata")
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+
+    title = info.get('title', '')
+    uploader = info.get('uploader', '')
+
+    artist_guess = uploader
+    name_guess = title
+    event_guess = ""
+
+    if " - " in title:
+        parts = title.split(" - ", 1)
+        if len(parts) == 2:
+            if uploader and uploader.lower() in ["hör berlin", "boiler room", "mixmag", "cercle"]:
+                event_guess = uploader
+                artist_guess = parts[0]
+                name_guess = parts[1]
+            else:
+                artist_guess = parts[0]
+                name_guess = parts[1]
+
+    return jsonify({
+        "ok": True,
+        "title": name_guess.strip(),
+        "artist": artist_guess.strip(),
+        "event": event_guess.strip()
+    })
 
 
 # --- API: Queue & Jobs ---
@@ -589,11 +595,13 @@ def add_job():
 
     submission_type = request.form.get("type")
     submission_value = request.form.get("value")
+    # Rescans re-analyse on purpose and bypass the duplicate check.
+    force = request.form.get("force") in ("1", "true")
 
     if submission_type == "url":
         if not submission_value:
             raise BadRequest("URL missing")
-        job_manager.add_job("url", submission_value, metadata)
+        job_manager.add_job("url", submission_value, metadata, force=force)
 
     elif submission_type == "file":
         if 'file' not in request.files:
@@ -606,7 +614,7 @@ def add_job():
         os.makedirs(UPLOAD_DIR, exist_ok=True)
         save_path = safe_path(UPLOAD_DIR, filename)
         file.save(save_path)
-        job_manager.add_job("file", save_path, metadata)
+        job_manager.add_job("file", save_path, metadata, force=force)
     
     else:
         raise BadRequest("Invalid job type")
@@ -632,6 +640,56 @@ def import_url_job():
 def queue_status():
     return jsonify(job_manager.get_status())
 
+QUEUE_EVENTS_KEEPALIVE = 15
+
+def _sse_message(event, data, seq=None):
+    lines = [] if seq is None else [f"id: {seq}"]
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.route("/api/queue/events")
+def queue_events():
+    """
+    Server-Sent Events for the job queue (phase, progress, log, queued, started, finished).
+    Event ids are sequence numbers: a reconnect with Last-Event-ID replays what was missed,
+    otherwise the stream starts with a full `snapshot`. /api/queue/status stays the polling fallback.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_seq = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_seq = None
+    job_manager.ensure_remote_watch()
+    bus = job_manager.events
+
+    def generate():
+        seq = last_seq
+        events = bus.since(seq) if seq is not None else None
+        while True:
+            if events is None:
+                # New client or gap in the buffer: resync with the full state.
+                seq = bus.seq
+                yield _sse_message("snapshot", job_manager.get_status(), seq)
+            elif not events:
+                yield ": keepalive\n\n"
+            for event_seq, event, data in events or ():
+                seq = event_seq
+                yield _sse_message(event, data, event_seq)
+            events = bus.wait(seq, QUEUE_EVENTS_KEEPALIVE)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/api/queue/metrics")
+def queue_metrics():
+    """Per-job phase timings and resource counters of recent jobs, with p50/p95 per phase."""
+    limit = request.args.get("limit", 100, type=int)
+    return jsonify(job_manager.get_metrics(limit))
+
 @app.route("/api/queue/stop", methods=["POST"])
 def queue_stop():
     stopped = job_manager.stop_active()
@@ -644,62 +702,54 @@ def queue_stop():
 def dashboard_stats_api():
     return jsonify(database.get_dashboard_stats())
 
+@app.route("/api/dashboard/query-cache")
+def query_cache_stats_api():
+    """Hit-rate instrumentation for the database result cache."""
+    return jsonify(database.get_query_cache_stats())
+
 # --- AUDIO STREAMING WITH SEEKING ---
 @app.route("/api/stream/<int:track_id>")
 def stream_track_audio(track_id):
-    """Stream audio with support for Range headers (Seeking)."""
-    conn = database.get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT s.audio_file 
-        FROM tracks t 
-        JOIN sets s ON t.set_id = s.id 
-        WHERE t.id = ?
-    """, (track_id,))
-    row = cur.fetchone()
-    conn.close()
-
-    if not row or not row['audio_file']:
+    """Stream audio with support for Range headers (Seeking), ETag and If-Range."""
+    path = database.get_track_audio_file(track_id)
+    if not path:
         return jsonify({"error": "Audio file record not found"}), 404
 
-    path = row['audio_file']
     if not os.path.exists(path):
         return jsonify({"error": "File missing from disk. Please re-import set."}), 404
 
-    # Handle Range Headers for seeking
-    range_header = request.headers.get('Range', None)
-    if not range_header:
-        return send_file(path)
+    # ?quality=low|original, else Accept negotiation (Opus rendition vs. original file)
+    chosen, negotiated = renditions.choose_stream_file(
+        path, request.args.get("quality"), request.accept_mimetypes, audio_mimetype(path)
+    )
+    rv = serve_audio(chosen)
+    if negotiated:
+        rv.vary.add("Accept")
+    return rv
+
+@app.route("/api/tracks/<int:tid>/snippet")
+def track_snippet(tid):
+    """Short preview of a track; cut on first request, then served from SNIPPET_DIR."""
+    try:
+        name = snippets.ensure_snippet(tid)
+    except snippets.SnippetError as e:
+        return jsonify({"error": str(e)}), 404
+    return redirect(f"/snippets/{name}")
 
+@app.route("/api/sets/<int:sid>/peaks")
+def set_peaks(sid):
+    """
+    Waveform peaks of the set audio (binary, see services/peaks.py).
+    Written during import; sets imported before that get them on first request.
+    """
+    s = database.get_set(sid)
+    if not s or not s.get('audio_file') or not os.path.exists(s['audio_file']):
+        return jsonify({"error": "Audio file not found"}), 404
     try:
-        size = os.path.getsize(path)
-        byte1, byte2 = 0, None
-        
-        m = re.search(r'(\d+)-(\d*)', range_header)
-        g = m.groups()
-        
-        if g[0]: byte1 = int(g[0])
-        if g[1]: byte2 = int(g[1])
-
-        length = size - byte1
-        if byte2 is not None:
-            length = byte2 + 1 - byte1
-
-        with open(path, 'rb') as f:
-            f.seek(byte1)
-            data = f.read(length)
-
-        rv = Response(
-            data, 
-            206, 
-            mimetype='audio/mpeg', 
-            direct_passthrough=True
-        )
-        rv.headers.add('Content-Range', f'bytes {byte1}-{byte1 + length - 1}/{size}')
-        rv.headers.add('Accept-Ranges', 'bytes')
-        return rv
-    except Exception as e:
-        return send_file(path)
+        path = peaks.generate_peaks(s['audio_file'])
+    except peaks.PeaksError as e:
+        return jsonify({"error": str(e)}), 422
+    return serve_audio(path, mimetype="application/octet-stream")
 
 # REPLACE THE OLD stream_original_track FUNCTION WITH THIS:
 @app.route("/api/stream/original/<int:track_id>")
@@ -731,7 +781,7 @@ def rescan_run():
 def resolve_audio():
     data = parse_body(ResolveAudioRequest)
     query = data.query
-    url = cached_resolve_audio(query)
+    url = get_stream_cache().get_query(query, lambda: resolve_audio_stream_url(query))
     if url:
         return jsonify({"ok": True, "url": url})
     return jsonify({"ok": False}), 404
@@ -768,7 +818,10 @@ def run_import():
 @app.route("/snippets/<path:filename>")
 def serve_snippets(filename):
     log_static_request("Snippets", SNIPPET_DIR, filename)
-    return send_from_directory(SNIPPET_DIR, filename)
+    # Snippet names contain track id and start time, so a file never changes.
+    rv = send_from_directory(SNIPPET_DIR, filename, max_age=snippets.SNIPPET_MAX_AGE)
+    rv.cache_control.immutable = True
+    return rv
 
 @app.route("/static/<path:filename>")
 def serve_static(filename):
@@ -3,10 +3,10 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Datenbank
-DB_PATH = os.path.join(BASE_DIR, "tracklistify.db")
+DB_PATH = os.getenv("TRACKLISTIFY_DB_PATH", os.path.join(BASE_DIR, "tracklistify.db"))
 
 # Speicherorte für Uploads und Downloads (Hybrid-Ansatz)
-STORAGE_DIR = os.path.join(BASE_DIR, "storage")
+STORAGE_DIR = os.getenv("TRACKLISTIFY_STORAGE_DIR", os.path.join(BASE_DIR, "storage"))
 UPLOAD_DIR = os.path.join(STORAGE_DIR, "uploads")
 DOWNLOAD_DIR = os.path.join(STORAGE_DIR, "downloads")
 
@@ -1,13 +1,22 @@
 import threading
+import queue
 import time
+import datetime
 import os
+import socket
+import uuid
 import asyncio
 import yt_dlp
 import re
+import hashlib
+import urllib.parse
 import database
+from collections import deque
+from contextlib import contextmanager
 import shutil
 from pytube import YouTube
 from config import UPLOAD_DIR, BASE_DIR
+from services import peaks, renditions, snippets
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -21,81 +30,665 @@ if not os.path.exists(FFMPEG_PATH):
 print(f"[JobManager] FFmpeg Path: {FFMPEG_PATH}")
 
 try:
-    from services.analyzer import scan_dj_set
+    from services.analyzer import scan_dj_set, ScanCancelled
 except ImportError:
     print("[JobManager] Analyzer module missing.")
     scan_dj_set = None
+    class ScanCancelled(Exception):
+        pass
+
+class JobCancelled(Exception):
+    pass
+
+class DuplicateSource(Exception):
+    """The job's audio was already imported (kind "set") or is handled by an older job (kind "job")."""
+
+    def __init__(self, kind, existing_id):
+        super().__init__(f"Duplikat von {'Set' if kind == 'set' else 'Job'} #{existing_id}")
+        self.kind = kind
+        self.existing_id = existing_id
+
+# Query parameters that never change which media a URL points to.
+TRACKING_PARAMS = {"si", "feature", "pp", "fbclid", "gclid", "igshid", "ref", "ref_src", "share"}
+_YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+def source_key(url):
+    """
+    Dedupe key for a submitted URL. YouTube links become 'youtube:<video id>',
+    the same form as yt-dlp's extractor_key:id; everything else is the URL
+    without scheme, www./m. prefix, fragment, trailing slash and tracking params.
+    """
+    parsed = urllib.parse.urlsplit(url.strip())
+    host = (parsed.hostname or "").lower()
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+
+    if host in ("youtube.com", "youtu.be", "youtube-nocookie.com"):
+        parts = [p for p in parsed.path.split("/") if p]
+        video_id = None
+        if host == "youtu.be" and parts:
+            video_id = parts[0]
+        elif parsed.path == "/watch":
+            video_id = urllib.parse.parse_qs(parsed.query).get("v", [None])[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "live", "embed", "v"):
+            video_id = parts[1]
+        if video_id and _YOUTUBE_ID_RE.match(video_id):
+            return f"youtube:{video_id}"
+
+    query = sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    key = host + (parsed.path.rstrip("/") or "/")
+    return key + ("?" + urllib.parse.urlencode(query) if query else "")
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+JOB_LEASE_SECONDS = 60
+JOB_HEARTBEAT_INTERVAL = 10
+JOB_RECOVERY_INTERVAL = 60
+# Jobs enqueued in this process wake the workers immediately; this fallback
+# only bounds the delay for jobs enqueued by another process.
+JOB_IDLE_POLL_SECONDS = float(os.getenv("TRACKLISTIFY_JOB_POLL_SECONDS", "15"))
+
+# Pipeline sizing: downloads are I/O bound and run in parallel, analysis is
+# bounded by provider quota and CPU. The backlog between the two stages is
+# bounded, so downloaders stop claiming new jobs while analysis is saturated.
+DOWNLOAD_WORKERS = int(os.getenv("TRACKLISTIFY_DOWNLOAD_WORKERS", "3"))
+ANALYSIS_WORKERS = int(os.getenv("TRACKLISTIFY_ANALYSIS_WORKERS", "1"))
+ANALYSIS_BACKLOG = int(os.getenv("TRACKLISTIFY_ANALYSIS_BACKLOG", "2"))
+
+# Job event stream (/api/queue/events): how many events a reconnecting client
+# can catch up on, and how often the web process reads job state written by a
+# worker in another process (TRACKLISTIFY_JOB_WORKER=external).
+JOB_EVENT_BUFFER = 1000
+JOB_REMOTE_WATCH_INTERVAL = 2
+
+class JobEventBus:
+    """
+    Sequenced in-memory log of job events. Every event gets an increasing
+    sequence number, so stream clients can resume after a reconnect.
+    """
+
+    def __init__(self, maxlen=JOB_EVENT_BUFFER):
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.seq = 0
+
+    def publish(self, event, data):
+        with self._cond:
+            self.seq += 1
+            self._events.append((self.seq, event, data))
+            self._cond.notify_all()
+            return self.seq
+
+    def since(self, seq):
+        """Events after `seq`, or None if the client missed events that left the buffer."""
+        with self._cond:
+            return self._since(seq)
+
+    def wait(self, seq, timeout):
+        """Like since(), but blocks up to `timeout` seconds while nothing new was published."""
+        with self._cond:
+            if seq == self.seq:
+                self._cond.wait(timeout)
+            return self._since(seq)
+
+    def _since(self, seq):
+        if seq > self.seq or seq < 0:
+            return None  # sequence from before a restart
+        if seq < self.seq and seq < self._events[0][0] - 1:
+            return None
+        return [e for e in self._events if e[0] > seq]
+
+def _started_event(job):
+    return {"job_id": job["id"], "label": job["label"], "phase": job["phase"],
+            "progress": job["progress"], "log": job["log"]}
+
+class TrackedJob(dict):
+    """Job dict that reports changes of its status/phase/progress/log to a callback."""
+
+    EVENT_FIELDS = ("status", "phase", "progress", "log")
+
+    def __init__(self, data, on_change):
+        super().__init__(data)
+        self._on_change = on_change
+
+    def __setitem__(self, key, value):
+        changed = key in self.EVENT_FIELDS and self.get(key) != value
+        super().__setitem__(key, value)
+        if changed:
+            self._on_change(self, key)
+
+class JobMetrics:
+    """
+    Instrumentation for one job: wall time per phase (fed by TrackedJob phase
+    changes), counters (bytes_downloaded, segments, provider_errors, cache_hits)
+    and timings with count/total/max (provider, ffmpeg, hash, db_write, peaks).
+    Thread-safe; snapshot() is what gets stored in jobs.metrics.
+    """
+
+    COUNTERS = ("bytes_downloaded", "segments", "provider_errors", "cache_hits")
 
-class JobManager:
     def __init__(self):
-        self.queue = []
-        self.history = []
-        self.active_job = None
-        self.stop_flag = False
-        self.worker_thread = threading.Thread(target=self._worker, daemon=True)
-        self.worker_thread.start()
-
-    def add_job(self, type, value, metadata=None):
-        job = {
-            "id": int(time.time() * 1000),
-            "type": type,   
-            "value": value,
-            "metadata": metadata or {},
-            "status": "pending",
-            "phase": "queued",
-            "progress": 0,
-            "label": metadata.get("title") or "Neues Set",
-            "log": "Warte auf Start..."
-        }
-        self.queue.append(job)
-        print(f"[JobManager] Added job: {job['label']}")
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.finished = None
+        self.phase = None
+        self._phase_started = None
+        self.phases = {}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.timers = {}
+
+    def enter_phase(self, phase):
+        with self._lock:
+            self._close_phase(time.monotonic())
+            self.phase = phase
+            self._phase_started = time.monotonic()
+
+    def _close_phase(self, now):
+        if self.phase is not None:
+            self.phases[self.phase] = self.phases.get(self.phase, 0.0) + now - self._phase_started
+            self.phase = None
+
+    def add(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def observe(self, timer, seconds):
+        with self._lock:
+            t = self.timers.setdefault(timer, {"count": 0, "total": 0.0, "max": 0.0})
+            t["count"] += 1
+            t["total"] += seconds
+            t["max"] = max(t["max"], seconds)
+
+    @contextmanager
+    def timed(self, timer):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(timer, time.perf_counter() - started)
+
+    def finish(self):
+        with self._lock:
+            now = time.monotonic()
+            self._close_phase(now)
+            self.finished = now
+
+    def snapshot(self):
+        with self._lock:
+            now = self.finished or time.monotonic()
+            phases = dict(self.phases)
+            if self.phase is not None:
+                phases[self.phase] = phases.get(self.phase, 0.0) + now - self._phase_started
+            return {
+                "wall": round(now - self.started, 3),
+                "phases": {k: round(v, 3) for k, v in phases.items()},
+                "counters": dict(self.counters),
+                "timers": {
+                    name: {"count": t["count"], "total": round(t["total"], 3), "max": round(t["max"], 3),
+                           "avg": round(t["total"] / t["count"], 3) if t["count"] else 0.0}
+                    for name, t in self.timers.items()
+                },
+            }
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def summarize_metrics(snapshots):
+    """
+    Aggregates JobMetrics snapshots: per phase / timer count, mean, p50, p95 and
+    max, counter totals, and each phase's share of all recorded wall time.
+    """
+    phases, timers, counters = {}, {}, {}
+    for m in snapshots:
+        for name, seconds in m.get("phases", {}).items():
+            phases.setdefault(name, []).append(seconds)
+        for name, t in m.get("timers", {}).items():
+            entry = timers.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += t["count"]
+            entry["total"] += t["total"]
+            entry["max"] = max(entry["max"], t["max"])
+        for name, value in m.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+
+    wall_total = sum(sum(v) for v in phases.values()) or 1.0
+    return {
+        "jobs": len(snapshots),
+        "phases": {
+            name: {
+                "count": len(values),
+                "mean": round(sum(values) / len(values), 3),
+                "p50": round(_percentile(values, 50), 3),
+                "p95": round(_percentile(values, 95), 3),
+                "max": round(max(values), 3),
+                "share": round(sum(values) / wall_total, 3),
+            }
+            for name, values in phases.items()
+        },
+        "timers": {
+            name: dict(t, total=round(t["total"], 3), max=round(t["max"], 3),
+                       avg=round(t["total"] / t["count"], 3) if t["count"] else 0.0)
+            for name, t in timers.items()
+        },
+        "counters": counters,
+    }
+
+# Upper bound for get_metrics(); the jobs table keeps database.JOB_METRICS_KEEP.
+JOB_METRICS_HISTORY = 500
+
+class JobManager:
+    """
+    Front end for the durable job queue in the `jobs` table. Any process may
+    enqueue; jobs are executed by whichever worker claims them – the embedded
+    pipeline (start_worker) or a separate `python job_manager.py` process.
+
+    Each claimed job flows download pool -> bounded queue -> analysis pool;
+    the save step goes through the database writer.
+    """
+
+    def __init__(self, download_workers=DOWNLOAD_WORKERS, analysis_workers=ANALYSIS_WORKERS, analysis_backlog=ANALYSIS_BACKLOG):
+        self.download_workers = max(1, download_workers)
+        self.analysis_workers = max(1, analysis_workers)
+        self.analysis_queue = queue.Queue(maxsize=max(1, analysis_backlog))
+        self.active_jobs = {}
+        self.cancel_events = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.threads = []
+        self._lock = threading.Lock()
+        self._shutdown = threading.Event()
+        self._work_cond = threading.Condition()
+        self._work_generation = 0
+        self._last_recovery = 0
+        self.events = JobEventBus()
+        self._published_progress = {}
+        self._remote_watch = None
+        self.job_metrics = {}
+
+    @property
+    def active_job(self):
+        with self._lock:
+            return min(self.active_jobs.values(), key=lambda j: j["id"], default=None)
+
+    def start_worker(self):
+        """Starts this process' pipeline threads (idempotent)."""
+        with self._lock:
+            if self.threads:
+                return
+            for i in range(self.download_workers):
+                self.threads.append(threading.Thread(target=self._download_worker, name=f"job-download-{i}", daemon=True))
+            for i in range(self.analysis_workers):
+                self.threads.append(threading.Thread(target=self._analysis_worker, name=f"job-analysis-{i}", daemon=True))
+            self.threads.append(threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True))
+        for t in self.threads:
+            t.start()
+        print(f"[JobManager] Worker {self.worker_id} started ({self.download_workers} download / {self.analysis_workers} analysis)")
+
+    def stop_worker(self, timeout=5):
+        """Stops the pipeline threads after their current job step."""
+        self._shutdown.set()
+        with self._work_cond:
+            self._work_cond.notify_all()
+        for _ in range(self.analysis_workers):
+            try:
+                self.analysis_queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for t in self.threads:
+            t.join(timeout)
+        with self._lock:
+            self.threads = []
+        # Drop leftover sentinels so a restarted pipeline starts clean; jobs stay queued.
+        pending = []
+        while True:
+            try:
+                pending.append(self.analysis_queue.get_nowait())
+            except queue.Empty:
+                break
+        for item in pending:
+            if item is not None:
+                self.analysis_queue.put_nowait(item)
+        self._shutdown.clear()
+
+    def run_forever(self):
+        self.start_worker()
+        while True:
+            time.sleep(3600)
+
+    def add_job(self, type, value, metadata=None, force=False):
+        """
+        Enqueues a job unless the same source is already queued/running (returns
+        that job's id) or imported (records a completed job pointing at the set).
+        force=True skips the URL and content-hash dedupe, e.g. for a rescan.
+        """
+        metadata = metadata or {}
+        label = metadata.get("title") or "Neues Set"
+        if force:
+            metadata["force_reimport"] = True
+        key = source_key(value) if type == "url" and not force else None
+        job_id, duplicate = database.enqueue_unique_job(type, value, metadata, label, key)
+        if duplicate == "job":
+            print(f"[JobManager] {label} is already queued as job {job_id}")
+            return job_id
+        if duplicate == "set":
+            print(f"[JobManager] {label} was already imported, recorded as job {job_id}")
+            self.events.publish("finished", {"job_id": job_id, "label": label, "status": "completed",
+                                             "log": "Bereits importiert.", "set_id": None, "duplicate": True})
+            return job_id
+        print(f"[JobManager] Added job {job_id}: {label}")
+        self.events.publish("queued", {"job_id": job_id, "type": type, "label": label})
+        self._notify_work()
+        return job_id
+
+    def _notify_work(self):
+        with self._work_cond:
+            self._work_generation += 1
+            self._work_cond.notify()
+
+    def _wait_for_work(self, generation):
+        """Sleeps until add_job() signals new work, unless some arrived since `generation` was read."""
+        with self._work_cond:
+            if generation == self._work_generation and not self._shutdown.is_set():
+                self._work_cond.wait(JOB_IDLE_POLL_SECONDS)
 
     def stop_active(self):
-        if self.active_job:
-            self.stop_flag = True
-            return True
-        return False
+        with self._lock:
+            for job_id in self.active_jobs:
+                self.cancel_events[job_id].set()
+            local = bool(self.active_jobs)
+        # Reaches workers in other processes through the next heartbeat.
+        return database.request_job_cancel() > 0 or local
 
     def get_status(self):
+        running = {j["id"]: j for j in database.get_jobs(("running",))}
+        # Local in-memory jobs are fresher than their last heartbeat.
+        with self._lock:
+            running.update(self.active_jobs)
+        active_jobs = [running[k] for k in sorted(running)]
+        history = database.get_jobs(("completed", "error", "cancelled"), limit=5, newest_first=True)
         return {
-            "active": self.active_job,
-            "queue": self.queue,
-            "history": self.history[-5:] 
+            "active": active_jobs[0] if active_jobs else None,
+            "active_jobs": active_jobs,
+            "queue": database.get_jobs(("pending",)),
+            "history": history[::-1]
         }
 
-    def _worker(self):
+    def get_metrics(self, limit=100):
+        """Per-job metrics (running jobs of this process first, then finished ones) plus a summary."""
+        limit = max(1, min(int(limit), JOB_METRICS_HISTORY))
+        with self._lock:
+            running = [
+                {"id": job_id, "label": job.get("label"), "status": job.get("status"), "phase": job.get("phase"),
+                 "metrics": self.job_metrics[job_id].snapshot()}
+                for job_id, job in sorted(self.active_jobs.items()) if job_id in self.job_metrics
+            ]
+        finished = database.get_job_metrics(limit)
+        return {
+            "running": running,
+            "jobs": finished,
+            "summary": summarize_metrics([j["metrics"] for j in finished]),
+        }
+
+    def _metrics(self, job):
+        with self._lock:
+            return self.job_metrics.setdefault(job["id"], JobMetrics())
+
+    def _job_changed(self, job, field):
+        """TrackedJob callback: turns field updates into phase / progress / log events."""
+        job_id = job["id"]
+        if field == "phase" and job_id in self.job_metrics:
+            self.job_metrics[job_id].enter_phase(job.get("phase"))
+        if field == "log":
+            self.events.publish("log", {"job_id": job_id, "log": job["log"]})
+        elif field == "progress":
+            progress = job["progress"] or 0
+            last = self._published_progress.get(job_id, 0)
+            # yt-dlp reports every chunk; whole-percent deltas are plenty for a progress bar.
+            if abs(progress - last) >= 1 or progress >= 100:
+                self._published_progress[job_id] = progress
+                self.events.publish("progress", {"job_id": job_id, "progress": progress, "delta": progress - last})
+        else:
+            self.events.publish("phase", {"job_id": job_id, "status": job.get("status"), "phase": job.get("phase")})
+
+    def ensure_remote_watch(self):
+        """
+        Without local pipeline threads the jobs run in another process; mirror
+        their persisted state into the event bus (one shared reader for all clients).
+        """
+        with self._lock:
+            if self.threads or self._remote_watch:
+                return
+            self._remote_watch = threading.Thread(target=self._remote_watch_loop, name="job-event-watch", daemon=True)
+        self._remote_watch.start()
+
+    def _remote_watch_loop(self):
+        known = {}
         while True:
-            if self.queue and not self.active_job:
-                self.active_job = self.queue.pop(0)
-                self.stop_flag = False
+            try:
+                status = self.get_status()
+            except Exception as e:
+                print(f"[JobManager] Event Watch Error: {e}")
+                status = None
+            if status is not None and not self.threads:
+                self._publish_remote_changes(known, status)
+            time.sleep(JOB_REMOTE_WATCH_INTERVAL)
+
+    def _publish_remote_changes(self, known, status):
+        """Publishes what changed between two get_status() polls, for jobs run by other processes."""
+        current = {j["id"]: j for j in status["active_jobs"] + status["queue"]}
+        for job_id, row in current.items():
+            job = known.get(job_id)
+            if job is None:
+                # First sight: announce the job in the state it is actually in.
+                known[job_id] = TrackedJob(row, self._job_changed)
+                if row["status"] == "running":
+                    self.events.publish("started", _started_event(row))
+                else:
+                    self.events.publish("queued", {"job_id": job_id, "type": row["type"], "label": row["label"]})
+                continue
+            if job["status"] != "running" and row["status"] == "running":
+                self.events.publish("started", _started_event(row))
+            for field in TrackedJob.EVENT_FIELDS:
+                job[field] = row[field]
+        history = {j["id"]: j for j in status["history"]}
+        for job_id in set(known) - set(current):
+            job = known.pop(job_id)
+            self._published_progress.pop(job_id, None)
+            done = history.get(job_id)
+            if done is None:
+                self.events.publish("finished", {"job_id": job_id, "label": job["label"]})
+            else:
+                self.events.publish("finished", {"job_id": job_id, "label": done["label"], "status": done["status"],
+                                                 "log": done["log"], "set_id": (done["result"] or {}).get("set_id")})
+
+    def _maybe_recover_stale_jobs(self):
+        with self._lock:
+            if time.time() - self._last_recovery < JOB_RECOVERY_INTERVAL:
+                return
+            self._last_recovery = time.time()
+        requeued, failed = database.recover_stale_jobs()
+        if requeued or failed:
+            print(f"[JobManager] Recovered stale jobs: {requeued} requeued, {failed} failed")
+
+    def _download_worker(self):
+        while not self._shutdown.is_set():
+            generation = self._work_generation
+            try:
+                self._maybe_recover_stale_jobs()
+                job = database.claim_job(self.worker_id, JOB_LEASE_SECONDS)
+            except Exception as e:
+                print(f"[JobManager] Queue Error: {e}")
+                job = None
+            if not job:
+                self._wait_for_work(generation)
+                continue
+
+            job = TrackedJob(job, self._job_changed)
+            self.events.publish("started", _started_event(job))
+            metrics = JobMetrics()
+            metrics.enter_phase(job["phase"])
+            with self._lock:
+                self.active_jobs[job["id"]] = job
+                self.cancel_events[job["id"]] = threading.Event()
+                self.job_metrics[job["id"]] = metrics
+            try:
+                audio_path = self._download_stage(job)
+                self._check_content_duplicate(job, audio_path)
+            except Exception as e:
+                self._finish_job(job, e)
+                continue
+
+            job["phase"] = "waiting"
+            job["log"] = "Warte auf Analyse..."
+            # Blocks while the analysis backlog is full (backpressure).
+            while True:
                 try:
-                    # New Event Loop for Thread
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    self._process_job(self.active_job)
-                    loop.close()
-
-                    self.active_job["status"] = "completed"
-                    self.active_job["phase"] = "done"
-                    self.active_job["progress"] = 100
-                    self.active_job["log"] = "Fertig."
+                    self.analysis_queue.put((job, audio_path), timeout=1)
+                    break
+                except queue.Full:
+                    if self._shutdown.is_set():
+                        return  # lease expires and another worker picks the job up again
+
+    def _analysis_worker(self):
+        # One event loop per analysis thread, reused across jobs.
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while not self._shutdown.is_set():
+            item = self.analysis_queue.get()
+            if item is None:
+                break  # stop_worker() sentinel
+            job, audio_path = item
+            try:
+                if self._cancel_event(job).is_set():
+                    raise JobCancelled("Abgebrochen.")
+                self._analysis_stage(job, audio_path)
+                self._finish_job(job)
+            except Exception as e:
+                self._finish_job(job, e)
+
+    def _check_source_duplicate(self, job, info):
+        """Called with yt-dlp's metadata before the actual download starts."""
+        if job["metadata"].get("force_reimport") or not info.get("id") or not info.get("extractor_key"):
+            return
+        key = f"{info['extractor_key'].lower()}:{info['id']}"
+        if key != job.get("source_key"):
+            job["source_key"] = key
+            with self._metrics(job).timed("db_write"):
+                database.set_job_source_key(job["id"], key)
+        found = database.find_source_duplicate(key, before_job_id=job["id"])
+        if found:
+            raise DuplicateSource(*found)
+
+    def _check_content_duplicate(self, job, audio_path):
+        if job["metadata"].get("force_reimport"):
+            return
+        try:
+            with self._metrics(job).timed("hash"):
+                job["content_hash"] = file_sha256(audio_path)
+        except OSError as e:
+            print(f"[JobManager] Could not hash {audio_path}: {e}")
+            return
+        set_id = database.find_set_by_content_hash(job["content_hash"])
+        if set_id is None:
+            return
+        if job["type"] == "url":
+            # Our own download; the existing set keeps its audio file.
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+        raise DuplicateSource("set", set_id)
+
+    def _cancel_event(self, job):
+        with self._lock:
+            return self.cancel_events.setdefault(job["id"], threading.Event())
+
+    def _finish_job(self, job, error=None):
+        if error is None:
+            job["status"] = "completed"
+            job["phase"] = "done"
+            job["progress"] = 100
+            job["log"] = "Fertig."
+        elif isinstance(error, DuplicateSource):
+            print(f"[JobManager] Job {job['id']}: {error}")
+            job["status"] = "completed"
+            job["phase"] = "done"
+            job["progress"] = 100
+            if error.kind == "set":
+                job["set_id"] = error.existing_id
+                job["log"] = f"Bereits importiert (Set #{error.existing_id})."
+            else:
+                job["log"] = f"Wird bereits verarbeitet (Job #{error.existing_id})."
+        elif isinstance(error, JobCancelled):
+            print(f"[JobManager] Job {job['id']} cancelled")
+            job["status"] = "cancelled"
+            job["phase"] = "cancelled"
+            job["log"] = str(error)
+        else:
+            print(f"[JobManager] Job Failed: {error}")
+            job["status"] = "error"
+            job["phase"] = "error"
+            job["log"] = str(error)
+
+        try:
+            result = {"set_id": job.get("set_id"), "track_ids": job.get("track_ids", [])} if job.get("set_id") else None
+            if isinstance(error, DuplicateSource):
+                result = {"set_id": job.get("set_id"), "track_ids": [], "duplicate": True,
+                          "duplicate_of_job": error.existing_id if error.kind == "job" else None}
+            failed = error is not None and not isinstance(error, (JobCancelled, DuplicateSource))
+            metrics = self._metrics(job)
+            metrics.finish()
+            database.finish_job(job["id"], self.worker_id, job["status"], job["phase"], job["progress"], job["log"],
+                                result=result, error=str(error) if failed else None, metrics=metrics.snapshot())
+        except Exception as e:
+            print(f"[JobManager] Could not persist job {job['id']}: {e}")
+        with self._lock:
+            self.active_jobs.pop(job["id"], None)
+            self.cancel_events.pop(job["id"], None)
+            self.job_metrics.pop(job["id"], None)
+        self._published_progress.pop(job["id"], None)
+        self.events.publish("finished", {"job_id": job["id"], "label": job["label"], "status": job["status"],
+                                         "log": job["log"], "set_id": job.get("set_id")})
+
+    def _heartbeat_loop(self):
+        while not self._shutdown.wait(JOB_HEARTBEAT_INTERVAL):
+            with self._lock:
+                jobs = list(self.active_jobs.values())
+            for job in jobs:
+                try:
+                    cancel = database.heartbeat_job(
+                        job["id"], self.worker_id, JOB_LEASE_SECONDS, job.get("phase"), job.get("progress"), job.get("log")
+                    )
                 except Exception as e:
-                    print(f"[JobManager] Job Failed: {e}")
-                    self.active_job["status"] = "error"
-                    self.active_job["phase"] = "error"
-                    self.active_job["log"] = str(e)
-                
-                self.history.append(self.active_job)
-                self.active_job = None
-            
-            time.sleep(1)
+                    print(f"[JobManager] Heartbeat Error: {e}")
+                    continue
+                if cancel is None:
+                    # Another worker has reclaimed the job: stop working on it
+                    # and stop heartbeating it.
+                    print(f"[JobManager] Lost lease on job {job['id']}, cancelling")
+                    with self._lock:
+                        self.active_jobs.pop(job["id"], None)
+                    self._cancel_event(job).set()
+                elif cancel:
+                    self._cancel_event(job).set()
 
-    def _process_job(self, job):
+    def _download_stage(self, job):
         print(f"[JobManager] Starting Job {job['id']}")
+        cancel_event = self._cancel_event(job)
         
         audio_path = ""
-        job_id_str = str(job['id'])
-        base_filename = f"import_{job_id_str}"
+        # Job ids restart with a fresh database; the creation time keeps names unique.
+        base_filename = f"import_{job['id']}_{int(job['created_at'] * 1000)}"
         
         # --- STEP 1: DOWNLOAD ---
         if job["type"] == "url":
@@ -117,6 +710,9 @@ class JobManager:
                 job["log"] = " | ".join(history)
 
             def progress_hook(d):
+                # Called for every downloaded chunk; raising aborts yt-dlp right away.
+                if cancel_event.is_set():
+                    raise yt_dlp.utils.DownloadCancelled("Abgebrochen.")
                 if d['status'] == 'downloading':
                     try:
                         raw_str = d.get('_percent_str', '0%')
@@ -175,7 +771,10 @@ class JobManager:
             print(f"[JobManager] Downloading {url}...")
             def run_download(options):
                 with yt_dlp.YoutubeDL(options) as ydl:
-                    return ydl.extract_info(url, download=True)
+                    # Metadata first: a known video id stops the job before any audio is fetched.
+                    info = ydl.extract_info(url, download=False)
+                    self._check_source_duplicate(job, info)
+                    return ydl.process_ie_result(info, download=True)
 
             def should_retry(error):
                 message = str(error)
@@ -190,11 +789,15 @@ class JobManager:
                 try:
                     info = run_download(attempt_opts)
                     break
+                except yt_dlp.utils.DownloadCancelled:
+                    raise JobCancelled("Abgebrochen.")
                 except Exception as exc:
                     last_error = exc
                     if not should_retry(exc):
                         raise
                     append_log(f"Download fehlgeschlagen ({client}), versuche nächsten Client...")
+                if cancel_event.is_set():
+                    raise JobCancelled("Abgebrochen.")
             if info is None:
                 append_log("yt-dlp fehlgeschlagen, versuche pytube...")
                 try:
@@ -236,6 +839,7 @@ class JobManager:
             if found_file:
                 audio_path = os.path.join(UPLOAD_DIR, found_file)
                 print(f"[JobManager] Found file: {audio_path}")
+                self._metrics(job).add("bytes_downloaded", os.path.getsize(audio_path))
             else:
                 print(f"[Debug] Dir content: {files_in_dir}")
                 raise Exception(f"Download fertig, aber Datei {base_filename} nicht gefunden.")
@@ -245,54 +849,91 @@ class JobManager:
         
         if not os.path.exists(audio_path):
             raise Exception(f"Datei fehlt: {audio_path}")
+        return audio_path
 
-      # --- STEP 2: DATABASE ---
-        job["phase"] = "importing"
-        job["progress"] = 85
-        job["log"] = "Speichere Set..."
+    def _generate_peaks(self, job, audio_path):
+        # Decodes the whole set once; runs next to the (network-bound) analysis.
+        try:
+            with self._metrics(job).timed("peaks"):
+                peaks.generate_peaks(audio_path, cancel_event=self._cancel_event(job), ffmpeg=FFMPEG_PATH or FFMPEG_BIN)
+        except Exception as e:
+            print(f"[JobManager] Waveform peaks failed: {e}")
 
-        conn = database.get_conn()
-        cur = conn.cursor()
-        
-        # CORRECTED QUERY: Uses 'artists' (plural)
-        cur.execute("""
-            INSERT INTO sets (name, audio_file, created_at, artists, event, is_b2b) 
-            VALUES (?, ?, datetime('now'), ?, ?, ?)
-        """, (
-            job["metadata"].get("name") or "Unbenanntes Set",
-            audio_path,
-            job["metadata"].get("artist"), # Maps input 'artist' to DB 'artists' column
-            job["metadata"].get("event"),
-            1 if job["metadata"].get("is_b2b") else 0
-        ))
-        set_id = cur.lastrowid
-        conn.commit()
-        conn.close()
-        
-        # --- STEP 3: ANALYZE ---
+    def _analysis_stage(self, job, audio_path):
+        peaks_thread = threading.Thread(target=self._generate_peaks, args=(job, audio_path), name="job-peaks", daemon=True)
+        peaks_thread.start()
+
+        # --- STEP 2: ANALYZE ---
+        found_tracks = []
         if scan_dj_set:
             job["phase"] = "analyzing"
-            job["progress"] = 90
+            job["progress"] = 85
             job["log"] = "Analysiere (Shazam)..."
             
             try:
                 loop = asyncio.get_event_loop()
-                found_tracks = loop.run_until_complete(scan_dj_set(audio_path))
+                found_tracks = loop.run_until_complete(
+                    scan_dj_set(audio_path, cancel_event=self._cancel_event(job), metrics=self._metrics(job))
+                )
                 print(f"[JobManager] Found {len(found_tracks)} tracks")
+            except ScanCancelled:
+                raise JobCancelled("Abgebrochen.")
             except Exception as e:
                 print(f"[JobManager] Analyzer Error: {e}")
                 found_tracks = [] 
                 job["log"] = f"Analyse Fehler: {e}"
-
-            # --- STEP 4: SAVE TRACKS ---
-            job["progress"] = 95
-            job["log"] = f"Speichere {len(found_tracks)} Tracks..."
-            
-            for i, t in enumerate(found_tracks):
-                database.add_track_to_set(
-                    set_id, i + 1, t['artist'], t['title'], t['start_time'], t.get('confidence', 0.9), t.get('cover')
-                )
         else:
             job["log"] = "Analyzer inaktiv."
 
+        if self._cancel_event(job).is_set():
+            raise JobCancelled("Abgebrochen.")
+
+        # --- STEP 3: SAVE SET + TRACKS (one transaction) ---
+        job["phase"] = "importing"
+        job["progress"] = 95
+        job["log"] = f"Speichere Set mit {len(found_tracks)} Tracks..."
+
+        stats = {}
+        metrics = self._metrics(job)
+        with metrics.timed("db_write"):
+            set_id, track_ids = database.insert_set_with_tracks(
+                {
+                    "name": job["metadata"].get("name") or "Unbenanntes Set",
+                    "audio_file": audio_path,
+                    "created_at": datetime.datetime.now().isoformat(),
+                    "artists": job["metadata"].get("artist"),  # Maps input 'artist' to DB 'artists' column
+                    "event": job["metadata"].get("event"),
+                    "is_b2b": 1 if job["metadata"].get("is_b2b") else 0,
+                    "source_key": job.get("source_key"),
+                    "content_hash": job.get("content_hash"),
+                },
+                [
+                    {
+                        "position": i + 1,
+                        "artist": t['artist'],
+                        "title": t['title'],
+                        "start_time": t['start_time'],
+                        "confidence": t.get('confidence', 0.9),
+                        "cover": t.get('cover'),  # cached once per unique track in catalog_tracks
+                    }
+                    for i, t in enumerate(found_tracks)
+                ],
+                stats=stats,
+            )
+        metrics.add("cache_hits", stats.get("catalog_hits", 0))
+        peaks_thread.join()
+        snippets.queue_set(track_ids)
+        renditions.queue_rendition(audio_path, ffmpeg=FFMPEG_PATH or FFMPEG_BIN)
+        job["set_id"] = set_id
+        job["track_ids"] = track_ids
+        print(f"[JobManager] Saved set {set_id} with {len(track_ids)} tracks")
+
 manager = JobManager()
+
+if __name__ == "__main__":
+    # Standalone worker: python job_manager.py (set TRACKLISTIFY_JOB_WORKER=external for the web app)
+    database.init_db()
+    if os.getenv("TRACKLISTIFY_IMPORT_WATCH", "1") == "1":
+        from services.import_watcher import start_watcher
+        start_watcher()
+    manager.run_forever()
@@ -1,11 +1,50 @@
 import asyncio
 import os
 import subprocess
+import time
 from shazamio import Shazam
 
-async def scan_dj_set(file_path):
+# How often blocking steps look at the cancel event (seconds).
+CANCEL_POLL_INTERVAL = 0.05
+
+class ScanCancelled(Exception):
+    """Raised by scan_dj_set when its cancel_event is set."""
+
+def _check_cancel(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ScanCancelled("Analyse abgebrochen.")
+
+def _run_cancellable(cmd, cancel_event):
+    """subprocess.run(cmd, check=True), but kills the process as soon as cancel_event is set."""
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while True:
+        try:
+            returncode = proc.wait(timeout=CANCEL_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel_event is not None and cancel_event.is_set():
+                proc.kill()
+                proc.wait()
+                raise ScanCancelled("Analyse abgebrochen.")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+async def _await_cancellable(coro, cancel_event):
+    """Awaits coro, cancelling it as soon as cancel_event (a threading.Event) is set."""
+    task = asyncio.ensure_future(coro)
+    while not task.done():
+        if cancel_event is not None and cancel_event.is_set():
+            task.cancel()
+            raise ScanCancelled("Analyse abgebrochen.")
+        await asyncio.wait({task}, timeout=CANCEL_POLL_INTERVAL)
+    return task.result()
+
+async def scan_dj_set(file_path, cancel_event=None, metrics=None):
     """
     Scans a DJ set file by splitting it into chunks and identifying them.
+    cancel_event (threading.Event) stops the scan between and inside segments
+    by raising ScanCancelled. metrics (e.g. job_manager.JobMetrics) receives
+    segment / provider counters and ffmpeg / provider timings.
     """
     print(f"[Analyzer] Starting scan for: {file_path}")
     
@@ -44,10 +83,26 @@ async def scan_dj_set(file_path):
         ]
         
         try:
-            subprocess.run(cmd, check=True)
-            
+            _check_cancel(cancel_event)
+            started = time.perf_counter()
+            _run_cancellable(cmd, cancel_event)
+            if metrics:
+                metrics.observe("ffmpeg", time.perf_counter() - started)
+                metrics.add("segments")
+
             # Recognize
-            out = await shazam.recognize(temp_snippet)
+            started = time.perf_counter()
+            try:
+                out = await _await_cancellable(shazam.recognize(temp_snippet), cancel_event)
+            except ScanCancelled:
+                raise
+            except Exception:
+                if metrics:
+                    metrics.add("provider_errors")
+                raise
+            finally:
+                if metrics:
+                    metrics.observe("provider", time.perf_counter() - started)
             track = out.get('track')
             
             if track:
@@ -65,6 +120,10 @@ async def scan_dj_set(file_path):
             else:
                 print("   -> No match.")
                 
+        except ScanCancelled:
+            if os.path.exists(temp_snippet):
+                os.remove(temp_snippet)
+            raise
         except Exception as e:
             print(f"[Analyzer] Error at {current_time}s: {e}")
 
@@ -0,0 +1,182 @@
+"""
+Range-aware audio file responses with constant memory per listener.
+
+Plain and single-range requests go through Flask's send_file, which streams
+the file through the server's wsgi.file_wrapper (sendfile where the server
+supports it) or in fixed-size blocks, and handles ETag, If-None-Match,
+If-Range and suffix ranges (`bytes=-N`). Werkzeug answers multi-range
+requests with 416, so those are served here as multipart/byteranges,
+CHUNK_SIZE bytes at a time.
+"""
+import mimetypes
+import os
+import uuid
+
+from flask import Response, request, send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.http import http_date
+
+CHUNK_SIZE = 256 * 1024
+MAX_AGE = 3600
+# More ranges than this are not seeking, they are abuse; serve the whole file instead.
+MAX_RANGES = 16
+
+# mimetypes misses or misnames several audio containers on some platforms.
+AUDIO_MIMETYPES = {
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",
+    ".aac": "audio/aac",
+    ".opus": "audio/ogg",
+    ".ogg": "audio/ogg",
+    ".oga": "audio/ogg",
+    ".webm": "audio/webm",
+    ".flac": "audio/flac",
+    ".wav": "audio/wav",
+    ".aif": "audio/aiff",
+    ".aiff": "audio/aiff",
+}
+
+
+def audio_mimetype(path):
+    ext = os.path.splitext(path)[1].lower()
+    return AUDIO_MIMETYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def file_etag(st):
+    """Strong validator from size and mtime; changes whenever the file is replaced."""
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def iter_file(path, start, length, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def parse_ranges(header):
+    """
+    `bytes=a-b,c-,-n` as [(start, stop|None), ...] with suffixes as (None, n),
+    or None if malformed. Unlike werkzeug, overlapping and unordered specs are
+    accepted (RFC 7233 allows both; they are merged below).
+    """
+    if not header:
+        return None
+    units, _, specs = header.partition("=")
+    if units.strip().lower() != "bytes":
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if not first:
+                ranges.append((None, int(last)))
+            else:
+                start = int(first)
+                stop = int(last) + 1 if last else None
+                if stop is not None and stop <= start:
+                    return None
+                ranges.append((start, stop))
+        except ValueError:
+            return None
+    return ranges
+
+
+def _satisfiable_ranges(ranges, size):
+    """Absolute, merged [start, stop) spans of a parsed Range header."""
+    spans = []
+    for start, stop in ranges:
+        if start is None:  # suffix: last `stop` bytes; `-0` selects nothing
+            start, stop = max(0, size - stop), size
+        stop = size if stop is None else min(stop, size)
+        if start < stop:
+            spans.append([start, stop])
+    spans.sort()
+    merged = []
+    for span in spans:
+        if merged and span[0] <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], span[1])
+        else:
+            merged.append(span)
+    return merged
+
+
+def _if_range_matches(etag, mtime):
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return int(mtime) <= if_range.date.timestamp()
+    return True
+
+
+def _multipart_response(path, spans, size, mimetype, etag):
+    boundary = uuid.uuid4().hex
+    heads = [
+        (f"--{boundary}\r\nContent-Type: {mimetype}\r\n"
+         f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n").encode()
+        for start, stop in spans
+    ]
+    tail = f"--{boundary}--\r\n".encode()
+    length = sum(len(h) + (stop - start) + 2 for h, (start, stop) in zip(heads, spans)) + len(tail)
+
+    def generate():
+        for head, (start, stop) in zip(heads, spans):
+            yield head
+            yield from iter_file(path, start, stop - start)
+            yield b"\r\n"
+        yield tail
+
+    rv = Response(generate(), 206, mimetype=f"multipart/byteranges; boundary={boundary}", direct_passthrough=True)
+    rv.headers["Content-Length"] = str(length)
+    rv.headers["Accept-Ranges"] = "bytes"
+    rv.headers["ETag"] = f'"{etag}"'
+    rv.headers["Cache-Control"] = f"public, max-age={MAX_AGE}"
+    return rv
+
+
+def serve_audio(path, mimetype=None):
+    """Response for an audio file on disk, honouring Range and conditional headers."""
+    st = os.stat(path)
+    etag = file_etag(st)
+    mimetype = mimetype or audio_mimetype(path)
+
+    ranges = parse_ranges(request.headers.get("Range"))
+    if ranges and len(ranges) <= MAX_RANGES and _if_range_matches(etag, st.st_mtime):
+        spans = _satisfiable_ranges(ranges, st.st_size)
+        if not spans:
+            # Also covers `bytes=-0`, which werkzeug would answer with the whole file.
+            raise RequestedRangeNotSatisfiable(st.st_size)
+        if len(spans) > 1:
+            return _multipart_response(path, spans, st.st_size, mimetype, etag)
+        if len(ranges) > 1:
+            # Overlapping or empty ranges left one span: answer as a plain single range.
+            start, stop = spans[0]
+            rv = Response(iter_file(path, start, stop - start), 206, mimetype=mimetype, direct_passthrough=True)
+            rv.headers["Content-Length"] = str(stop - start)
+            rv.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{st.st_size}"
+            rv.headers["Accept-Ranges"] = "bytes"
+            rv.headers["ETag"] = f'"{etag}"'
+            rv.headers["Last-Modified"] = http_date(st.st_mtime)
+            rv.headers["Cache-Control"] = f"public, max-age={MAX_AGE}"
+            return rv
+
+    if ranges and len(ranges) > MAX_RANGES:
+        # Drop the Range header so send_file answers 200 with the whole file.
+        request.environ.pop("HTTP_RANGE", None)
+
+    return send_file(
+        path,
+        mimetype=mimetype,
+        conditional=True,
+        etag=etag,
+        last_modified=st.st_mtime,
+        max_age=MAX_AGE,
+    )
@@ -1,7 +1,7 @@
 import logging
 import urllib.parse
 
-import yt_dlp
+from services.ytdlp_pool import get_pool
 
 logger = logging.getLogger(__name__)
 
@@ -17,28 +17,21 @@ def find_dj_on_soundcloud(dj_name: str):
         return None
 
     query = f"scsearch1:{dj_name}"
-    opts = {
-        "quiet": True,
-        "no_warnings": True,
-        "extract_flat": True,
-        "skip_download": True,
-    }
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            info = ydl.extract_info(query, download=False)
-            entries = info.get("entries") or []
-            if entries:
-                first = entries[0]
-                url = first.get("url") or first.get("webpage_url")
-                image_url = None
-                thumbs = first.get("thumbnails") or []
-                if thumbs:
-                    image_url = thumbs[-1].get("url") or thumbs[0].get("url")
-                return {
-                    "soundcloud_url": url,
-                    "image_url": image_url,
-                    "soundcloud_id": first.get("id"),
-                }
+        info = get_pool().extract(query, "flat")
+        entries = info.get("entries") or []
+        if entries:
+            first = entries[0]
+            url = first.get("url") or first.get("webpage_url")
+            image_url = None
+            thumbs = first.get("thumbnails") or []
+            if thumbs:
+                image_url = thumbs[-1].get("url") or thumbs[0].get("url")
+            return {
+                "soundcloud_url": url,
+                "image_url": image_url,
+                "soundcloud_id": first.get("id"),
+            }
     except Exception as exc:  # noqa: BLE001
         logger.debug("SoundCloud lookup failed via yt-dlp: %s", exc)
 
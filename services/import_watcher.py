@@ -0,0 +1,279 @@
+"""
+Filesystem watcher that imports tracklist output as soon as it appears.
+
+JSON_OUTPUT_DIR and the download/upload directories are watched with
+inotify (Linux, via ctypes - no extra dependency) or, where inotify is not
+available, by polling them once per POLL_INTERVAL. Events are debounced
+per path; a path is handed on once no event arrived for DEBOUNCE seconds
+and, when polling, once its size and mtime stopped changing. inotify only
+reports files that were closed after writing or renamed into place, so
+half-written exports are never read.
+
+Ready paths go into a bounded queue (WATCH_QUEUE_SIZE). If it overflows -
+or the kernel's inotify queue does - the dropped paths are not lost: the
+worker falls back to one full importer sweep instead.
+"""
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+import logging
+
+from config import DOWNLOAD_DIR, JSON_OUTPUT_DIR, UPLOAD_DIR
+from services import importer
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE = float(os.getenv("TRACKLISTIFY_WATCH_DEBOUNCE", "0.3"))
+POLL_INTERVAL = float(os.getenv("TRACKLISTIFY_WATCH_POLL_INTERVAL", "0.5"))
+WATCH_QUEUE_SIZE = 256
+AUDIO_EXTENSIONS = (".mp3", ".m4a", ".mp4", ".aac", ".opus", ".ogg", ".webm", ".flac", ".wav", ".aif", ".aiff")
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+_SWEEP = object()  # queue marker: import by full sweep
+
+
+class InotifySource:
+    """Yields batches of (directory, name) for files closed after writing or moved in."""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self._dirs[wd] = directory
+        self.overflowed = False
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+            elif wd in self._dirs and name:
+                events.append((self._dirs[wd], os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingSource:
+    """Fallback: rescans the directories and reports files whose size or mtime changed."""
+
+    def __init__(self, directories, interval=POLL_INTERVAL):
+        self.directories = list(directories)
+        self.interval = interval
+        self.overflowed = False
+        self._seen = {d: self._scan(d) for d in self.directories}
+
+    @staticmethod
+    def _scan(directory):
+        found = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        st = entry.stat()
+                        found[entry.name] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            pass
+        return found
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        events = []
+        for directory in self.directories:
+            current = self._scan(directory)
+            previous = self._seen[directory]
+            events.extend((directory, name) for name, st in current.items() if previous.get(name) != st)
+            self._seen[directory] = current
+        return events
+
+    def close(self):
+        pass
+
+
+def _open_source(directories, force_polling=False):
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifySource(directories)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable (%s), polling instead", e)
+    return PollingSource(directories)
+
+
+class ImportWatcher:
+    def __init__(self, json_dir=JSON_OUTPUT_DIR, audio_dirs=(DOWNLOAD_DIR, UPLOAD_DIR), debounce=DEBOUNCE,
+                 force_polling=False, import_paths=importer.import_json_paths,
+                 sweep=importer.import_json_files, attach_audio=importer.attach_missing_audio):
+        self.json_dir = os.path.abspath(json_dir)
+        self.audio_dirs = [os.path.abspath(d) for d in audio_dirs]
+        self.debounce = debounce
+        self.force_polling = force_polling
+        self.import_paths = import_paths
+        self.sweep = sweep
+        self.attach_audio = attach_audio
+        self.queue = queue.Queue(maxsize=WATCH_QUEUE_SIZE)
+        self._pending = {}  # path -> (size, mtime_ns, due)
+        self._sweep_needed = False
+        self._stop = threading.Event()
+        self._threads = []
+        self.source = None
+        self.stats = {"events": 0, "imported": 0, "sweeps": 0, "dropped": 0}
+
+    def start(self):
+        if self._threads:
+            return self
+        directories = [d for d in [self.json_dir, *self.audio_dirs] if os.path.isdir(d)]
+        self.source = _open_source(directories, self.force_polling)
+        print(f"[Watcher] {type(self.source).__name__} on {len(directories)} directories")
+        # Catch up on files that arrived while nothing was watching
+        self._put(_SWEEP)
+        for target, name in ((self._watch_loop, "import-watch"), (self._work_loop, "import-worker")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        self._put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        if self.source is not None:
+            self.source.close()
+
+    def _wanted(self, directory, name):
+        if name.startswith(".") or importer.is_generated_file(name):
+            return False
+        if directory == self.json_dir:
+            return name.endswith(".json")
+        return name.lower().endswith(AUDIO_EXTENSIONS)
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            try:
+                events = self.source.read(self.debounce / 2 if self._pending else 1.0)
+            except Exception as e:
+                logger.warning("Watcher read failed: %s", e)
+                time.sleep(1)
+                continue
+            now = time.monotonic()
+            for directory, name in events:
+                if self._wanted(directory, name):
+                    self.stats["events"] += 1
+                    path = os.path.join(directory, name)
+                    self._pending[path] = self._stat(path) + (now + self.debounce,)
+            if self.source.overflowed:
+                self.source.overflowed = False
+                self._pending.clear()
+                self._sweep_needed = True
+            self._flush(now)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime_ns)
+        except OSError:
+            return (None, None)
+
+    def _flush(self, now):
+        if self._sweep_needed and self._put(_SWEEP):
+            self._sweep_needed = False
+        for path, (size, mtime_ns, due) in list(self._pending.items()):
+            if due > now:
+                continue
+            current = self._stat(path)
+            if current[0] is None:
+                del self._pending[path]  # gone again
+            elif current != (size, mtime_ns):
+                self._pending[path] = current + (now + self.debounce,)  # still being written
+            else:
+                del self._pending[path]
+                if self._sweep_needed or not self._put(path):
+                    # Queue full: a sweep (queued as soon as there is room) covers the dropped paths
+                    self.stats["dropped"] += 1
+                    self._sweep_needed = True
+
+    def _work_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            # Take what else is ready, so a burst of files is one import call
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch or self._stop.is_set()
+            try:
+                self._handle([item for item in batch if item is not None])
+            except Exception as e:
+                logger.warning("Watcher import failed: %s", e)
+            if stop:
+                return
+
+    def _handle(self, batch):
+        audio_dirs = {os.path.dirname(p) for p in batch if p is not _SWEEP} & set(self.audio_dirs)
+        if _SWEEP in batch:
+            self.stats["sweeps"] += 1
+            self.stats["imported"] += len(self.sweep() or [])
+            audio_dirs = set(self.audio_dirs)
+        else:
+            json_paths = [p for p in batch if os.path.dirname(p) == self.json_dir]
+            if json_paths:
+                new_ids = self.import_paths(json_paths)
+                self.stats["imported"] += len(new_ids)
+                if new_ids:
+                    print(f"[Watcher] {len(new_ids)} Set(s) importiert")
+        for directory in sorted(audio_dirs):
+            self.attach_audio(directory)
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def start_watcher():
+    """Starts the process-wide watcher once (owned by whoever runs the job worker)."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = ImportWatcher().start()
+        return _watcher
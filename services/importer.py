@@ -1,38 +1,117 @@
 import os
 import datetime
+import hashlib
 import shutil
-from typing import Dict
+import threading
+from typing import Dict, List, Optional
 from config import (
     JSON_OUTPUT_DIR,
     DOWNLOAD_DIR,
     IMPORT_JSON_CLEANUP_MODE,
     IMPORT_JSON_ARCHIVE_DIR,
 )
-from backend.storage import load_json_file
-from database import get_conn
+from backend.storage import load_json_value
+import database
+from database import insert_set_with_tracks
+from services.peaks import PEAKS_SUFFIX
+from services.renditions import RENDITION_SUFFIX
 
 
-def _guess_audio_file_from_title(title):
-    if not title:
-        return None
-    norm = title.lower().replace("_", " ").strip()
-    best, score = None, 0
-    try:
-        if os.path.exists(DOWNLOAD_DIR):
-            for f in os.listdir(DOWNLOAD_DIR):
-                full = os.path.join(DOWNLOAD_DIR, f)
-                if not os.path.isfile(full):
+# Files the app itself writes next to set audio: they are never a download.
+GENERATED_SUFFIXES = (RENDITION_SUFFIX, PEAKS_SUFFIX, ".tmp", ".part")
+
+
+def is_generated_file(name):
+    return name.lower().endswith(GENERATED_SUFFIXES)
+
+
+class AudioFileIndex:
+    """
+    Token index over the audio files of a directory, so guessing the audio of
+    an imported tracklist does not list and score the whole directory per file.
+    Rebuilt only when the directory's mtime changes (files added or removed).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._files = []  # (path, stem, tokens) in directory order
+        self._postings = {}  # token -> indexes into _files
+
+    def _refresh(self, directory):
+        try:
+            key = (directory, os.stat(directory).st_mtime_ns)
+        except OSError:
+            key = (directory, None)
+        if key == self._key:
+            return
+        files, postings = [], {}
+        if key[1] is not None:
+            for f in os.listdir(directory):
+                full = os.path.join(directory, f)
+                if is_generated_file(f) or not os.path.isfile(full):
                     continue
                 stem = os.path.splitext(f)[0].lower()
-                sc = 0
-                if norm in stem:
-                    sc += 5
-                sc += len(set(norm.split()) & set(stem.split()))
+                tokens = set(stem.split())
+                for token in tokens:
+                    postings.setdefault(token, []).append(len(files))
+                files.append((full, stem, tokens))
+        self._key, self._files, self._postings = key, files, postings
+
+    def match(self, title, directory, min_score=1):
+        """Best-scoring file for title (+5 if the title is part of the name, +1 per shared word)."""
+        norm = title.lower().replace("_", " ").strip()
+        words = set(norm.split())
+        with self._lock:
+            self._refresh(directory)
+            candidates = {i for w in words for i in self._postings.get(w, ())}
+            if norm:
+                # The title may sit inside a longer word ("room" in "boilerroom"),
+                # which no posting list finds; the cached stems are cheap to scan.
+                candidates.update(i for i, (_, stem, _) in enumerate(self._files) if norm in stem)
+            candidates = sorted(candidates)
+            best, score = None, 0
+            for i in candidates:
+                full, stem, tokens = self._files[i]
+                sc = (5 if norm in stem else 0) + len(words & tokens)
                 if sc > score:
                     score, best = sc, full
+        return best if score >= min_score else None
+
+
+_audio_index = AudioFileIndex()
+# Sweeps, single-file imports from the watcher and the API never run at once
+_import_lock = threading.Lock()
+
+
+def _guess_audio_file_from_title(title):
+    if not title:
+        return None
+    try:
+        return _audio_index.match(title, DOWNLOAD_DIR)
     except Exception:
-        pass
-    return best if score > 0 else None
+        return None
+
+
+def attach_missing_audio(directory=None):
+    """
+    Gives imported sets without audio the matching file of a new download.
+    Stricter than the import-time guess: the set title must be part of the file name.
+    RÜCKGABE: Liste der aktualisierten Set-IDs.
+    """
+    directory = directory or DOWNLOAD_DIR
+    attached = []
+    for s in database.get_sets_missing_audio():
+        name = s["name"] or ""
+        title = name.split(" - ", 1)[1] if " - " in name else name
+        for candidate in (name, title):
+            path = candidate.strip() and _audio_index.match(candidate, directory, min_score=5)
+            if path:
+                database.set_audio_file(s["id"], path)
+                attached.append(s["id"])
+                print(f"[Importer] Audio für Set {s['id']} gefunden: {path}")
+                break
+    return attached
 
 
 def _parse_time_to_seconds(val):
@@ -78,11 +157,184 @@ def _cleanup_processed_file(path, filename, actions):
             actions.append({"file": path, "action": "move_failed", "error": str(exc)})
 
 
-def import_json_files(output_dir: str = JSON_OUTPUT_DIR, cleanup: bool = True) -> Dict[str, object]:
+def _track_rows(tracks):
+    rows = []
+    for i, t in enumerate(tracks, 1):
+        # Tracklistify exports use `song_name` while older imports may
+        # still provide `title` – cover both to avoid empty names.
+        title = t.get("title") or t.get("song_name") or t.get("name")
+
+        # Prefer explicit start/end fields but gracefully fall back to
+        # formatted timestamps and durations from Tracklistify exports.
+        start_raw = (
+            t.get("start")
+            or t.get("start_seconds")
+            or t.get("time_in_mix")
+        )
+        end_raw = t.get("end") or t.get("end_seconds")
+
+        s = _parse_time_to_seconds(start_raw)
+        if end_raw is not None:
+            e = _parse_time_to_seconds(end_raw)
+        else:
+            duration = t.get("duration")
+            e = s + _parse_time_to_seconds(duration) if duration else 0.0
+
+        row = {
+            "position": i,
+            "artist": t.get("artist"),
+            "title": title,
+            "confidence": t.get("confidence"),
+            "start_time": s,
+            "end_time": e,
+            "flag": 0,
+        }
+        if t.get("beatport_url"):
+            row["beatport_url"] = t.get("beatport_url")
+        rows.append(row)
+    return rows
+
+
+def import_tracklist_data(data, audio_file=None, source_file=None, fallback_title=None):
+    """
+    Schreibt ein Tracklistify-Ergebnis (Format des JSON-Exports) als neues Set in die DB.
+    Wird von import_json_files und von der In-Process-Analyse (services/processor) genutzt.
+    RÜCKGABE: ID des neuen Sets.
+    """
+    mix = data.get("mix_info", {}) or {}
+    meta = data.get("meta", {}) or data.get("set", {}) or {}
+    ana = data.get("analysis_info", {}) or {}
+
+    raw_title = mix.get("title") or meta.get("title") or fallback_title or "Unbenanntes Set"
+    artist = mix.get("artist") or meta.get("artist")
+
+    if not artist:
+        parts = raw_title.split(" - ", 1)
+        artist = parts[0] if len(parts) == 2 else "Unknown Artist"
+        if len(parts) == 2:
+            raw_title = parts[1]
+
+    set_name = f"{artist} - {raw_title}"
+    audio_file = audio_file or ana.get("audio_file") or _guess_audio_file_from_title(raw_title)
+
+    # Set and tracks are written in one transaction, so a broken
+    # file never leaves a half-imported set behind.
+    set_id, _ = insert_set_with_tracks(
+        {
+            "name": set_name,
+            "source_file": source_file,
+            "created_at": datetime.datetime.now().isoformat(),
+            "audio_file": audio_file,
+        },
+        _track_rows(data.get("tracks") or data.get("tracklist") or []),
+    )
+    return set_id
+
+
+def _scan_json_files(directory):
+    """(name, abspath, size, mtime_ns) of the JSON files in directory, by name."""
+    found = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                st = entry.stat()
+                found.append((entry.name, os.path.abspath(entry.path), st.st_size, st.st_mtime_ns))
+    return sorted(found)
+
+
+def _import_changed(changed, manifest, result, cleanup=True):
+    """Reads, dedupes and imports (name, path, size, mtime_ns) files; updates manifest and result."""
+    known_sources = database.get_imported_source_files()
+    known_hashes = {e["content_hash"]: e for e in manifest.values() if e.get("content_hash") and e.get("set_id")}
+    updates = []
+
+    for fname, path, size, mtime_ns in changed:
+        entry = {"path": path, "size": size, "mtime_ns": mtime_ns}
+        updates.append(entry)
+
+        # Dubletten-Check
+        if path in known_sources:
+            entry.update(status="duplicate", set_id=(manifest.get(path) or {}).get("set_id"))
+            result["skipped_files"].append({"file": path, "reason": "duplicate"})
+            continue
+
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            entry["content_hash"] = hashlib.sha256(raw).hexdigest()
+            same = known_hashes.get(entry["content_hash"])
+            if same:
+                # Same export under another name (or re-saved unchanged)
+                entry.update(status="duplicate", set_id=same["set_id"])
+                result["skipped_files"].append({"file": path, "reason": "duplicate"})
+                continue
+
+            set_id = import_tracklist_data(
+                load_json_value(raw),
+                source_file=path,
+                fallback_title=os.path.splitext(fname)[0],
+            )
+            entry.update(status="imported", set_id=set_id)
+            known_hashes[entry["content_hash"]] = entry
+
+            result["new_set_ids"].append(set_id)
+            result["processed_files"].append(path)
+
+        except Exception as e:
+            # Recorded with its size/mtime: retried once the file changes (e.g. finished writing)
+            entry.update(status="error", error=str(e))
+            result["errors"].append({"file": path, "error": str(e)})
+            print(f"[Importer] Fehler bei {fname}: {e}")
+
+    database.record_import_manifest(updates)
+
+    if cleanup and result["processed_files"]:
+        for path in result["processed_files"]:
+            _cleanup_processed_file(path, os.path.basename(path), result["cleanup_actions"])
+
+
+def import_json_paths(paths):
+    """
+    Importiert einzelne JSON-Dateien (Dateisystem-Watcher) ohne den Ordner zu durchsuchen.
+    RÜCKGABE: Liste der neu angelegten Set-IDs.
+    """
+    result = {"new_set_ids": [], "processed_files": [], "skipped_files": [], "errors": [], "cleanup_actions": []}
+    with _import_lock:
+        manifest = database.get_import_manifest()
+        changed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # moved away again (e.g. cleanup of an earlier import)
+            seen = manifest.get(path)
+            if not (seen and seen["size"] == st.st_size and seen["mtime_ns"] == st.st_mtime_ns):
+                changed.append((os.path.basename(path), path, st.st_size, st.st_mtime_ns))
+        if changed:
+            _import_changed(changed, manifest, result)
+    return result["new_set_ids"]
+
+
+def import_json_files(output_dir: Optional[str] = None, cleanup: bool = True) -> List[int]:
     """
-    Liest JSON-Dateien ein und schreibt sie in die DB.
+    Liest neue oder geänderte JSON-Dateien aus output_dir (Standard: JSON_OUTPUT_DIR)
+    ein und schreibt sie in die DB. cleanup=False lässt importierte Dateien liegen,
+    sonst gilt IMPORT_JSON_CLEANUP_MODE.
     RÜCKGABE: Liste der neu angelegten Set-IDs (immer eine Liste, auch wenn leer).
     """
+    return import_json_report(output_dir, cleanup)["new_set_ids"]
+
+
+def import_json_report(output_dir: Optional[str] = None, cleanup: bool = True) -> Dict[str, object]:
+    """
+    Wie import_json_files, liefert aber den vollständigen Bericht.
+    Das import_manifest merkt sich Größe, mtime und Hash jeder gesehenen Datei;
+    unveränderte Dateien werden nicht noch einmal gelesen.
+    RÜCKGABE: Dict mit status, message, new_set_ids, processed_files,
+    skipped_files, errors und cleanup_actions.
+    """
+    output_dir = str(output_dir or JSON_OUTPUT_DIR)
     result = {
         "status": "pending",
         "message": "",
@@ -93,109 +345,39 @@ def import_json_files(output_dir: str = JSON_OUTPUT_DIR, cleanup: bool = True) -
         "cleanup_actions": [],
     }
 
-    if not os.path.isdir(JSON_OUTPUT_DIR):
+    if not os.path.isdir(output_dir):
         result["status"] = "missing_directory"
-        result["message"] = f"Output directory not found: {JSON_OUTPUT_DIR}"
+        result["message"] = f"Output directory not found: {output_dir}"
         print(f"[Importer] {result['message']}")
-        return result["new_set_ids"]
+        return result
 
-    json_files = [f for f in sorted(os.listdir(JSON_OUTPUT_DIR)) if f.endswith(".json")]
-    if not json_files:
-        result["status"] = "no_new_files"
-        result["message"] = "No JSON files to import."
-        return result["new_set_ids"]
+    with _import_lock:
+        _sweep(result, output_dir, cleanup)
+    return result
 
-    conn = get_conn()
-    cur = conn.cursor()
 
-    try:
-        for fname in json_files:
-            path = os.path.join(JSON_OUTPUT_DIR, fname)
+def _sweep(result, output_dir, cleanup):
+    json_files = _scan_json_files(output_dir)
+    manifest = database.get_import_manifest()
 
-            # Dubletten-Check
-            cur.execute("SELECT id FROM sets WHERE source_file = ?", (os.path.abspath(path),))
-            if cur.fetchone():
-                result["skipped_files"].append({"file": path, "reason": "duplicate"})
-                continue
-
-            try:
-                data = load_json_file(path)
+    # Rows of files that were moved or deleted since the last sweep
+    prefix = os.path.join(os.path.abspath(output_dir), "")
+    present = {path for _, path, _, _ in json_files}
+    database.prune_import_manifest([p for p in manifest if p.startswith(prefix) and p not in present])
 
-                mix = data.get("mix_info", {}) or {}
-                meta = data.get("meta", {}) or data.get("set", {}) or {}
-                ana = data.get("analysis_info", {}) or {}
-
-                raw_title = mix.get("title") or meta.get("title") or os.path.splitext(fname)[0]
-                artist = mix.get("artist") or meta.get("artist")
-
-                if not artist:
-                    parts = raw_title.split(" - ", 1)
-                    artist = parts[0] if len(parts) == 2 else "Unknown Artist"
-                    if len(parts) == 2:
-                        raw_title = parts[1]
-
-                set_name = f"{artist} - {raw_title}"
-                audio_file = ana.get("audio_file") or _guess_audio_file_from_title(raw_title)
+    changed = []
+    for fname, path, size, mtime_ns in json_files:
+        seen = manifest.get(path)
+        if seen and seen["size"] == size and seen["mtime_ns"] == mtime_ns:
+            result["skipped_files"].append({"file": path, "reason": "unchanged"})
+        else:
+            changed.append((fname, path, size, mtime_ns))
+    if not changed:
+        result["status"] = "no_new_files"
+        result["message"] = "No new files to import."
+        return
 
-                cur.execute(
-                    "INSERT INTO sets (name, source_file, created_at, audio_file) VALUES (?, ?, ?, ?)",
-                    (set_name, os.path.abspath(path), datetime.datetime.now().isoformat(), audio_file),
-                )
-                set_id = cur.lastrowid
-
-                result["new_set_ids"].append(set_id)
-                result["processed_files"].append(path)
-
-                tracks = data.get("tracks") or data.get("tracklist") or []
-                for i, t in enumerate(tracks, 1):
-                    # Tracklistify exports use `song_name` while older imports may
-                    # still provide `title` – cover both to avoid empty names.
-                    title = t.get("title") or t.get("song_name") or t.get("name")
-
-                    # Prefer explicit start/end fields but gracefully fall back to
-                    # formatted timestamps and durations from Tracklistify exports.
-                    start_raw = (
-                        t.get("start")
-                        or t.get("start_seconds")
-                        or t.get("time_in_mix")
-                    )
-                    end_raw = t.get("end") or t.get("end_seconds")
-
-                    s = _parse_time_to_seconds(start_raw)
-                    if end_raw is not None:
-                        e = _parse_time_to_seconds(end_raw)
-                    else:
-                        duration = t.get("duration")
-                        e = s + _parse_time_to_seconds(duration) if duration else 0.0
-
-                    cur.execute(
-                        """
-                        INSERT INTO tracks (set_id, position, artist, title, confidence, start_time, end_time, flag, beatport_url)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)
-                        """,
-                        (
-                            set_id,
-                            i,
-                            t.get("artist"),
-                            title,
-                            t.get("confidence"),
-                            s,
-                            e,
-                            t.get("beatport_url"),
-                        ),
-                    )
-
-            except Exception as e:
-                result["errors"].append({"file": path, "error": str(e)})
-                print(f"[Importer] Fehler bei {fname}: {e}")
-
-        conn.commit()
-    finally:
-        conn.close()
-
-    if result["processed_files"]:
-        for path in result["processed_files"]:
-            _cleanup_processed_file(path, os.path.basename(path), result["cleanup_actions"])
+    _import_changed(changed, manifest, result, cleanup)
 
     if result["new_set_ids"]:
         result["status"] = "imported"
@@ -209,5 +391,3 @@ def import_json_files(output_dir: str = JSON_OUTPUT_DIR, cleanup: bool = True) -
             result["message"] = "No new files to import (duplicates)."
         else:
             result["message"] = "No new files to import."
-
-    return result["new_set_ids"]
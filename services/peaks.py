@@ -0,0 +1,163 @@
+"""
+Waveform peak files for set audio.
+
+The set audio is decoded once (ffmpeg, mono 16-bit PCM) and reduced to
+min/max pairs with NumPy at several zoom levels; each level is 4x coarser
+than the one before. The result is stored next to the audio as
+`<audio>.peaks`:
+
+    header  "<4sBBHI"  magic b"TLPK", version, level count, 0, sample rate
+    levels  "<III"     samples per peak, peak count, byte offset (per level)
+    data    int8       interleaved (min, max) pairs, level after level
+
+The offsets let a client fetch a single zoom level with a Range request.
+"""
+import os
+import struct
+import subprocess
+import threading
+
+import numpy as np
+
+MAGIC = b"TLPK"
+VERSION = 1
+SAMPLE_RATE = 11025
+# Finest level: 256 samples per peak (~43 peaks per second), then 4x coarser each.
+BASE_SAMPLES_PER_PEAK = 256
+LEVEL_FACTOR = 4
+LEVELS = 4
+READ_SIZE = 1024 * 1024
+PEAKS_SUFFIX = ".peaks"
+
+_HEADER = struct.Struct("<4sBBHI")
+_LEVEL = struct.Struct("<III")
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class PeaksError(Exception):
+    pass
+
+
+def peaks_path(audio_path):
+    return f"{audio_path}{PEAKS_SUFFIX}"
+
+
+def decode_pcm(audio_path, sample_rate=SAMPLE_RATE, cancel_event=None, ffmpeg="ffmpeg"):
+    """Yields the audio as mono int16 NumPy arrays of at most READ_SIZE bytes."""
+    cmd = [ffmpeg, "-v", "error", "-i", audio_path, "-ac", "1", "-ar", str(sample_rate),
+           "-f", "s16le", "-acodec", "pcm_s16le", "-"]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        raise PeaksError("FFmpeg not found")
+    tail = b""
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise PeaksError("Abgebrochen.")
+            data = proc.stdout.read(READ_SIZE)
+            if not data:
+                break
+            data = tail + data
+            usable = len(data) - len(data) % 2
+            tail = data[usable:]
+            yield np.frombuffer(data[:usable], dtype="<i2")
+        if proc.wait() != 0:
+            raise PeaksError(f"FFmpeg could not decode {audio_path}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        proc.stdout.close()
+
+
+def compute_peaks(chunks, samples_per_peak=BASE_SAMPLES_PER_PEAK, levels=LEVELS, factor=LEVEL_FACTOR):
+    """
+    Min/max pairs for every level from an iterable of int16 sample arrays.
+    RÜCKGABE: [(samples_per_peak, mins, maxs), ...] finest first, int8 arrays.
+    """
+    mins, maxs = [], []
+    carry = np.empty(0, dtype=np.int16)
+    for chunk in chunks:
+        samples = np.concatenate((carry, chunk)) if carry.size else chunk
+        full = samples.size - samples.size % samples_per_peak
+        if full:
+            blocks = samples[:full].reshape(-1, samples_per_peak)
+            mins.append(blocks.min(axis=1))
+            maxs.append(blocks.max(axis=1))
+        carry = samples[full:]
+    if carry.size:
+        mins.append(carry.min(keepdims=True))
+        maxs.append(carry.max(keepdims=True))
+    if not mins:
+        raise PeaksError("No audio decoded")
+
+    # int16 -> int8 keeps the shape of the waveform at 1/2 the size
+    lo = (np.concatenate(mins) >> 8).astype(np.int8)
+    hi = (np.concatenate(maxs) >> 8).astype(np.int8)
+    result = [(samples_per_peak, lo, hi)]
+    for _ in range(levels - 1):
+        spp, lo, hi = result[-1]
+        pad = -lo.size % factor
+        if pad:
+            lo = np.concatenate((lo, np.repeat(lo[-1:], pad)))
+            hi = np.concatenate((hi, np.repeat(hi[-1:], pad)))
+        result.append((spp * factor, lo.reshape(-1, factor).min(axis=1), hi.reshape(-1, factor).max(axis=1)))
+    return result
+
+
+def encode_peaks(levels, sample_rate=SAMPLE_RATE):
+    offset = _HEADER.size + _LEVEL.size * len(levels)
+    table, data = [], []
+    for spp, lo, hi in levels:
+        pairs = np.empty(lo.size * 2, dtype=np.int8)
+        pairs[0::2], pairs[1::2] = lo, hi
+        table.append(_LEVEL.pack(spp, lo.size, offset))
+        data.append(pairs.tobytes())
+        offset += pairs.size
+    return _HEADER.pack(MAGIC, VERSION, len(levels), 0, sample_rate) + b"".join(table) + b"".join(data)
+
+
+def read_peaks(path):
+    """Parses a peaks file. RÜCKGABE: {"sample_rate", "levels": [{"samples_per_peak", "min", "max"}]}"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    magic, version, count, _, sample_rate = _HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        raise PeaksError(f"Not a peaks file: {path}")
+    levels = []
+    for i in range(count):
+        spp, n, offset = _LEVEL.unpack_from(raw, _HEADER.size + i * _LEVEL.size)
+        pairs = np.frombuffer(raw, dtype=np.int8, count=n * 2, offset=offset)
+        levels.append({"samples_per_peak": spp, "min": pairs[0::2], "max": pairs[1::2]})
+    return {"sample_rate": sample_rate, "levels": levels}
+
+
+def is_current(audio_path):
+    path = peaks_path(audio_path)
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(audio_path)
+    except OSError:
+        return False
+
+
+def generate_peaks(audio_path, cancel_event=None, ffmpeg="ffmpeg", force=False):
+    """Writes <audio>.peaks (atomically) unless an up-to-date one exists; returns its path."""
+    path = peaks_path(audio_path)
+    with _locks_guard:
+        lock = _locks.setdefault(path, threading.Lock())
+    with lock:
+        if not force and is_current(audio_path):
+            return path
+        levels = compute_peaks(decode_pcm(audio_path, cancel_event=cancel_event, ffmpeg=ffmpeg))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(encode_peaks(levels))
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return path
@@ -0,0 +1,134 @@
+"""
+Background prefetch of stream URLs for the set that was just opened.
+
+When the UI loads a set's tracks, their stream URLs are resolved in the
+background and written to stream_cache, so the play click is a cache hit
+instead of a live YouTube search. Prefetching is low priority: it uses a
+small number of workers, and a worker only starts a resolution while the
+yt-dlp pool's race slots have room for one next to interactive lookups.
+"""
+import os
+import threading
+import time
+import logging
+from collections import deque
+
+from services.resolver import AudioResolver
+from services.ytdlp_pool import get_pool
+from services.stream_cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("TRACKLISTIFY_PREFETCH", "1") != "0"
+PREFETCH_WORKERS = int(os.getenv("TRACKLISTIFY_PREFETCH_WORKERS", "1"))
+# Only the first tracks of a set; they are the ones most likely to be played.
+PREFETCH_PER_SET = int(os.getenv("TRACKLISTIFY_PREFETCH_PER_SET", "25"))
+# One resolution races three searches; leave at least as many for clicks.
+SEARCHES_PER_TRACK = 3
+IDLE_WAIT = 0.25
+
+
+def _pool_has_room():
+    return get_pool().race_headroom(2 * SEARCHES_PER_TRACK)
+
+
+def _is_fresh(track_id):
+    # Same rule as the stream cache: an entry close to its expiry still gets
+    # resolved, which serves it and schedules its background refresh.
+    return get_cache().track_is_fresh(track_id)
+
+
+class StreamPrefetcher:
+    """
+    Queue of track ids to resolve. Only the most recently opened set is
+    queued: opening another set drops whatever of the previous one has not
+    started yet, so the queue never holds more than per_set tracks. Tracks
+    already cached or being resolved are skipped.
+    """
+
+    def __init__(self, resolve=AudioResolver.resolve_track, is_cached=_is_fresh,
+                 has_room=_pool_has_room, workers=PREFETCH_WORKERS, per_set=PREFETCH_PER_SET):
+        self.resolve = resolve
+        self.is_cached = is_cached
+        self.has_room = has_room
+        self.workers = max(1, workers)
+        self.per_set = per_set
+        self._queue = deque()
+        self._queued = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self.stats = {"queued": 0, "dropped": 0, "resolved": 0, "cached": 0, "missed": 0, "errors": 0}
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"stream-prefetch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def prefetch(self, track_ids):
+        """Queues the tracks of an opened set; returns how many were added."""
+        ids = [tid for tid in track_ids if tid is not None][:self.per_set]
+        with self._cond:
+            # The previous set is no longer on screen; what is left of it goes
+            self._queued.difference_update(self._queue)
+            self.stats["dropped"] += len(self._queue)
+            self._queue.clear()
+            fresh = [tid for tid in dict.fromkeys(ids) if tid not in self._queued]
+            self._queue.extend(fresh)
+            self._queued.update(fresh)
+            self.stats["queued"] += len(fresh)
+            if fresh:
+                self._ensure_workers()
+                self._cond.notify_all()
+        return len(fresh)
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _next(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            return self._queue.popleft()
+
+    def _worker(self):
+        while True:
+            track_id = self._next()
+            try:
+                if self.is_cached(track_id):
+                    self.stats["cached"] += 1
+                    continue
+                while not self.has_room():
+                    time.sleep(IDLE_WAIT)
+                if self.resolve(track_id):
+                    self.stats["resolved"] += 1
+                else:
+                    self.stats["missed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning("Prefetch failed for track %s: %s", track_id, e)
+            finally:
+                with self._cond:
+                    self._queued.discard(track_id)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = StreamPrefetcher()
+        return _prefetcher
+
+
+def prefetch_set(tracks):
+    """Hook for the set-tracks route; `tracks` are the rows it returns."""
+    if not PREFETCH_ENABLED or not tracks:
+        return 0
+    return get_prefetcher().prefetch([t.get("id") for t in tracks])
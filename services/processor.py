@@ -1,12 +1,13 @@
 import os
 import sys
+import asyncio
 import subprocess
 import logging
-import yt_dlp
 from threading import Event
 from config import DOWNLOAD_DIR
 from services import importer
 from services import enrichment
+from services.ytdlp_pool import get_pool
 import database
 
 
@@ -16,14 +17,120 @@ class JobCancelled(Exception):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# "inprocess" runs Tracklistify's AsyncApp.analyze() in this process and imports
+# the returned tracks directly. "daemon" sends the file to a resident
+# `tracklistify-server` (TRACKLISTIFY_ANALYSIS_SERVER) - isolated, but warm.
+# "subprocess" keeps `python -m tracklistify` per job and imports its JSON output.
+# Only process_job() uses these modes; the web app's job queue (job_manager)
+# analyses with services.analyzer.scan_dj_set.
+ANALYSIS_MODE = os.getenv("TRACKLISTIFY_ANALYSIS_MODE", "inprocess")
+
 def resolve_audio_stream_url(query):
-    cmd = ["yt-dlp", "-f", "bestaudio", "-g", "--no-playlist", f"ytsearch1:{query}"]
+    return get_pool().stream_url(f"ytsearch1:{query}", timeout=8)
+
+def _fail_analysis(job, message):
+    job.phase = "error"
+    job.status = "failed"
+    job.error = message
+    job.log_msg(job.error)
+    raise RuntimeError(job.error)
+
+def _analyze_subprocess(job, file_path, check_cancel):
+    """Isolation mode: runs `python -m tracklistify` and imports its JSON output. RÜCKGABE: neue Set-IDs."""
+    cmd_ana = [sys.executable, "-m", "tracklistify", file_path]
+    proc_ana = subprocess.Popen(cmd_ana, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='ignore')
+
+    analyzer_output = []
+    for line in proc_ana.stdout:
+        check_cancel(proc_ana)
+        l = line.strip()
+        if l:
+            analyzer_output.append(l)
+            print(f"[Tracklistify] {l}")
+            if "Identifying" in l or "Found" in l:
+                job.log_msg(l)
+                if job.progress < 90: job.progress += 2
+
+    proc_ana.wait()
+
+    if proc_ana.returncode != 0:
+        _fail_analysis(job, f"Analyzer exited with code {proc_ana.returncode}")
+
+    job.phase = "importing"
+    job.log_msg("Datenbank Import...")
+
+    check_cancel()
+
+    result = importer.import_json_files()
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict) and isinstance(result.get("new_set_ids"), list):
+        return result.get("new_set_ids", [])
+    return []
+
+def _analyze_in_process(job, file_path, check_cancel):
+    """Runs AsyncApp.analyze() in this process and imports its tracks directly. RÜCKGABE: neue Set-IDs."""
+    # Imported lazily: only analysis workers need the Tracklistify stack.
+    from tracklistify.config.factory import get_config
+    from tracklistify.core.base import AsyncApp
+
+    def on_progress(stage, progress, message):
+        # Raising JobCancelled here aborts the analysis between segments.
+        check_cancel()
+        _report_progress(job, stage, progress, message)
+
+    async def run():
+        app = AsyncApp(config=get_config())
+        try:
+            return await app.analyze(file_path, progress_callback=on_progress)
+        finally:
+            await app.cleanup()
+            app.executor.shutdown(wait=False)
+
+    result = asyncio.run(run())
+    data = {
+        "mix_info": result.mix_info,
+        "tracks": [
+            {
+                "song_name": t.song_name,
+                "artist": t.artist,
+                "time_in_mix": t.time_in_mix,
+                "confidence": t.confidence,
+                "duration": getattr(t, "duration", None),
+            }
+            for t in result.tracks
+        ],
+    }
+    return _import_analysis(job, data, result.segment_count, file_path, check_cancel)
+
+def _analyze_daemon(job, file_path, check_cancel):
+    """Analysis on the resident tracklistify-server; closing the connection cancels it. RÜCKGABE: neue Set-IDs."""
+    from tracklistify.client import AnalysisClient, AnalysisServerError
+
     try:
-        res = subprocess.run(cmd, capture_output=True, text=True, timeout=8, encoding='utf-8', errors='ignore')
-        if res.returncode == 0 and res.stdout.strip().startswith("http"):
-            return res.stdout.strip()
-    except: pass
-    return None
+        result = AnalysisClient().analyze(
+            file_path,
+            on_progress=lambda stage, progress, message: _report_progress(job, stage, progress, message),
+            check=check_cancel,
+        )
+    except AnalysisServerError as e:
+        _fail_analysis(job, f"Analysis server: {e}")
+    return _import_analysis(job, result, result.get("segment_count", 0), file_path, check_cancel)
+
+def _report_progress(job, stage, progress, message):
+    if stage == "identify":
+        job.progress = round(progress * 90, 1)
+    job.log_msg(message)
+
+def _import_analysis(job, data, segment_count, file_path, check_cancel):
+    if not data.get("tracks"):
+        _fail_analysis(job, f"Analyzer found no tracks in {segment_count} segments")
+
+    job.phase = "importing"
+    job.log_msg("Datenbank Import...")
+
+    check_cancel()
+    return [importer.import_tracklist_data(data, audio_file=file_path)]
 
 def process_job(job, cancel_event: Event | None = None):
     temp_filename = f"{job.id}"
@@ -71,47 +178,17 @@ def process_job(job, cancel_event: Event | None = None):
 
         print(f"File Path: {file_path}") 
 
-        # 2. ANALYSE
+        # 2. ANALYSE + 3. IMPORT
         job.phase = "analyzing"
         job.progress = 0
         job.log_msg("Starte Analyse...")
 
-        cmd_ana = [sys.executable, "-m", "tracklistify", file_path]
-        proc_ana = subprocess.Popen(cmd_ana, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='ignore')
-
-        analyzer_output = []
-        for line in proc_ana.stdout:
-            _check_cancel(proc_ana)
-            l = line.strip()
-            if l:
-                analyzer_output.append(l)
-                print(f"[Tracklistify] {l}")
-                if "Identifying" in l or "Found" in l:
-                    job.log_msg(l)
-                    if job.progress < 90: job.progress += 2
-
-        proc_ana.wait()
-        
-        if proc_ana.returncode != 0:
-            job.phase = "error"
-            job.status = "failed"
-            job.error = f"Analyzer exited with code {proc_ana.returncode}"
-            job.log_msg(job.error)
-            raise RuntimeError(job.error)
-
-        # 3. IMPORT
-        job.phase = "importing"
-        job.log_msg("Datenbank Import...")
-
-        _check_cancel()
-
-        result = importer.import_json_files()
-        new_ids = []
-
-        if isinstance(result, list):
-            new_ids = result
-        elif isinstance(result, dict) and isinstance(result.get("new_set_ids"), list):
-            new_ids = result.get("new_set_ids", [])
+        if ANALYSIS_MODE == "subprocess":
+            new_ids = _analyze_subprocess(job, file_path, _check_cancel)
+        elif ANALYSIS_MODE == "daemon":
+            new_ids = _analyze_daemon(job, file_path, _check_cancel)
+        else:
+            new_ids = _analyze_in_process(job, file_path, _check_cancel)
 
         count = len(new_ids)
         if count:
@@ -0,0 +1,119 @@
+"""
+Compact streaming renditions of imported sets.
+
+Set audio is kept as downloaded or uploaded (often 320k MP3 or m4a). With
+TRACKLISTIFY_RENDITIONS=1 every import also gets an Opus rendition
+(`<audio>.stream.opus`, TRACKLISTIFY_RENDITION_BITRATE, default 80k) for
+listeners on slow links. Transcodes run in a small process pool so they use
+their own cores and never block request threads; /api/stream serves the
+rendition when asked for it (see choose_stream_file).
+
+Kept free of app imports: the pool starts its workers with "spawn", which
+re-imports this module in each worker.
+"""
+import multiprocessing
+import os
+import subprocess
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_ENABLED = os.getenv("TRACKLISTIFY_RENDITIONS", "0") == "1"
+RENDITION_BITRATE = os.getenv("TRACKLISTIFY_RENDITION_BITRATE", "80k")
+RENDITION_WORKERS = int(os.getenv("TRACKLISTIFY_RENDITION_WORKERS", "1"))
+RENDITION_SUFFIX = ".stream.opus"
+RENDITION_MIMETYPE = "audio/ogg"
+# ?quality= values
+QUALITY_LOW = ("low", "opus")
+QUALITY_ORIGINAL = ("original", "high")
+
+_pool = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def rendition_path(audio_path):
+    return f"{audio_path}{RENDITION_SUFFIX}"
+
+
+def is_current(audio_path):
+    try:
+        return os.path.getmtime(rendition_path(audio_path)) >= os.path.getmtime(audio_path)
+    except OSError:
+        return False
+
+
+def transcode(audio_path, bitrate=RENDITION_BITRATE, ffmpeg="ffmpeg"):
+    """Runs in a pool worker. Writes the rendition atomically and returns its path."""
+    dest = rendition_path(audio_path)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    cmd = [ffmpeg, "-v", "error", "-y", "-i", audio_path, "-vn", "-ac", "2",
+           "-c:a", "libopus", "-b:a", bitrate, "-vbr", "on", "-application", "audio", "-f", "ogg", tmp]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dest
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=max(1, RENDITION_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _done(audio_path, future):
+    with _lock:
+        _pending.pop(audio_path, None)
+    error = future.exception()
+    if error:
+        logger.warning("Rendition of %s failed: %s", audio_path, error)
+    else:
+        print(f"[Renditions] Ready: {future.result()}")
+
+
+def queue_rendition(audio_path, ffmpeg="ffmpeg"):
+    """Schedules the transcode of a freshly imported set; returns the Future or None."""
+    if not RENDITIONS_ENABLED or not audio_path or is_current(audio_path):
+        return None
+    with _lock:
+        if audio_path in _pending:
+            return _pending[audio_path]
+        future = _get_pool().submit(transcode, audio_path, RENDITION_BITRATE, ffmpeg)
+        _pending[audio_path] = future
+    future.add_done_callback(lambda f: _done(audio_path, f))
+    return future
+
+
+def remove_rendition(audio_path):
+    try:
+        os.remove(rendition_path(audio_path))
+    except FileNotFoundError:
+        pass
+
+
+def choose_stream_file(audio_path, quality=None, accept=None, original_mimetype=None):
+    """
+    (path, negotiated) for /api/stream. ?quality=low|original wins; otherwise the
+    rendition is used only if the Accept header (a werkzeug MIMEAccept) ranks
+    audio/ogg above the original's type. Falls back to the original whenever no
+    current rendition exists.
+    """
+    quality = (quality or "").lower()
+    if quality in QUALITY_ORIGINAL or not is_current(audio_path):
+        return audio_path, False
+    if quality in QUALITY_LOW:
+        return rendition_path(audio_path), False
+    if accept is not None and original_mimetype:
+        best = accept.best_match([original_mimetype, RENDITION_MIMETYPE])
+        if best == RENDITION_MIMETYPE and accept[RENDITION_MIMETYPE] > accept[original_mimetype]:
+            return rendition_path(audio_path), True
+    return audio_path, accept is not None
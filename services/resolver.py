@@ -1,24 +1,88 @@
-import subprocess
+import os
+import threading
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import database
+from services.ytdlp_pool import get_pool
+from services.stream_cache import get_cache
 
 logger = logging.getLogger(__name__)
 
+# Per-search hard limit, and how long a hit from a lower-ranked query waits
+# for the better-ranked ones still running before it is taken.
+SEARCH_TIMEOUT = 15
+PREFERENCE_WINDOW = float(os.getenv("TRACKLISTIFY_RESOLVER_WINDOW", "1.5"))
+
+# Shared by all Flask threads: three searches per cold click.
+_search_pool = ThreadPoolExecutor(max_workers=12, thread_name_prefix="resolver")
+
+
+def _search_stream(query, cancel_event):
+    """
+    One YouTube search on the shared yt-dlp pool; returns the bestaudio stream URL or None.
+    Runs in the pool's race slots, so searches that lose a race and keep
+    extracting can never take the slots other lookups need.
+    """
+    return get_pool().stream_url(f"ytsearch1:{query}", timeout=SEARCH_TIMEOUT,
+                                 cancel_event=cancel_event, race=True)
+
+
+def race_queries(queries, search=_search_stream, window=PREFERENCE_WINDOW, timeout=SEARCH_TIMEOUT):
+    """
+    Runs all queries at once; `queries` is in preference order.
+    Returns the best-ranked hit: immediately if nothing better is still running,
+    otherwise after at most `window` seconds from the first hit. Searches that
+    are no longer needed are cancelled; one that is already extracting keeps
+    its race slot until yt-dlp returns.
+    """
+    cancel_event = threading.Event()
+    futures = {_search_pool.submit(search, q, cancel_event): rank for rank, q in enumerate(queries)}
+    pending = set(futures)
+    hits = {}
+    deadline = time.monotonic() + timeout
+    try:
+        while pending:
+            if hits and all(futures[f] > min(hits) for f in pending):
+                break  # nothing better can arrive
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, remaining, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    url = f.result()
+                except Exception as e:
+                    print(f"[Resolver] Error on query '{queries[futures[f]]}': {e}")
+                    continue
+                if url:
+                    hits[futures[f]] = url
+                    deadline = min(deadline, time.monotonic() + window)
+    finally:
+        cancel_event.set()
+        for f in pending:
+            f.cancel()
+    if not hits:
+        return None
+    best = min(hits)
+    print(f"[Resolver] Using '{queries[best]}' ({len(hits)} of {len(queries)} searches answered)")
+    return hits[best]
+
+
 class AudioResolver:
     """
     High-Performance Audio Resolver.
-    Layer 1: Database Cache (Instant)
-    Layer 2: YouTube Search (Topic -> Official -> General)
+    Layer 1: Stream URL Cache (Instant, shared via stream_cache)
+    Layer 2: YouTube Search (Topic, Official and General raced in parallel, ranked in that order)
     """
 
     @staticmethod
     def resolve_track(track_id):
-        # 1. CHECK CACHE (The Speed Layer)
-        cached_url = database.get_cached_stream(track_id)
-        if cached_url:
-            print(f"[Resolver] Cache Hit for Track {track_id}")
-            return cached_url
+        # 1. CACHE (The Speed Layer) - expiry-aware, refreshed ahead of time
+        return get_cache().get_track(track_id, lambda: AudioResolver.search_track(track_id))
 
+    @staticmethod
+    def search_track(track_id):
         # 2. FETCH METADATA
         conn = database.get_conn()
         row = conn.execute("SELECT artist, title FROM tracks WHERE id = ?", (track_id,)).fetchone()
@@ -29,54 +93,16 @@ class AudioResolver:
 
         artist = row['artist'] or ""
         title = row['title'] or ""
-        
+
         # 3. PERFORM SMART SEARCH
-        # We search for "Topic" first (Highest Quality / Official)
+        # "Topic" ranks first (Highest Quality / Official); all three run at once.
         queries = [
             f"{artist} - {title} Topic",
             f"{artist} - {title} Official Audio",
             f"{artist} - {title}"
         ]
-
-        stream_url = None
-
-        for query in queries:
-            try:
-                print(f"[Resolver] Searching: '{query}'")
-                # Using bestaudio and getting the direct stream URL (-g)
-                cmd = [
-                    "yt-dlp", 
-                    "-f", "bestaudio", 
-                    "-g", 
-                    "--no-playlist", 
-                    "--geo-bypass",  # Bypass country blocks
-                    f"ytsearch1:{query}"
-                ]
-                
-                # Run with timeout to prevent hanging threads
-                res = subprocess.run(
-                    cmd, 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=15, 
-                    encoding='utf-8', 
-                    errors='ignore'
-                )
-
-                if res.returncode == 0:
-                    url = res.stdout.strip()
-                    if url.startswith("http"):
-                        stream_url = url
-                        break # Found it!
-            
-            except Exception as e:
-                print(f"[Resolver] Error on query '{query}': {e}")
-                continue
-
-        # 4. UPDATE CACHE
+        print(f"[Resolver] Searching: {queries}")
+        stream_url = race_queries(queries)
         if stream_url:
-            print(f"[Resolver] Found & Cached: {stream_url[:50]}...")
-            database.save_cached_stream(track_id, stream_url)
-            return stream_url
-        
-        return None
\ No newline at end of file
+            print(f"[Resolver] Found: {stream_url[:50]}...")
+        return stream_url
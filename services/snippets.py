@@ -0,0 +1,152 @@
+"""
+Short, low-bitrate preview snippets of identified tracks.
+
+A snippet is cut from the set audio at the track's start_time and lasts
+SNIPPET_SECONDS (less if the track ends earlier). Files are named after the
+track id and the start time, so moving a track's start creates a new snippet
+and an existing file never changes - /snippets/ can be cached forever.
+
+SNIPPET_DIR is an LRU cache bounded by SNIPPET_CACHE_BYTES: serving a
+snippet touches its mtime, and writing a new one evicts the least recently
+used files once the limit is exceeded.
+"""
+import os
+import subprocess
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from config import SNIPPET_DIR
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_SECONDS = float(os.getenv("TRACKLISTIFY_SNIPPET_SECONDS", "30"))
+SNIPPET_BITRATE = os.getenv("TRACKLISTIFY_SNIPPET_BITRATE", "64k")
+SNIPPET_CACHE_BYTES = int(os.getenv("TRACKLISTIFY_SNIPPET_CACHE_MB", "512")) * 1024 * 1024
+SNIPPETS_AFTER_IMPORT = os.getenv("TRACKLISTIFY_SNIPPETS_AFTER_IMPORT", "1") != "0"
+SNIPPET_EXT = ".mp3"
+SNIPPET_MAX_AGE = 365 * 24 * 3600
+FFMPEG_TIMEOUT = 60
+
+# Striped per-name locks: a fixed set, so they do not pile up per snippet.
+_LOCK_STRIPES = 64
+_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+_prune_lock = threading.Lock()
+# Bulk generation after import: one ffmpeg at a time, behind interactive requests.
+_bulk_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snippets")
+
+
+class SnippetError(Exception):
+    pass
+
+
+def snippet_window(start_time, end_time=None, seconds=SNIPPET_SECONDS):
+    """(start, duration) of the preview for a track starting at start_time."""
+    start = max(0.0, float(start_time or 0))
+    duration = seconds
+    if end_time is not None and float(end_time) > start:
+        duration = min(duration, float(end_time) - start)
+    return start, duration
+
+
+def snippet_name(track_id, start_time):
+    return f"{int(track_id)}_{int(round(float(start_time or 0) * 1000))}{SNIPPET_EXT}"
+
+
+def cut_snippet(audio_path, dest, start, duration, ffmpeg="ffmpeg"):
+    tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+    cmd = [ffmpeg, "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", audio_path,
+           "-vn", "-ac", "2", "-c:a", "libmp3lame", "-b:a", SNIPPET_BITRATE, "-f", "mp3", tmp]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=FFMPEG_TIMEOUT)
+        os.replace(tmp, dest)
+    except FileNotFoundError:
+        raise SnippetError("FFmpeg not found")
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        raise SnippetError(f"Snippet konnte nicht erstellt werden: {e}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def prune_cache(max_bytes=SNIPPET_CACHE_BYTES, directory=SNIPPET_DIR):
+    """Deletes least recently used snippets until the directory fits max_bytes; returns files removed."""
+    with _prune_lock:
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(SNIPPET_EXT):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def ensure_snippet(track_id, directory=SNIPPET_DIR, cut=cut_snippet):
+    """File name (inside directory) of the track's snippet, cut on first use."""
+    source = database.get_track_snippet_source(track_id)
+    if not source:
+        raise SnippetError("Track not found")
+    if not source["audio_file"] or not os.path.exists(source["audio_file"]):
+        raise SnippetError("Audio file missing")
+
+    name = snippet_name(track_id, source["start_time"])
+    path = os.path.join(directory, name)
+    with _locks[hash(name) % _LOCK_STRIPES]:
+        if os.path.exists(path):
+            os.utime(path)  # LRU: mark as recently used
+            return name
+        start, duration = snippet_window(source["start_time"], source["end_time"])
+        cut(source["audio_file"], path, start, duration)
+    prune_cache(directory=directory)
+    return name
+
+
+def remove_snippets(track_ids, directory=None):
+    """Deletes every snippet of the given tracks (any start time); returns files removed."""
+    directory = directory or SNIPPET_DIR
+    prefixes = tuple(f"{int(tid)}_" for tid in track_ids)
+    if not prefixes:
+        return 0
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        if entry.name.startswith(prefixes) and entry.name.endswith(SNIPPET_EXT):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _generate_set(track_ids):
+    started = time.perf_counter()
+    made = 0
+    for track_id in track_ids:
+        try:
+            ensure_snippet(track_id)
+            made += 1
+        except Exception as e:
+            logger.warning("Snippet for track %s failed: %s", track_id, e)
+    print(f"[Snippets] {made}/{len(track_ids)} snippets in {time.perf_counter() - started:.1f}s")
+
+
+def queue_set(track_ids):
+    """Bulk-generates snippets for freshly imported tracks in the background."""
+    if SNIPPETS_AFTER_IMPORT and track_ids:
+        _bulk_pool.submit(_generate_set, list(track_ids))
@@ -0,0 +1,139 @@
+"""
+Expiry-aware stream URL cache, shared by all worker processes.
+
+Entries live in the stream_cache table, keyed "track:<id>" (resolver) or
+"query:<normalised query>" (/api/resolve_audio). Each entry expires when its
+URL does: googlevideo links carry an `expire` timestamp, signed CDN links an
+`Expires` one; only URLs without either get database.STREAM_DEFAULT_TTL.
+
+An entry that gets close to its expiry is still served, but re-resolved in the
+background, so a click never waits for a search because a link went stale.
+"""
+import os
+import re
+import time
+import threading
+import logging
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Stop handing out a URL this long before it dies (the player still has to start).
+EXPIRY_MARGIN = 300
+# Re-resolve in the background once an entry is this close to EXPIRY_MARGIN.
+REFRESH_AHEAD = int(os.getenv("TRACKLISTIFY_STREAM_REFRESH_AHEAD", "1800"))
+
+_EXPIRY_PARAMS = ("expire", "expires", "exp")
+_PATH_EXPIRY_RE = re.compile(r"/expire/(\d{9,})(?:/|$)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def url_expiry(url):
+    """Unix timestamp at which a signed stream URL stops working, or None."""
+    if not url:
+        return None
+    parsed = urllib.parse.urlsplit(url)
+    params = {k.lower(): v for k, v in urllib.parse.parse_qsl(parsed.query)}
+    for name in _EXPIRY_PARAMS:
+        value = params.get(name)
+        if value and value.isdigit():
+            return float(value)
+    # Manifest URLs put their parameters in the path: .../expire/1700000000/...
+    match = _PATH_EXPIRY_RE.search(parsed.path)
+    return float(match.group(1)) if match else None
+
+
+def query_key(query):
+    return "query:" + _SPACE_RE.sub(" ", query.strip().lower())
+
+
+class StreamUrlCache:
+    def __init__(self, refresh_ahead=REFRESH_AHEAD, margin=EXPIRY_MARGIN, refresh_workers=2):
+        self.refresh_ahead = refresh_ahead
+        self.margin = margin
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="stream-refresh")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
+    def _lookup(self, key, track_id):
+        """(url, seconds until it must be replaced) for a usable entry, else (None, 0)."""
+        entry = database.get_stream_cache_entry(key, track_id=track_id)
+        if not entry:
+            return None, 0
+        remaining = entry["expires_at"] - self.margin - time.time()
+        if remaining <= 0:
+            return None, 0
+        return entry["stream_url"], remaining
+
+    def is_fresh(self, key, track_id=None):
+        """True if key has an entry that get() would serve without refreshing it."""
+        url, remaining = self._lookup(key, track_id)
+        return bool(url) and remaining >= self.refresh_ahead
+
+    def _store(self, key, url, track_id):
+        database.save_stream_cache_entry(key, url, url_expiry(url), track_id=track_id)
+
+    def get(self, key, resolve, track_id=None):
+        """
+        Cached URL for key, or resolve() (stored on success).
+        Entries within refresh_ahead of their expiry are refreshed in the background.
+        """
+        url, remaining = self._lookup(key, track_id)
+        if url:
+            self.stats["hits"] += 1
+            if remaining < self.refresh_ahead:
+                self._refresh_later(key, resolve, track_id)
+            return url
+        self.stats["misses"] += 1
+        url = resolve()
+        if url:
+            self._store(key, url, track_id)
+        return url
+
+    def _refresh_later(self, key, resolve, track_id):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, resolve, track_id)
+
+    def _refresh(self, key, resolve, track_id):
+        try:
+            # Another process may have refreshed it in the meantime.
+            _, remaining = self._lookup(key, track_id)
+            if remaining >= self.refresh_ahead:
+                return
+            url = resolve()
+            if url:
+                self._store(key, url, track_id)
+                self.stats["refreshes"] += 1
+        except Exception as e:
+            logger.warning("Stream refresh failed for %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_track(self, track_id, resolve):
+        return self.get(database.track_stream_key(track_id), resolve, track_id=track_id)
+
+    def track_is_fresh(self, track_id):
+        return self.is_fresh(database.track_stream_key(track_id), track_id=track_id)
+
+    def get_query(self, query, resolve):
+        return self.get(query_key(query), resolve)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = StreamUrlCache()
+        return _cache
@@ -0,0 +1,219 @@
+"""
+Shared pool of warm, in-process yt_dlp.YoutubeDL instances.
+
+Stream-URL and search lookups used to start a fresh `yt-dlp` process per
+query and paid interpreter start-up plus extractor initialisation every time.
+The pool keeps initialised YoutubeDL objects (and with them their HTTP
+connections and cookies) per option profile and hands each one to a single
+thread at a time, since YoutubeDL itself is not thread-safe.
+"""
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv("TRACKLISTIFY_YTDLP_POOL_SIZE", "8"))
+# Slots raced (abandonable) searches may occupy at most; the rest stay free
+# for stream lookups, metadata imports and enrichment.
+RACE_SLOTS = int(os.getenv("TRACKLISTIFY_YTDLP_RACE_SLOTS", "6"))
+DEFAULT_TIMEOUT = 15
+POLL_INTERVAL = 0.05
+# Recycle instances now and then so per-instance caches cannot grow forever.
+MAX_USES = 500
+
+_BASE_OPTS = {
+    "quiet": True,
+    "no_warnings": True,
+    "skip_download": True,
+    "noplaylist": True,
+    "socket_timeout": DEFAULT_TIMEOUT,
+}
+
+# Option profiles; every profile has its own set of warm instances.
+PROFILES = {
+    # Direct audio stream URL (what `yt-dlp -f bestaudio -g --geo-bypass` printed).
+    "stream": {"format": "bestaudio", "geo_bypass": True},
+    # Listing/metadata only, no format resolution (searches, profile lookups).
+    "flat": {"extract_flat": True},
+    # Single-video metadata for the import form.
+    "metadata": {
+        "extract_flat": True,
+        "extractor_args": {"youtube": {"player_client": ["android"]}},
+        "http_headers": {
+            "User-Agent": (
+                "Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36 "
+                "(KHTML, like Gecko) Chrome/114.0.0.0 Mobile Safari/537.36"
+            )
+        },
+    },
+}
+
+
+class ExtractorTimeout(Exception):
+    pass
+
+
+class YDLPool:
+    """
+    At most `size` extractions run at once; callers beyond that wait for a
+    slot. A call's timeout starts once it has a slot, so time spent queueing
+    behind other lookups does not count against it. An extraction cannot be
+    interrupted: a call that times out or is cancelled returns to its caller
+    at once, but the extraction keeps its slot until yt-dlp returns (bounded
+    by socket_timeout).
+
+    Raced calls (race=True, e.g. the resolver's parallel searches) are given
+    up on routinely, so they are admitted only while fewer than `race_slots`
+    of them are still extracting - abandoned ones included. However many
+    searches lose a race, at least size - race_slots slots stay free for
+    everything else.
+    """
+
+    def __init__(self, size=POOL_SIZE, race_slots=RACE_SLOTS):
+        self.size = max(1, size)
+        self.race_slots = max(1, min(race_slots, self.size - 1)) if self.size > 1 else 1
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="ytdlp")
+        self._idle = {name: queue.LifoQueue() for name in PROFILES}
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._race_cond = threading.Condition(self._lock)
+        self.racing = 0
+        self.stats = {"created": 0, "reused": 0, "calls": 0, "timeouts": 0, "errors": 0}
+
+    def _checkout(self, profile):
+        try:
+            ydl = self._idle[profile].get_nowait()
+            with self._lock:
+                self.stats["reused"] += 1
+            return ydl
+        except queue.Empty:
+            pass
+        ydl = yt_dlp.YoutubeDL({**_BASE_OPTS, **PROFILES[profile]})
+        with self._lock:
+            self.stats["created"] += 1
+            self._uses[id(ydl)] = 0
+        return ydl
+
+    def _checkin(self, profile, ydl):
+        with self._lock:
+            uses = self._uses.get(id(ydl), 0) + 1
+            self._uses[id(ydl)] = uses
+            if uses >= MAX_USES:
+                self._uses.pop(id(ydl), None)
+                recycle = True
+            else:
+                recycle = False
+        if recycle:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+        else:
+            self._idle[profile].put(ydl)
+
+    def _run(self, target, profile, started, race):
+        started.append(time.monotonic())
+        try:
+            ydl = self._checkout(profile)
+            try:
+                return ydl.extract_info(target, download=False)
+            finally:
+                self._checkin(profile, ydl)
+        finally:
+            if race:
+                self._release_race_slot()
+
+    def _acquire_race_slot(self, cancel_event):
+        """Waits for a free race slot; False if cancel_event was set first."""
+        with self._race_cond:
+            while self.racing >= self.race_slots:
+                if cancel_event is not None and cancel_event.is_set():
+                    return False
+                self._race_cond.wait(POLL_INTERVAL)
+            self.racing += 1
+            return True
+
+    def _release_race_slot(self):
+        with self._race_cond:
+            self.racing -= 1
+            self._race_cond.notify()
+
+    def race_headroom(self, slots):
+        """True if `slots` raced calls could start right now without waiting."""
+        with self._lock:
+            return self.racing + slots <= self.race_slots
+
+    def extract(self, target, profile="flat", timeout=DEFAULT_TIMEOUT, cancel_event=None, race=False):
+        """
+        extract_info(target, download=False) on a warm instance of `profile`.
+        Raises ExtractorTimeout once it has run for `timeout` seconds, returns
+        None if cancel_event is set first, and re-raises yt-dlp errors.
+        race=True admits the call through the bounded race slots.
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown yt-dlp profile: {profile}")
+        with self._lock:
+            self.stats["calls"] += 1
+        if race and not self._acquire_race_slot(cancel_event):
+            return None
+        started = []
+        future = self._executor.submit(self._run, target, profile, started, race)
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if not started:
+                    # Still queued for a slot
+                    remaining = POLL_INTERVAL
+                else:
+                    remaining = started[0] + timeout - time.monotonic()
+                    if remaining <= 0:
+                        with self._lock:
+                            self.stats["timeouts"] += 1
+                        raise ExtractorTimeout(f"yt-dlp timed out after {timeout}s: {target}")
+                wait = remaining if cancel_event is None else min(remaining, POLL_INTERVAL)
+                try:
+                    return future.result(timeout=wait)
+                except FutureTimeout:
+                    continue
+        except (ExtractorTimeout, FutureTimeout):
+            raise
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            # No-op once running; drops it if still queued, and then _run()
+            # never gets to hand back its race slot.
+            if future.cancel() and race:
+                self._release_race_slot()
+
+    def stream_url(self, target, timeout=DEFAULT_TIMEOUT, cancel_event=None, race=False):
+        """Direct bestaudio URL for a video URL or a `ytsearch1:` query, or None."""
+        try:
+            info = self.extract(target, "stream", timeout=timeout, cancel_event=cancel_event, race=race)
+        except Exception as e:
+            logger.debug("yt-dlp stream lookup failed for %s: %s", target, e)
+            return None
+        if info and info.get("entries") is not None:
+            info = next((e for e in info["entries"] if e), None)
+        url = (info or {}).get("url") or ""
+        return url if url.startswith("http") else None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = YDLPool()
+        return _pool
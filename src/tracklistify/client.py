@@ -0,0 +1,145 @@
+"""
+Blocking client for the resident analysis server (``tracklistify.server``).
+
+Only uses the standard library, so web and job processes can talk to a warm
+analysis server without importing the Tracklistify provider stack.
+
+Wire protocol: one request per connection. The client sends a single JSON line
+(``{"op": "analyze", "input": ...}`` or ``{"op": "ping"}``); the server answers
+with JSON lines (``accepted``, ``progress``...) and ends with ``result``,
+``pong`` or ``error``. Closing the connection cancels a running analysis.
+"""
+
+# Standard library imports
+import json
+import os
+import socket
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+ENV_ADDRESS = "TRACKLISTIFY_ANALYSIS_SERVER"
+
+Address = Tuple[str, Union[str, Tuple[str, int]]]
+
+
+class AnalysisServerError(Exception):
+    """Raised when the server reports an error or the connection breaks."""
+
+
+def get_server_address() -> str:
+    """Server address from TRACKLISTIFY_ANALYSIS_SERVER, or the localhost default."""
+    return os.getenv(ENV_ADDRESS) or DEFAULT_ADDRESS
+
+
+def parse_address(address: str) -> Address:
+    """Parse ``unix:/path/to.sock``, ``tcp://host:port`` or ``host:port``.
+
+    Returns:
+        ("unix", path) or ("tcp", (host, port))
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:") :]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://") :]
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid analysis server address: {address!r}")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class AnalysisClient:
+    """Synchronous client; safe to use from worker threads (one socket per call)."""
+
+    def __init__(
+        self,
+        address: Optional[str] = None,
+        connect_timeout: float = 5.0,
+        poll_interval: float = 0.5,
+    ):
+        self.address = address or get_server_address()
+        self.connect_timeout = connect_timeout
+        self.poll_interval = poll_interval
+
+    def _connect(self) -> socket.socket:
+        kind, target = parse_address(self.address)
+        try:
+            if kind == "unix":
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.connect_timeout)
+                sock.connect(target)
+            else:
+                sock = socket.create_connection(target, timeout=self.connect_timeout)
+        except OSError as e:
+            raise AnalysisServerError(
+                f"Analysis server not reachable at {self.address}: {e}"
+            ) from e
+        return sock
+
+    def request(
+        self,
+        payload: Dict[str, Any],
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        check: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """Send one request and read events until the final one.
+
+        Args:
+            payload: Request object
+            on_event: Called for every intermediate event
+            check: Called at least every poll_interval seconds; an exception it
+                raises closes the connection, which cancels the run server-side
+
+        Returns:
+            The final ``result`` / ``pong`` event
+        """
+        with self._connect() as sock:
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            sock.settimeout(self.poll_interval)
+            buffer = b""
+            while True:
+                if check:
+                    check()
+                try:
+                    chunk = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    raise AnalysisServerError("Connection closed before a result")
+                buffer += chunk
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    event = json.loads(line)
+                    kind = event.get("event")
+                    if kind == "error":
+                        raise AnalysisServerError(event.get("error", "Unknown error"))
+                    if kind in ("result", "pong"):
+                        return event
+                    if on_event:
+                        on_event(event)
+
+    def ping(self) -> Dict[str, Any]:
+        """Server liveness and load (active / queued / completed runs)."""
+        return self.request({"op": "ping"})
+
+    def analyze(
+        self,
+        input_path: str,
+        on_progress: Optional[Callable[[str, float, str], None]] = None,
+        check: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        """Analyze a file path or URL on the server.
+
+        Args:
+            input_path: Audio file (as seen by the server) or URL
+            on_progress: Called as on_progress(stage, progress, message)
+            check: See request()
+
+        Returns:
+            The ``result`` event: {"tracks": [...], "mix_info": {...}, "segment_count": n}
+        """
+
+        def on_event(event: Dict[str, Any]) -> None:
+            if event.get("event") == "progress" and on_progress:
+                on_progress(event["stage"], event["progress"], event["message"])
+
+        return self.request({"op": "analyze", "input": input_path}, on_event, check)
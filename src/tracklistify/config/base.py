@@ -136,6 +136,10 @@ class TrackIdentificationConfig(BaseConfig):
     cache_max_age: int = field(default=86400)
     cache_min_free_space: int = field(default=104857600)
 
+    # Checkpoint settings (per-segment results for resuming interrupted analyses)
+    checkpoint_enabled: bool = field(default=True)
+    checkpoint_max_age: int = field(default=604800)
+
     # Rate limiting settings
     max_requests_per_minute: int = field(default=25)
     max_concurrent_requests: int = field(default=2)
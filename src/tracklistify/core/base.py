@@ -12,14 +12,16 @@ from typing import List, Optional, Tuple
 from tracklistify.config.factory import get_config
 from tracklistify.core.exceptions import DownloadError, ValidationError
 from tracklistify.core.track import Track
-from tracklistify.core.types import AudioSegment
+from tracklistify.core.types import AnalysisResult, AudioSegment, ProgressCallback
 from tracklistify.downloaders import DownloaderFactory
 from tracklistify.exporters import TracklistOutput
 from tracklistify.providers.factory import create_provider_factory
+from tracklistify.utils.checkpoint import open_checkpoint
 from tracklistify.utils.identification import IdentificationManager
 from tracklistify.utils.logger import get_logger
 from tracklistify.utils.strings import sanitizer
 from tracklistify.utils.validation import validate_input
+from tracklistify.utils.workspace import Workspace
 
 logger = get_logger(__name__)
 
@@ -27,15 +29,18 @@ logger = get_logger(__name__)
 class AsyncApp:
     """Main application logic container"""
 
-    def __init__(self, config=None):
+    def __init__(self, config=None, provider_factory=None):
         # Always refresh config
         self.config = config or get_config(force_refresh=True)
-        self.provider_factory = create_provider_factory()
+        # A long-lived host (tracklistify.server) passes one shared, warm factory
+        self.provider_factory = provider_factory or create_provider_factory()
         self.downloader_factory = DownloaderFactory()
         self.logger = get_logger(__name__)
         self.shutdown_event = asyncio.Event()
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
         self.mix_metadata: dict = {}
+        # Downloads and segments of this app's runs; never shared with other apps
+        self.workspace = Workspace(self.config.temp_dir)
 
         # Always recreate identification_manager with fresh config
         self.identification_manager = IdentificationManager(
@@ -48,35 +53,100 @@ class AsyncApp:
         self.shutdown_event.set()
         self.executor.shutdown(wait=True)
 
-    async def process_input(self, input_path: str):
-        """Process input URL or file path."""
-        try:
-            local_path, source_path = await self._prepare_input(input_path)
+    async def analyze(
+        self, input_path: str, progress_callback: Optional[ProgressCallback] = None
+    ) -> AnalysisResult:
+        """Download (if needed), split and identify an input without writing output files.
+
+        This is the in-process entry point for embedding Tracklistify (e.g. the
+        Studio job pipeline): results come back as Track objects instead of
+        exported JSON, and progress is reported through a callback instead of
+        log lines. Downloads and segments stay in ``self.workspace`` until
+        cleanup() is called; concurrent analyses need separate AsyncApp instances.
+
+        Args:
+            input_path: URL or local audio file
+            progress_callback: Optional callable(stage, progress, message). Exceptions
+                it raises abort the analysis, which callers can use for cancellation.
 
-            # Keep a reference for output metadata
-            self.source_path = source_path
+        Returns:
+            AnalysisResult with the unique tracks (possibly empty) and mix metadata
+        """
+
+        def report(stage: str, progress: float, message: str) -> None:
+            if progress_callback:
+                progress_callback(stage, progress, message)
+
+        report("download", 0.0, f"Preparing input: {sanitizer(input_path)}")
+        local_path, source_path = await self._prepare_input(input_path)
 
-            self.logger.info("Processing audio...")
+        # Keep a reference for output metadata
+        self.source_path = source_path
+        report("download", 1.0, "Input ready")
 
-            # Process the downloaded file
-            audio_segments = self.split_audio(local_path)
-            if not audio_segments:
-                raise ValueError("No audio segments were created")
+        self.logger.info("Processing audio...")
+        report("split", 0.0, "Splitting audio...")
 
-            self.logger.info(f"Created {len(audio_segments)} audio segments")
+        # Process the downloaded file; ffmpeg runs off the event loop so other
+        # analyses sharing the loop keep making progress
+        loop = asyncio.get_running_loop()
+        audio_segments = await loop.run_in_executor(
+            self.executor, self.split_audio, local_path
+        )
+        if not audio_segments:
+            raise ValueError("No audio segments were created")
+
+        self.logger.info(f"Created {len(audio_segments)} audio segments")
+        report("split", 1.0, f"Created {len(audio_segments)} audio segments")
+
+        # Identify tracks in audio segments, resuming from stored results of an
+        # earlier, interrupted run of the same audio
+        self.logger.info("Identifying tracks...")
+        kwargs = {}
+        checkpoint = await loop.run_in_executor(
+            self.executor, open_checkpoint, self.config, local_path
+        )
+        if checkpoint is not None:
+            kwargs["checkpoint"] = checkpoint
+            if len(checkpoint):
+                report("identify", 0.0, f"Resuming from {len(checkpoint)} checkpoints")
+        if progress_callback:
+            kwargs["progress_callback"] = lambda done, total: report(
+                "identify",
+                done / total if total else 1.0,
+                f"Identifying segment {min(done + 1, total)}/{total}",
+            )
+        tracks = await self.identification_manager.identify_tracks(
+            audio_segments, **kwargs
+        )
+        tracks = list(tracks or [])
+        if checkpoint is not None:
+            # Finished runs must not replay their answers into a later rescan
+            await loop.run_in_executor(self.executor, checkpoint.finish)
+        report("identify", 1.0, f"Found {len(tracks)} tracks")
+
+        return AnalysisResult(
+            tracks=tracks,
+            mix_info=self._build_mix_info(self._output_title(tracks), tracks),
+            audio_path=local_path,
+            source_path=source_path,
+            segment_count=len(audio_segments),
+        )
 
-            # Identify tracks in audio segments
-            self.logger.info("Identifying tracks...")
-            tracks = await self.identification_manager.identify_tracks(audio_segments)
+    async def process_input(self, input_path: str):
+        """Process input URL or file path."""
+        try:
+            result = await self.analyze(input_path)
+            tracks = result.tracks
             if not tracks:
                 context = {
-                    "segments_created": len(audio_segments),
-                    "input_path": source_path,
+                    "segments_created": result.segment_count,
+                    "input_path": result.source_path,
                     "file_duration": getattr(self, "duration", "unknown"),
                 }
                 raise TrackIdentificationError(
                     f"No tracks were identified in the audio file. "
-                    f"Created {len(audio_segments)} segments but no matches found. "
+                    f"Created {result.segment_count} segments but no matches found. "
                     f"This could be due to poor audio quality, instrumental music, "
                     f"or unsupported audio content.",
                     context=context,
@@ -103,6 +173,15 @@ class AsyncApp:
             # Always clean up temporary files
             await self.cleanup()
 
+    def _output_title(self, tracks: List["Track"]) -> str:
+        """Title for exports: the original title, else derived from the first track."""
+        title = getattr(self, "original_title", None)
+        if title:
+            return title
+        if tracks and tracks[0].artist and tracks[0].song_name:
+            return f"{tracks[0].artist} - {tracks[0].song_name}"
+        return "Identified Mix"
+
     def _build_mix_info(self, title: str, tracks: List["Track"]) -> dict:
         """Assemble mix metadata used by exporters."""
 
@@ -161,7 +240,9 @@ class AsyncApp:
         # Remote URL: pick downloader and fetch the audio
         self.logger.info(f"Downloading from: {sanitizer(validated_path)}")
         try:
-            downloader = self.downloader_factory.create_downloader(validated_path)
+            downloader = self.downloader_factory.create_downloader(
+                validated_path, temp_dir=str(self.workspace.subdir("download"))
+            )
         except ValueError as exc:  # Unsupported URL format
             raise ValidationError(
                 f"Unsupported or unrecognized URL: {sanitizer(validated_path)}"
@@ -224,9 +305,8 @@ class AsyncApp:
         overlap_duration = self.config.overlap_duration
         step = segment_duration - overlap_duration
 
-        # Create temp directory for segments
-        temp_dir = Path(self.config.temp_dir)
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        # Segments go into this run's workspace, never the shared temp directory
+        temp_dir = self.workspace.subdir("segments")
 
         # Optimize ffmpeg settings for faster processing
         base_cmd = [
@@ -289,15 +369,6 @@ class AsyncApp:
         def create_segment(params):
             """Create a single audio segment using ffmpeg."""
             try:
-                if params["file"].exists():
-                    # Skip if file already exists and has content
-                    if params["file"].stat().st_size > 1000:
-                        return AudioSegment(
-                            file_path=str(params["file"]),
-                            start_time=int(params["start_time"]),
-                            duration=int(params["length"]),
-                        )
-
                 result = subprocess.run(
                     params["cmd"], capture_output=True, text=True, check=True
                 )
@@ -368,17 +439,8 @@ class AsyncApp:
             logger.error("Cannot save output: No tracks provided")
             return
 
-        # Get title from the original title or use a default
-        title = getattr(self, "original_title", None)
-        if not title:
-            # Try to construct a title from the first track
-            if tracks and tracks[0].artist and tracks[0].song_name:
-                title = f"{tracks[0].artist} - {tracks[0].song_name}"
-            else:
-                title = "Identified Mix"
-
         # Prepare mix info using the downloaded title
-        mix_info = self._build_mix_info(title, tracks)
+        mix_info = self._build_mix_info(self._output_title(tracks), tracks)
 
         try:
             # Create output handler
@@ -406,37 +468,8 @@ class AsyncApp:
     async def cleanup(self):
         """Cleanup resources"""
         try:
-            # Clean up temp directory
-            temp_dir = Path(self.config.temp_dir)
-            if temp_dir.exists():
-                # First try to remove all files
-                for file in temp_dir.glob("*"):
-                    try:
-                        if file.is_file():
-                            file.unlink()
-                            self.logger.debug(f"Removed temporary file: {file}")
-                        elif file.is_dir():
-                            import shutil
-
-                            shutil.rmtree(file)
-                            self.logger.debug(f"Removed temporary directory: {file}")
-                    except Exception as e:
-                        self.logger.warning(f"Failed to remove {file}: {e}")
-
-                # Try to remove the directory itself
-                try:
-                    # Use rmtree instead of rmdir to handle any remaining files
-                    import shutil
-
-                    shutil.rmtree(temp_dir)
-                    self.logger.debug("Removed temporary directory")
-                except Exception as e:
-                    self.logger.debug(f"Could not remove temp directory: {e}")
-                    # If rmtree fails, try to at least remove empty directory
-                    try:
-                        temp_dir.rmdir()
-                    except Exception:
-                        pass
+            # Only this app's workspace; other runs share config.temp_dir
+            self.workspace.cleanup()
         except Exception as e:
             self.logger.warning(f"Error during cleanup: {e}")
 
@@ -12,16 +12,21 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import (
     AsyncIterator,
+    Callable,
     Dict,
     Generic,
     List,
     Literal,
     Optional,
+    TYPE_CHECKING,
     Protocol,
     TypedDict,
     TypeVar,
 )
 
+if TYPE_CHECKING:
+    from tracklistify.core.track import Track
+
 # Generic type variables
 T = TypeVar("T")
 ProviderT = TypeVar("ProviderT", bound="TrackIdentificationProvider")
@@ -290,3 +295,19 @@ class AudioSegment:
     file_path: str
     start_time: int = 0
     duration: int = 60
+
+
+# Called as progress_callback(stage, progress, message) by AsyncApp.analyze();
+# stage is "download", "split" or "identify", progress the 0.0-1.0 fraction of it.
+ProgressCallback = Callable[[str, float, str], None]
+
+
+@dataclass
+class AnalysisResult:
+    """Structured result of AsyncApp.analyze()."""
+
+    tracks: List["Track"]
+    mix_info: Dict
+    audio_path: str
+    source_path: str
+    segment_count: int = 0
@@ -101,7 +101,11 @@ class YtDlpDownloader(Downloader):
     """yt-dlp video downloader."""
 
     def __init__(
-        self, verbose: bool = False, quality: str = "192", format: str = "mp3"
+        self,
+        verbose: bool = False,
+        quality: str = "192",
+        format: str = "mp3",
+        temp_dir: Optional[str] = None,
     ):
         """Initialize yt-dlp downloader.
 
@@ -109,11 +113,13 @@ class YtDlpDownloader(Downloader):
             verbose: Enable verbose logging
             quality: Audio quality (bitrate)
             format: Output audio format
+            temp_dir: Download directory (defaults to the configured temp dir)
         """
         self.ffmpeg_path = self.get_ffmpeg_path()
         self.verbose = verbose
         self.quality = quality
         self.format = format
+        self.temp_dir = temp_dir
         self.title = None
         self._logger = YTDLPLogger()
         self.config = get_config()
@@ -126,8 +132,8 @@ class YtDlpDownloader(Downloader):
 
     def get_ydl_opts(self) -> dict:
         """Get yt-dlp options with current configuration."""
-        # Use configured temp directory or fall back to system temp
-        temp_dir = self.config.temp_dir or tempfile.gettempdir()
+        # Use the caller's directory, the configured temp directory or system temp
+        temp_dir = self.temp_dir or self.config.temp_dir or tempfile.gettempdir()
 
         # Ensure temp directory exists
         os.makedirs(temp_dir, exist_ok=True)
@@ -169,7 +175,7 @@ class YtDlpDownloader(Downloader):
         Returns:
             Path to downloaded file
         """
-        temp_dir = Path(self.config.temp_dir)
+        temp_dir = Path(self.temp_dir or self.config.temp_dir)
         temp_dir.mkdir(parents=True, exist_ok=True)
 
         logger.info(f"Starting yt-dlp download: {url}")
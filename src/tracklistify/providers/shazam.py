@@ -7,7 +7,7 @@ from typing import Any, Dict, Optional
 # Third-party imports
 from shazamio import Shazam
 
-from tracklistify.providers.base import TrackIdentificationProvider
+from tracklistify.providers.base import ProviderError, TrackIdentificationProvider
 
 # Local/package imports
 from tracklistify.utils.logger import get_logger
@@ -41,7 +41,12 @@ class ShazamProvider(TrackIdentificationProvider):
                 return None
 
             # Perform track recognition using the updated method
-            result = await self.shazam.recognize(audio_segment.file_path)
+            try:
+                result = await self.shazam.recognize(audio_segment.file_path)
+            except Exception as e:
+                # A failed request must not look like "no match": checkpointed
+                # analyses re-query failed segments but not unmatched ones
+                raise ProviderError(f"Shazam recognition failed: {e}") from e
             logger.debug(f"Shazam response: {result}")
 
             if not result or "matches" not in result:
@@ -85,6 +90,8 @@ class ShazamProvider(TrackIdentificationProvider):
                 }
             }
 
+        except ProviderError:
+            raise
         except Exception as e:
             logger.error(f"Error during track identification: {e}")
             return None
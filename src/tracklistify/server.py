@@ -0,0 +1,228 @@
+"""
+Resident analysis server: ``tracklistify-server`` / ``python -m tracklistify.server``.
+
+Keeps configuration, the provider factory (HTTP sessions, rate limiters,
+caches) and the interpreter warm, and runs several analyses concurrently.
+Clients (see ``tracklistify.client``) send one JSON line per connection and
+receive streamed progress events; closing the connection cancels the run.
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import suppress
+from typing import Any, Dict, Optional
+
+# Local/package imports
+from tracklistify.client import get_server_address, parse_address
+from tracklistify.config.factory import get_config
+from tracklistify.core.base import AsyncApp
+from tracklistify.providers.factory import create_provider_factory
+from tracklistify.utils.logger import get_logger, set_logger
+from tracklistify.utils.workspace import active_workspaces
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 2
+
+
+class AnalysisServer:
+    """Serves AsyncApp.analyze() over a Unix socket or localhost TCP port."""
+
+    def __init__(self, config=None, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        self.config = config or get_config()
+        self.provider_factory = create_provider_factory()
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._unix_path: Optional[str] = None
+        self._next_run_id = 0
+        self.stats = {"active": 0, "queued": 0, "completed": 0, "failed": 0}
+
+    async def start(self, address: str) -> None:
+        """Start listening on ``unix:/path`` or ``host:port``."""
+        kind, target = parse_address(address)
+        if kind == "unix":
+            # A socket file left behind by a crashed server blocks bind()
+            with suppress(FileNotFoundError):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle, path=target)
+            self._unix_path = target
+        else:
+            host, port = target
+            self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info(
+            f"Analysis server listening on {address} "
+            f"({self.max_concurrent} concurrent analyses)"
+        )
+
+    async def serve_forever(self, address: str) -> None:
+        await self.start(address)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._unix_path:
+            with suppress(FileNotFoundError):
+                os.unlink(self._unix_path)
+            self._unix_path = None
+        await self.provider_factory.close_all()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def send(event: Dict[str, Any]) -> None:
+            if not writer.is_closing():
+                writer.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+
+        try:
+            try:
+                request = json.loads(await reader.readline())
+                op = request.get("op")
+            except (ValueError, AttributeError):
+                send({"event": "error", "error": "Invalid request"})
+                return
+
+            if op == "ping":
+                send(
+                    {
+                        "event": "pong",
+                        "max_concurrent": self.max_concurrent,
+                        "workspaces": active_workspaces(),
+                        **self.stats,
+                    }
+                )
+            elif op == "analyze" and request.get("input"):
+                await self._analyze(request["input"], reader, send)
+            else:
+                send({"event": "error", "error": f"Unknown request: {op!r}"})
+        finally:
+            with suppress(ConnectionError):
+                await writer.drain()
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _analyze(self, input_path: str, reader: asyncio.StreamReader, send):
+        self._next_run_id += 1
+        run_id = self._next_run_id
+        send({"event": "accepted", "run_id": run_id, "queued": self._slots.locked()})
+
+        run = asyncio.create_task(self._run(run_id, input_path, send))
+        # Clients send nothing after the request; EOF means they went away
+        disconnected = asyncio.create_task(reader.read())
+        await asyncio.wait({run, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+
+        if not run.done():
+            logger.info(f"Run {run_id}: client disconnected, cancelling")
+            run.cancel()
+            with suppress(asyncio.CancelledError):
+                await run
+            return
+        disconnected.cancel()
+
+        try:
+            result = run.result()
+        except Exception as e:  # noqa: BLE001 - reported to the client
+            self.stats["failed"] += 1
+            logger.error(f"Run {run_id} failed: {e}")
+            send({"event": "error", "error": str(e), "type": type(e).__name__})
+            return
+
+        self.stats["completed"] += 1
+        send(
+            {
+                "event": "result",
+                "run_id": run_id,
+                "tracks": [
+                    {
+                        "song_name": t.song_name,
+                        "artist": t.artist,
+                        "time_in_mix": t.time_in_mix,
+                        "confidence": t.confidence,
+                        "duration": getattr(t, "duration", None),
+                    }
+                    for t in result.tracks
+                ],
+                "mix_info": result.mix_info,
+                "audio_path": result.audio_path,
+                "segment_count": result.segment_count,
+            }
+        )
+
+    async def _run(self, run_id: int, input_path: str, send):
+        self.stats["queued"] += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.stats["queued"] -= 1
+
+        # Each app writes into its own workspace, so runs never share files
+        app = AsyncApp(config=self.config, provider_factory=self.provider_factory)
+        self.stats["active"] += 1
+        try:
+            return await app.analyze(
+                input_path,
+                progress_callback=lambda stage, progress, message: send(
+                    {
+                        "event": "progress",
+                        "run_id": run_id,
+                        "stage": stage,
+                        "progress": progress,
+                        "message": message,
+                    }
+                ),
+            )
+        finally:
+            self.stats["active"] -= 1
+            self._slots.release()
+            # Not app.cleanup(): that would close the shared providers
+            app.workspace.cleanup()
+            app.executor.shutdown(wait=False)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the resident analysis server.")
+    parser.add_argument(
+        "--listen",
+        default=get_server_address(),
+        help="unix:/path/to.sock or host:port (default: $TRACKLISTIFY_ANALYSIS_SERVER "
+        "or 127.0.0.1:8765)",
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=int(
+            os.getenv("TRACKLISTIFY_ANALYSIS_CONCURRENCY", DEFAULT_MAX_CONCURRENT)
+        ),
+        help="Analyses that run at the same time; further requests wait",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        help="Logging level",
+    )
+    return parser.parse_args(argv)
+
+
+def cli() -> None:
+    args = parse_args()
+    set_logger(log_level=args.log_level)
+    server = AnalysisServer(max_concurrent=args.max_concurrent)
+    try:
+        asyncio.run(server.serve_forever(args.listen))
+    except KeyboardInterrupt:
+        logger.info("Analysis server stopped")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,214 @@
+"""
+Per-segment checkpoints for resumable analysis.
+
+Identification results are written to a small SQLite database in the cache
+directory as soon as each segment has been queried, keyed by the audio
+fingerprint of the set, the provider and the segment window. Running the same
+input again (after a crash, a network drop or an open circuit breaker) reuses
+every stored answer - matches and confirmed "no match" alike - and only
+queries segments that failed or were never reached. Once a run has an answer
+for every segment its checkpoint is dropped, so a later rescan of the same
+audio queries the providers afresh.
+"""
+
+# Standard library imports
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+# Local/package imports
+from tracklistify.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHECKPOINT_DB = "checkpoints.db"
+FINGERPRINT_BLOCK = 1024 * 1024
+
+STATUS_MATCHED = "matched"
+STATUS_NO_MATCH = "no_match"
+STATUS_FAILED = "failed"
+
+SegmentResult = Tuple[str, Optional[Dict[str, Any]]]
+
+
+def audio_fingerprint(path: Union[str, Path]) -> str:
+    """Cheap content key for an audio file.
+
+    Hashes the size plus the first, middle and last megabyte, so a multi-hour
+    set is keyed in milliseconds and a re-download of the same set to another
+    path still resumes its checkpoints.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    offsets = (0, size // 2 - FINGERPRINT_BLOCK // 2, size - FINGERPRINT_BLOCK)
+    with open(path, "rb") as f:
+        for offset in offsets:
+            f.seek(max(0, offset))
+            digest.update(f.read(FINGERPRINT_BLOCK))
+    return digest.hexdigest()
+
+
+class CheckpointStore:
+    """SQLite-backed segment results; one short connection per call, so the
+    store can be shared by concurrent analyses and processes."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS segment_results (
+                    set_key TEXT NOT NULL,
+                    provider TEXT NOT NULL,
+                    start_time INTEGER NOT NULL,
+                    duration INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (set_key, provider, start_time, duration)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(
+        self, set_key: str, provider: str
+    ) -> Dict[Tuple[int, int], SegmentResult]:
+        """All stored results of a set, by (start_time, duration)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT start_time, duration, status, result FROM segment_results "
+                "WHERE set_key = ? AND provider = ?",
+                (set_key, provider),
+            ).fetchall()
+        return {
+            (start, duration): (status, json.loads(result) if result else None)
+            for start, duration, status, result in rows
+        }
+
+    def save(
+        self,
+        set_key: str,
+        provider: str,
+        start_time: int,
+        duration: int,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO segment_results "
+                "(set_key, provider, start_time, duration, status, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    set_key,
+                    provider,
+                    int(start_time),
+                    int(duration),
+                    status,
+                    json.dumps(result, default=str) if result is not None else None,
+                    time.time(),
+                ),
+            )
+
+    def clear(self, set_key: str, provider: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            if provider is None:
+                conn.execute("DELETE FROM segment_results WHERE set_key = ?", (set_key,))
+            else:
+                conn.execute(
+                    "DELETE FROM segment_results WHERE set_key = ? AND provider = ?",
+                    (set_key, provider),
+                )
+
+    def prune(self, max_age: float) -> int:
+        """Drop checkpoints not touched for max_age seconds; returns rows removed."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM segment_results WHERE updated_at < ?",
+                (time.time() - max_age,),
+            )
+            return cursor.rowcount
+
+
+class SegmentCheckpoint:
+    """Checkpoint view for one set and provider, used by IdentificationManager."""
+
+    def __init__(self, store: CheckpointStore, set_key: str, provider: str):
+        self.store = store
+        self.set_key = set_key
+        self.provider = provider
+        self._results = store.load(set_key, provider)
+        self.resumed = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, segment) -> Optional[SegmentResult]:
+        """Stored (status, track_info) for a finished segment, else None.
+
+        Failed segments count as unfinished so that they are queried again.
+        """
+        stored = self._results.get((int(segment.start_time), int(segment.duration)))
+        if stored is None or stored[0] == STATUS_FAILED:
+            return None
+        self.resumed += 1
+        return stored
+
+    def finish(self) -> bool:
+        """Drop the checkpoint after a completed run; returns True if dropped.
+
+        A run with failed segments keeps it, so the next run only re-queries those.
+        """
+        if any(status == STATUS_FAILED for status, _ in self._results.values()):
+            return False
+        try:
+            self.store.clear(self.set_key, self.provider)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not clear checkpoint: {e}")
+            return False
+        self._results = {}
+        return True
+
+    def record(
+        self, segment, status: str, track_info: Optional[Dict[str, Any]] = None
+    ) -> None:
+        key = (int(segment.start_time), int(segment.duration))
+        self._results[key] = (status, track_info)
+        try:
+            self.store.save(self.set_key, self.provider, *key, status, track_info)
+        except sqlite3.Error as e:
+            # Losing a checkpoint only costs a re-query later
+            logger.warning(f"Could not save checkpoint for segment {key[0]}s: {e}")
+
+
+def open_checkpoint(config, audio_path: str) -> Optional[SegmentCheckpoint]:
+    """Checkpoint for analysing audio_path with config, or None if disabled."""
+    if not getattr(config, "checkpoint_enabled", False):
+        return None
+    try:
+        store = CheckpointStore(Path(config.cache_dir).expanduser() / CHECKPOINT_DB)
+        max_age = getattr(config, "checkpoint_max_age", 0)
+        if max_age:
+            store.prune(max_age)
+        return SegmentCheckpoint(
+            store, audio_fingerprint(audio_path), config.primary_provider
+        )
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Checkpoints disabled for this run: {e}")
+        return None
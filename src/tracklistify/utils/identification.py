@@ -13,6 +13,7 @@ from tracklistify.config.factory import get_config
 # Local/package imports
 from tracklistify.core.track import Track, TrackMatcher
 from tracklistify.providers.factory import create_provider_factory
+from .checkpoint import STATUS_FAILED, STATUS_MATCHED, STATUS_NO_MATCH
 from .logger import get_logger
 from .time_formatter import format_seconds_to_hhmmss
 
@@ -48,14 +49,47 @@ class IdentificationManager:
         self.provider_factory = provider_factory or create_provider_factory()
         self.track_matcher = TrackMatcher()
 
-    async def identify_tracks(self, audio_segments):
+    async def identify_tracks(
+        self, audio_segments, progress_callback=None, checkpoint=None
+    ):
+        """Identify tracks in the given segments.
+
+        Args:
+            audio_segments: Segments from AsyncApp.split_audio()
+            progress_callback: Optional callable(completed, total), called before
+                each segment and once at the end. Exceptions it raises (e.g. a
+                cancellation) abort the identification.
+            checkpoint: Optional SegmentCheckpoint. Segments with a stored
+                result are not sent to the provider again; every new result is
+                stored as soon as it arrives.
+        """
         provider_name = self.config.primary_provider
         provider = self.provider_factory.get_identification_provider(provider_name)
         identified_tracks = []
+        total = len(audio_segments)
+
+        for index, segment in enumerate(audio_segments):
+            if progress_callback:
+                progress_callback(index, total)
+            stored = checkpoint.get(segment) if checkpoint is not None else None
+            if stored is not None:
+                track_info = stored[1]
+            else:
+                try:
+                    track_info = await provider.identify_track(segment)
+                except Exception as e:
+                    logger.error(f"Identification failed for segment: {e}")
+                    if checkpoint is not None:
+                        checkpoint.record(segment, STATUS_FAILED)
+                    continue
+                if checkpoint is not None:
+                    checkpoint.record(
+                        segment,
+                        STATUS_NO_MATCH if track_info is None else STATUS_MATCHED,
+                        track_info,
+                    )
 
-        for segment in audio_segments:
             try:
-                track_info = await provider.identify_track(segment)
                 if track_info is None:
                     logger.debug("Provider returned None for track identification")
                     continue
@@ -93,6 +127,13 @@ class IdentificationManager:
                 logger.error(f"Identification failed for segment: {e}")
                 continue
 
+        if progress_callback:
+            progress_callback(total, total)
+        if checkpoint is not None and checkpoint.resumed:
+            logger.info(
+                f"Resumed {checkpoint.resumed} of {total} segments from checkpoint"
+            )
+
         # Get unique tracks sorted by time in mix
         unique_tracks = self.track_matcher.get_unique_tracks()
         logger.info(
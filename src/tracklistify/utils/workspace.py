@@ -0,0 +1,213 @@
+"""
+Per-run temporary workspaces.
+
+Every analysis writes downloads and segment files into its own directory below
+``<temp_dir>/workspaces`` instead of the shared temp directory, so concurrent
+runs (several AsyncApp instances, the analysis server, Studio workers) never
+overwrite or delete each other's files. Each workspace records the owning
+process; directories left behind by a crashed process are reclaimed the next
+time a workspace is created under the same root.
+"""
+
+# Standard library imports
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+# Local/package imports
+from tracklistify.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WORKSPACES_DIR = "workspaces"
+OWNER_FILE = ".owner"
+STALE_AFTER_SECONDS = 6 * 3600
+
+_active: Dict[str, "Workspace"] = {}
+_active_lock = threading.Lock()
+
+
+def _dir_size(path: Path) -> int:
+    """Total size of all regular files below path, in bytes."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class Workspace:
+    """A private temp directory for one analysis run.
+
+    The directory is created lazily on first access to ``path`` and removed by
+    ``cleanup()``; using the workspace as a context manager does both.
+    """
+
+    def __init__(self, root: Union[str, Path], prefix: str = "run-"):
+        self.root = Path(root) / WORKSPACES_DIR
+        self.prefix = prefix
+        self.created_at: Optional[float] = None
+        self.peak_bytes = 0
+        self._path: Optional[Path] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        """The workspace directory (created on first use)."""
+        with self._lock:
+            if self._path is None or not self._path.exists():
+                self.root.mkdir(parents=True, exist_ok=True)
+                sweep_stale_workspaces(self.root.parent)
+                self._path = Path(tempfile.mkdtemp(prefix=self.prefix, dir=self.root))
+                (self._path / OWNER_FILE).write_text(str(os.getpid()))
+                self.created_at = time.time()
+                with _active_lock:
+                    _active[str(self._path)] = self
+                logger.debug(f"Created workspace: {self._path}")
+            return self._path
+
+    @property
+    def exists(self) -> bool:
+        return self._path is not None and self._path.exists()
+
+    def subdir(self, name: str) -> Path:
+        """A named directory inside the workspace (e.g. "download", "segments")."""
+        directory = self.path / name
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    def disk_usage(self) -> int:
+        """Bytes currently used by the workspace; also updates peak_bytes."""
+        if not self.exists:
+            return 0
+        used = _dir_size(self._path)
+        self.peak_bytes = max(self.peak_bytes, used)
+        return used
+
+    def cleanup(self) -> int:
+        """Remove the workspace directory.
+
+        Files are removed first so that one locked file does not keep the rest
+        of the run's data on disk.
+
+        Returns:
+            Number of bytes freed
+        """
+        with self._lock:
+            path = self._path
+            if path is None or not path.exists():
+                return 0
+            freed = self.disk_usage()
+
+            for file in path.glob("*"):
+                try:
+                    if file.is_file():
+                        file.unlink()
+                        logger.debug(f"Removed temporary file: {file}")
+                    elif file.is_dir():
+                        shutil.rmtree(file)
+                        logger.debug(f"Removed temporary directory: {file}")
+                except Exception as e:
+                    logger.warning(f"Failed to remove {file}: {e}")
+
+            try:
+                # rmtree handles anything that survived the loop above
+                shutil.rmtree(path)
+            except Exception as e:
+                logger.debug(f"Could not remove workspace: {e}")
+                try:
+                    path.rmdir()
+                except Exception:
+                    pass
+
+            with _active_lock:
+                _active.pop(str(path), None)
+            self._path = None
+            logger.debug(
+                f"Released workspace {path.name} "
+                f"({freed / 1_000_000:.1f} MB, peak {self.peak_bytes / 1_000_000:.1f} MB)"
+            )
+            return freed
+
+    def __enter__(self) -> "Workspace":
+        self.path
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
+
+
+def active_workspaces() -> List[dict]:
+    """Disk usage of the workspaces of this process that are still open."""
+    with _active_lock:
+        workspaces = list(_active.values())
+    now = time.time()
+    return [
+        {
+            "path": str(ws._path),
+            "bytes": ws.disk_usage(),
+            "peak_bytes": ws.peak_bytes,
+            "age": round(now - (ws.created_at or now), 1),
+        }
+        for ws in workspaces
+        if ws.exists
+    ]
+
+
+def workspace_usage(temp_dir: Union[str, Path]) -> dict:
+    """Number and total size of all workspaces under temp_dir (any process)."""
+    root = Path(temp_dir) / WORKSPACES_DIR
+    dirs = [d for d in root.iterdir() if d.is_dir()] if root.is_dir() else []
+    return {"workspaces": len(dirs), "bytes": sum(_dir_size(d) for d in dirs)}
+
+
+def sweep_stale_workspaces(
+    temp_dir: Union[str, Path], max_age: float = STALE_AFTER_SECONDS
+) -> int:
+    """Remove workspaces whose owning process is gone (or that are very old
+    and have no owner record).
+
+    Returns:
+        Number of workspaces removed
+    """
+    root = Path(temp_dir) / WORKSPACES_DIR
+    if not root.is_dir():
+        return 0
+
+    removed = 0
+    now = time.time()
+    for directory in root.iterdir():
+        if not directory.is_dir() or str(directory) in _active:
+            continue
+        try:
+            pid = int((directory / OWNER_FILE).read_text().strip())
+            stale = pid != os.getpid() and not _pid_alive(pid)
+        except (OSError, ValueError):
+            try:
+                stale = now - directory.stat().st_mtime > max_age
+            except OSError:
+                continue
+        if stale:
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+            logger.info(f"Removed stale workspace: {directory}")
+    return removed
@@ -49,6 +49,9 @@ document.addEventListener('alpine:init', () => {
         currentView: 'dashboard',
         queueStatus: { active: null, queue: [], history: [] },
         queueToastMeta: { lastJobId: null, lastPhase: null, lastProgress: 0, lastToastAt: 0 },
+        queueEvents: null,
+        queueEventsLive: false,
+        queueSeq: null,
         
         // Inputs für Upload Modal
         inputs: {
@@ -113,9 +116,12 @@ document.addEventListener('alpine:init', () => {
             const vol = localStorage.getItem('tracklistify_volume');
             if (vol !== null) this.audio.volume = parseFloat(vol);
 
+            // Queue Updates per Server-Sent Events, Polling nur als Fallback
+            this.connectQueueEvents();
+
             // Globaler Poll Loop (Status Updates)
             setInterval(() => {
-                this.pollQueue();
+                if (!this.queueEventsLive) this.pollQueue();
                 // Wenn Rescan View offen ist, öfter aktualisieren
                 if (this.currentView === 'rescan' || this.ui.showRescanModal) {
                     this.fetchRescan();
@@ -243,31 +249,110 @@ document.addEventListener('alpine:init', () => {
             this.pollQueue();
         },
 
-        async pollQueue() {
-            try {
-                const res = await fetch('/api/queue/status');
-                const status = await res.json();
+        connectQueueEvents() {
+            if (!window.EventSource) return; // Fallback: Polling im Interval
+
+            const source = new EventSource('/api/queue/events');
+            this.queueEvents = source;
+            source.onopen = () => { this.queueEventsLive = true; };
+            // Browser verbindet automatisch neu und schickt Last-Event-ID mit
+            source.onerror = () => { this.queueEventsLive = false; };
+
+            source.addEventListener('snapshot', e => {
+                this.queueSeq = Number(e.lastEventId);
+                this.applyQueueStatus(JSON.parse(e.data));
+            });
+            ['queued', 'started', 'finished', 'phase', 'progress', 'log'].forEach(type => {
+                source.addEventListener(type, e => {
+                    const seq = Number(e.lastEventId);
+                    const gap = this.queueSeq === null || seq !== this.queueSeq + 1;
+                    this.queueSeq = seq;
+                    // Lücke in der Sequenz: lokaler Stand ist unvollständig, einmal komplett neu laden
+                    if (gap) return this.pollQueue();
+                    this.applyJobEvent(type, JSON.parse(e.data));
+                });
+            });
+        },
+
+        applyJobEvent(type, data) {
+            const status = this.queueStatus;
+            const others = list => (list || []).filter(j => j.id !== data.job_id);
+            const known = [...(status.active_jobs || []), ...(status.queue || [])].find(j => j.id === data.job_id);
 
-                // Job fertig geworden?
-                if (this.queueStatus.active && !status.active) {
-                    this.fetchSets(); 
-                    this.fetchDashboard();
-                    this.showToast("Verarbeitung fertig", "Set wurde importiert.", "success");
+            if (type === 'queued') {
+                status.queue = [...others(status.queue), {
+                    id: data.job_id, type: data.type, label: data.label,
+                    status: 'pending', phase: 'queued', progress: 0, log: 'Warte auf Start...'
+                }];
+                return;
+            }
+            if (type === 'started') {
+                const job = { ...known, id: data.job_id, label: data.label, status: 'running',
+                              phase: data.phase, progress: data.progress || 0, log: data.log };
+                const activeJobs = [...others(status.active_jobs), job].sort((a, b) => a.id - b.id);
+                return this.applyQueueStatus({ ...status, active: activeJobs[0], active_jobs: activeJobs,
+                                               queue: others(status.queue) });
+            }
+            if (type === 'finished') {
+                const activeJobs = others(status.active_jobs);
+                let history = status.history || [];
+                if (data.status) {
+                    const entry = { ...known, id: data.job_id, label: data.label ?? known?.label,
+                                    status: data.status, log: data.log, set_id: data.set_id };
+                    history = [...others(history), entry].slice(-5);
                 }
-                
-                if (status.active?.log && status.active.log !== this.lastConsoleLog) {
-                    console.log(`[queue] ${status.active.log}`);
-                    this.lastConsoleLog = status.active.log;
+                return this.applyQueueStatus({ ...status, active: activeJobs[0] || null, active_jobs: activeJobs,
+                                               queue: others(status.queue), history });
+            }
+
+            // phase / progress / log: nur laufende Jobs, Events unbekannter Jobs ändern nichts
+            const jobs = [...(status.active_jobs || []), status.active].filter(j => j && j.id === data.job_id);
+            jobs.forEach(job => {
+                if (type === 'phase') {
+                    job.status = data.status;
+                    job.phase = data.phase;
+                } else if (type === 'progress') {
+                    job.progress = data.progress;
+                } else if (type === 'log') {
+                    job.log = data.log;
                 }
+            });
 
-                // Live Log Toasties
-                this.handleLiveLog(status);
-                this.handleQueueProgress(status);
+            if (type === 'log' && status.active?.log && status.active.log !== this.lastConsoleLog) {
+                console.log(`[queue] ${status.active.log}`);
+                this.lastConsoleLog = status.active.log;
+            }
+            this.handleLiveLog(status);
+            this.handleQueueProgress(status);
+        },
 
-                this.queueStatus = status;
+        async pollQueue() {
+            try {
+                const res = await fetch('/api/queue/status');
+                this.applyQueueStatus(await res.json());
             } catch(e) {}
         },
 
+        applyQueueStatus(status) {
+            // Job fertig geworden?
+            if (this.queueStatus.active && !status.active) {
+                this.fetchSets(); 
+                this.fetchDashboard();
+                this.showToast("Verarbeitung fertig", "Set wurde importiert.", "success");
+            }
+            
+            if (status.active?.log && status.active.log !== this.lastConsoleLog) {
+                console.log(`[queue] ${status.active.log}`);
+                this.lastConsoleLog = status.active.log;
+            }
+
+            // Live Log Toasties
+            this.handleLiveLog(status);
+            this.handleQueueProgress(status);
+
+            this.queueStatus = status;
+        },
+
         async stopQueue() {
             try {
                 await fetch('/api/queue/stop', { method: 'POST' });
@@ -497,6 +582,7 @@ document.addEventListener('alpine:init', () => {
             const fd = new FormData(); 
             fd.append('type', 'url'); 
             fd.append('value', val); 
+            fd.append('force', '1'); // bewusst neu analysieren, kein Duplikat-Check
             
             // Alte Metadaten behalten
             const meta = { 
@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Tests swap in temporary databases; keep the app's import watcher from
+# sweeping the real output directory into them.
+os.environ.setdefault("TRACKLISTIFY_IMPORT_WATCH", "0")
+
+# Importing app initialises the database and the user/settings stores; point
+# them at a scratch directory so a test run never writes into the checkout.
+_runtime_dir = tempfile.mkdtemp(prefix="tracklistify-tests-")
+os.environ.setdefault("TRACKLISTIFY_DB_PATH", os.path.join(_runtime_dir, "tracklistify.db"))
+os.environ.setdefault("TRACKLISTIFY_STORAGE_DIR", os.path.join(_runtime_dir, "storage"))
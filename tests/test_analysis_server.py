@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tracklistify import server as server_module
+from tracklistify.client import AnalysisClient, AnalysisServerError, parse_address
+from tracklistify.core.track import Track
+from tracklistify.core.types import AnalysisResult
+from tracklistify.utils.workspace import Workspace
+
+
+class FakeApp:
+    """Stands in for AsyncApp: two progress events, then one track."""
+
+    cancelled = []
+
+    def __init__(self, config=None, provider_factory=None):
+        self.config = config
+        self.workspace = Workspace(config.temp_dir)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def analyze(self, input_path, progress_callback=None):
+        if input_path == "broken.mp3":
+            raise ValueError("No audio segments were created")
+        try:
+            progress_callback("identify", 0.5, "Identifying segment 1/2")
+            await asyncio.sleep(0.3)
+            progress_callback("identify", 1.0, "Found 1 tracks")
+        except asyncio.CancelledError:
+            FakeApp.cancelled.append(input_path)
+            raise
+        return AnalysisResult(
+            tracks=[Track("Song", "Artist", "00:03:00", 90.0)],
+            mix_info={"title": input_path},
+            audio_path=input_path,
+            source_path=input_path,
+            segment_count=2,
+        )
+
+
+@pytest.fixture
+def analysis_server(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_module, "AsyncApp", FakeApp)
+    FakeApp.cancelled = []
+    config = type("Config", (), {"temp_dir": str(tmp_path / "temp")})()
+    address = f"unix:{tmp_path / 'analysis.sock'}"
+    loop = asyncio.new_event_loop()
+    srv = server_module.AnalysisServer(config=config, max_concurrent=2)
+    loop.run_until_complete(srv.start(address))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield address, srv
+    asyncio.run_coroutine_threadsafe(srv.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/a.sock") == ("unix", "/tmp/a.sock")
+    assert parse_address("tcp://0.0.0.0:9000") == ("tcp", ("0.0.0.0", 9000))
+    assert parse_address(":8765") == ("tcp", ("127.0.0.1", 8765))
+
+
+def test_analyze_streams_progress_and_returns_tracks(analysis_server):
+    address, _ = analysis_server
+    progress = []
+
+    result = AnalysisClient(address).analyze(
+        "set.mp3", on_progress=lambda *event: progress.append(event)
+    )
+
+    assert [p[1] for p in progress] == [0.5, 1.0]
+    assert result["tracks"] == [
+        {
+            "song_name": "Song",
+            "artist": "Artist",
+            "time_in_mix": "00:03:00",
+            "confidence": 90.0,
+            "duration": None,
+        }
+    ]
+    assert result["segment_count"] == 2
+    assert AnalysisClient(address).ping()["completed"] == 1
+
+
+def test_concurrent_requests_share_the_server(analysis_server):
+    address, _ = analysis_server
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(
+            pool.map(lambda name: AnalysisClient(address).analyze(name), ["a.mp3", "b.mp3"])
+        )
+    assert [r["mix_info"]["title"] for r in results] == ["a.mp3", "b.mp3"]
+    assert time.monotonic() - start < 0.55  # ran side by side, not 2 x 0.3s
+
+
+def test_errors_are_reported_to_the_client(analysis_server):
+    address, srv = analysis_server
+    with pytest.raises(AnalysisServerError, match="No audio segments"):
+        AnalysisClient(address).analyze("broken.mp3")
+    assert srv.stats["failed"] == 1
+
+
+def test_disconnect_cancels_the_run(analysis_server):
+    address, srv = analysis_server
+
+    def abort(stage, progress, message):
+        raise KeyboardInterrupt  # any exception closes the connection
+
+    with pytest.raises(KeyboardInterrupt):
+        AnalysisClient(address).analyze("set.mp3", on_progress=abort)
+
+    deadline = time.monotonic() + 2
+    while not FakeApp.cancelled and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert FakeApp.cancelled == ["set.mp3"]
+    assert srv.stats["active"] == 0
@@ -33,6 +33,7 @@ def config(temp_dir):
     """Get config with temporary directory."""
     config = get_config()
     config.temp_dir = str(temp_dir)
+    config.checkpoint_enabled = False
     return config
 
 
@@ -285,30 +286,35 @@ class TestAppSaveOutput:
 
 
 class TestAppCleanup:
+    @pytest.fixture
+    def workspace(self, app):
+        """The app's private workspace directory."""
+        return app.workspace.path
+
     @pytest.mark.asyncio
-    async def test_cleanup_empty_temp_dir(self, app, temp_dir):
+    async def test_cleanup_empty_temp_dir(self, app, workspace):
         """Test cleanup with empty temporary directory."""
         await app.cleanup()
-        assert not temp_dir.exists()
+        assert not workspace.exists()
 
     @pytest.mark.asyncio
-    async def test_cleanup_with_files(self, app, temp_dir):
+    async def test_cleanup_with_files(self, app, workspace):
         """Test cleanup with temporary files."""
         # Create some temporary files
-        test_file = temp_dir / "test.txt"
+        test_file = workspace / "test.txt"
         test_file.write_text("test content")
 
-        test_subdir = temp_dir / "subdir"
+        test_subdir = workspace / "subdir"
         test_subdir.mkdir()
         (test_subdir / "subfile.txt").write_text("sub content")
 
         await app.cleanup()
-        assert not temp_dir.exists()
+        assert not workspace.exists()
 
     @pytest.mark.asyncio
-    async def test_cleanup_with_locked_files(self, app, temp_dir):
+    async def test_cleanup_with_locked_files(self, app, workspace):
         """Test cleanup with locked files."""
-        test_file = temp_dir / "test.txt"
+        test_file = workspace / "test.txt"
         test_file.write_text("test content")
 
         # Mock file removal to fail
@@ -332,7 +338,7 @@ class TestAppCleanup:
         assert True
 
     @pytest.mark.asyncio
-    async def test_cleanup_rmtree_fallback(self, app, temp_dir):
+    async def test_cleanup_rmtree_fallback(self, app, workspace):
         """Test fallback to rmdir when rmtree fails."""
         with (
             patch("shutil.rmtree", side_effect=Exception("rmtree failed")),
@@ -352,9 +358,9 @@ class TestAppCleanup:
             )
 
     @pytest.mark.asyncio
-    async def test_cleanup_operation_order(self, app, temp_dir):
+    async def test_cleanup_operation_order(self, app, workspace):
         """Test cleanup operation order."""
-        test_file = temp_dir / "test.txt"
+        test_file = workspace / "test.txt"
         test_file.write_text("test")
 
         operations = []
@@ -374,11 +380,11 @@ class TestAppCleanup:
             assert operations[-1] == "dir"  # Directory should be deleted last
 
     @pytest.mark.asyncio
-    async def test_cleanup_inaccessible_directory(self, app, temp_dir):
+    async def test_cleanup_inaccessible_directory(self, app, workspace):
         """Test cleanup with inaccessible directory."""
 
         # Create a file in the temp directory
-        test_file = temp_dir / "test.txt"
+        test_file = workspace / "test.txt"
         test_file.write_text("test")
 
         # Mock the glob to return our test file
@@ -391,7 +397,7 @@ class TestAppCleanup:
             patch(
                 "pathlib.Path.unlink", side_effect=PermissionError("Permission denied")
             ),
-            patch("tracklistify.core.base.logger.warning") as mock_logger,
+            patch("tracklistify.utils.workspace.logger.warning") as mock_logger,
         ):
             await app.cleanup()
 
@@ -401,12 +407,12 @@ class TestAppCleanup:
             )
 
     @pytest.mark.asyncio
-    async def test_cleanup_with_symlinks(self, app, temp_dir):
+    async def test_cleanup_with_symlinks(self, app, workspace):
         """Test cleanup with symbolic links."""
         # Create a test file and a symlink to it
-        test_file = temp_dir / "test.txt"
+        test_file = workspace / "test.txt"
         test_file.write_text("test content")
-        symlink = temp_dir / "link.txt"
+        symlink = workspace / "link.txt"
 
         # Create symlink (platform-independent)
         try:
@@ -415,44 +421,62 @@ class TestAppCleanup:
             pytest.skip("Symlink creation not supported on this platform")
 
         await app.cleanup()
-        assert not temp_dir.exists()
+        assert not workspace.exists()
 
     @pytest.mark.asyncio
-    async def test_cleanup_deep_directory(self, app, temp_dir):
+    async def test_cleanup_deep_directory(self, app, workspace):
         """Test cleanup with deeply nested directories."""
-        current = temp_dir
+        current = workspace
         for i in range(10):  # Create 10 levels of directories
             current = current / f"level_{i}"
             current.mkdir()
             (current / "file.txt").write_text("test")
 
         await app.cleanup()
-        assert not temp_dir.exists()
+        assert not workspace.exists()
 
     @pytest.mark.asyncio
-    async def test_cleanup_special_chars(self, app, temp_dir):
+    async def test_cleanup_special_chars(self, app, workspace):
         """Test cleanup with special character filenames."""
         special_chars = ["!@#$%^&*()", "spaces in name", "中文文件"]
         for name in special_chars:
-            special_file = temp_dir / name
+            special_file = workspace / name
             special_file.write_text("test")
 
         await app.cleanup()
-        assert not temp_dir.exists()
+        assert not workspace.exists()
 
     @pytest.mark.asyncio
-    async def test_cleanup_concurrent(self, app, temp_dir):
+    async def test_cleanup_concurrent(self, app, workspace):
         """Test concurrent cleanup calls."""
         # Create some test files
         for i in range(3):
-            (temp_dir / f"test_{i}.txt").write_text(f"test content {i}")
+            (workspace / f"test_{i}.txt").write_text(f"test content {i}")
 
         # Run multiple cleanup tasks concurrently
         tasks = [app.cleanup() for _ in range(3)]
         await asyncio.gather(*tasks)
 
         # Verify cleanup was successful
-        assert not temp_dir.exists()
+        assert not workspace.exists()
+
+    @pytest.mark.asyncio
+    async def test_cleanup_leaves_shared_temp_dir(self, config, temp_dir):
+        """Cleanup of one app must not touch another app's workspace."""
+        first, second = App(config=config), App(config=config)
+        for app in (first, second):
+            app.identification_manager = Mock(close=AsyncMock())
+        other_file = second.workspace.subdir("segments") / "segment_0_30.mp3"
+        other_file.write_bytes(b"x" * 2000)
+        first_dir = first.workspace.path
+        (temp_dir / "unrelated.txt").write_text("keep")
+
+        await first.cleanup()
+
+        assert not first_dir.exists()
+        assert other_file.exists()
+        assert (temp_dir / "unrelated.txt").exists()
+        assert first_dir != second.workspace.path
 
 
 class TestAppProcessInput:
@@ -661,6 +685,65 @@ class TestAppProcessInput:
         app.cleanup.assert_called_once()
 
 
+class TestAppAnalyze:
+    @pytest.mark.asyncio
+    async def test_analyze_returns_tracks_and_reports_progress(
+        self, app, temp_dir, sample_tracks, monkeypatch
+    ):
+        """analyze() returns structured results without exporting or cleaning up."""
+        test_file = temp_dir / "live_set.mp3"
+        test_file.write_text("mock audio content")
+        monkeypatch.setattr(
+            "tracklistify.core.base.validate_input", lambda path: (path, True)
+        )
+
+        async def identify(segments, progress_callback=None):
+            for done in range(len(segments) + 1):
+                progress_callback(done, len(segments))
+            return sample_tracks
+
+        app.split_audio = Mock(return_value=["segment1", "segment2"])
+        app.identification_manager.identify_tracks = identify
+        app.save_output = AsyncMock()
+        app.cleanup = AsyncMock()
+        events = []
+
+        result = await app.analyze(
+            str(test_file), progress_callback=lambda *event: events.append(event)
+        )
+
+        assert result.tracks == sample_tracks
+        assert result.audio_path == str(test_file)
+        assert result.segment_count == 2
+        assert result.mix_info["title"] == "live_set"
+        assert result.mix_info["track_count"] == 2
+        assert [e[1] for e in events if e[0] == "identify"] == [0.0, 0.5, 1.0, 1.0]
+        assert events[-1] == ("identify", 1.0, "Found 2 tracks")
+        app.save_output.assert_not_called()
+        app.cleanup.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_analyze_progress_callback_can_abort(self, app, temp_dir, monkeypatch):
+        """An exception from the progress callback stops the analysis."""
+        test_file = temp_dir / "test.mp3"
+        test_file.write_text("mock audio content")
+        monkeypatch.setattr(
+            "tracklistify.core.base.validate_input", lambda path: (path, True)
+        )
+        app.split_audio = Mock(return_value=["segment1"])
+        app.identification_manager.identify_tracks = AsyncMock()
+
+        def cancel(stage, progress, message):
+            if stage == "split":
+                raise RuntimeError("cancelled")
+
+        with pytest.raises(RuntimeError, match="cancelled"):
+            await app.analyze(str(test_file), progress_callback=cancel)
+
+        app.split_audio.assert_not_called()
+        app.identification_manager.identify_tracks.assert_not_called()
+
+
 class TestAppSplitAudio:
     def test_split_audio_success(self, app, temp_dir, monkeypatch):
         """Test successful audio splitting."""
@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import app as flask_app
+import database
+from services.audio_stream import audio_mimetype
+
+
+@pytest.fixture
+def track(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    audio = tmp_path / "set.m4a"
+    audio.write_bytes(bytes(range(256)) * 4096)  # 1 MiB
+    _, (track_id,) = database.insert_set_with_tracks(
+        {"name": "Set", "audio_file": str(audio)}, [{"position": 1, "artist": "A", "title": "One"}]
+    )
+    return track_id, audio.read_bytes()
+
+
+def test_single_and_suffix_ranges(track):
+    track_id, data = track
+    client = flask_app.app.test_client()
+
+    full = client.get(f"/api/stream/{track_id}")
+    assert full.status_code == 200
+    assert full.mimetype == "audio/mp4"
+    etag = full.headers["ETag"]
+
+    rv = client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=100-199"})
+    assert rv.status_code == 206
+    assert rv.data == data[100:200]
+    assert rv.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+
+    rv = client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=-10"})
+    assert rv.status_code == 206 and rv.data == data[-10:]
+
+    assert client.get(f"/api/stream/{track_id}", headers={"If-None-Match": etag}).status_code == 304
+    stale = client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert stale.status_code == 200 and len(stale.data) == len(data)
+
+
+def test_multi_range_is_multipart(track):
+    track_id, data = track
+    client = flask_app.app.test_client()
+
+    rv = client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=0-9,-5"})
+    assert rv.status_code == 206
+    assert rv.mimetype == "multipart/byteranges"
+    assert int(rv.headers["Content-Length"]) == len(rv.data)
+    parts = rv.data.split(b"--" + rv.mimetype_params["boundary"].encode())
+    assert data[:10] in parts[1] and f"bytes 0-9/{len(data)}".encode() in parts[1]
+    assert parts[2].endswith(data[-5:] + b"\r\n")
+
+    merged = client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=0-9,5-19"})
+    assert merged.status_code == 206 and merged.data == data[:20]
+
+    assert client.get(f"/api/stream/{track_id}", headers={"Range": f"bytes={len(data)}-,{len(data) + 5}-"}).status_code == 416
+
+    # A zero-length suffix selects nothing
+    zero = client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=0-9,-0"})
+    assert zero.status_code == 206 and zero.data == data[:10]
+    assert zero.headers["Content-Range"] == f"bytes 0-9/{len(data)}"
+    assert client.get(f"/api/stream/{track_id}", headers={"Range": "bytes=-0"}).status_code == 416
+
+
+def test_mimetypes():
+    assert audio_mimetype("/x/set.mp3") == "audio/mpeg"
+    assert audio_mimetype("/x/SET.OPUS") == "audio/ogg"
+    assert audio_mimetype("/x/set.flac") == "audio/flac"
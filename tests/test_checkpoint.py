@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from tracklistify.config.factory import get_config
+from tracklistify.core.base import AsyncApp
+from tracklistify.core.types import AudioSegment
+from tracklistify.utils.checkpoint import (
+    STATUS_FAILED,
+    CheckpointStore,
+    SegmentCheckpoint,
+    audio_fingerprint,
+    open_checkpoint,
+)
+from tracklistify.utils.identification import IdentificationManager
+
+
+class FlakyProvider:
+    """Matches every segment, except the ones listed as failing or silent."""
+
+    def __init__(self, failing=(), silent=()):
+        self.failing = set(failing)
+        self.silent = set(silent)
+        self.calls = []
+
+    async def identify_track(self, segment):
+        self.calls.append(segment.start_time)
+        if segment.start_time in self.failing:
+            raise ConnectionError("network down")
+        if segment.start_time in self.silent:
+            return None
+        return {
+            "metadata": {
+                "music": [
+                    {
+                        "title": f"Track {segment.start_time}",
+                        "artists": [{"name": "Artist"}],
+                        "score": 90.0,
+                    }
+                ]
+            }
+        }
+
+
+def make_manager(provider):
+    factory = SimpleNamespace(get_identification_provider=lambda name: provider)
+    config = SimpleNamespace(primary_provider="fake")
+    return IdentificationManager(config=config, provider_factory=factory)
+
+
+@pytest.fixture
+def segments(tmp_path):
+    return [
+        AudioSegment(str(tmp_path / f"s{i}.mp3"), start_time=i * 50, duration=60)
+        for i in range(4)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_resume_only_requeries_failed_segments(tmp_path, segments):
+    store = CheckpointStore(tmp_path / "checkpoints.db")
+
+    first = FlakyProvider(failing={100, 150}, silent={50})
+    await make_manager(first).identify_tracks(
+        segments, checkpoint=SegmentCheckpoint(store, "set-a", "fake")
+    )
+    assert first.calls == [0, 50, 100, 150]
+    stored = store.load("set-a", "fake")
+    assert stored[(100, 60)][0] == STATUS_FAILED
+
+    second = FlakyProvider()
+    checkpoint = SegmentCheckpoint(store, "set-a", "fake")
+    tracks = await make_manager(second).identify_tracks(segments, checkpoint=checkpoint)
+
+    # Matches and confirmed "no match" are reused; only failures are re-queried
+    assert second.calls == [100, 150]
+    assert checkpoint.resumed == 2
+    assert {t.song_name for t in tracks} >= {"Track 0", "Track 100"}
+    statuses = [status for status, _ in store.load("set-a", "fake").values()]
+    assert STATUS_FAILED not in statuses
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_are_keyed_by_provider_and_window(tmp_path, segments):
+    store = CheckpointStore(tmp_path / "checkpoints.db")
+    await make_manager(FlakyProvider()).identify_tracks(
+        segments, checkpoint=SegmentCheckpoint(store, "set-a", "fake")
+    )
+
+    other_provider = FlakyProvider()
+    await make_manager(other_provider).identify_tracks(
+        segments, checkpoint=SegmentCheckpoint(store, "set-a", "acrcloud")
+    )
+    assert len(other_provider.calls) == 4
+
+    shifted = [
+        AudioSegment(file_path=s.file_path, start_time=s.start_time, duration=30)
+        for s in segments
+    ]
+    provider = FlakyProvider()
+    await make_manager(provider).identify_tracks(
+        shifted, checkpoint=SegmentCheckpoint(store, "set-a", "fake")
+    )
+    assert len(provider.calls) == 4
+
+
+def test_open_checkpoint_uses_audio_content_as_set_key(tmp_path):
+    config = SimpleNamespace(
+        checkpoint_enabled=True,
+        checkpoint_max_age=3600,
+        cache_dir=tmp_path / "cache",
+        primary_provider="shazam",
+    )
+    audio = bytes(range(256)) * 20000
+    (tmp_path / "a.mp3").write_bytes(audio)
+    (tmp_path / "copy.mp3").write_bytes(audio)
+    (tmp_path / "other.mp3").write_bytes(audio[:-1] + b"\x00")
+
+    checkpoint = open_checkpoint(config, str(tmp_path / "a.mp3"))
+    assert checkpoint.set_key == audio_fingerprint(tmp_path / "copy.mp3")
+    assert checkpoint.set_key != audio_fingerprint(tmp_path / "other.mp3")
+    assert (tmp_path / "cache" / "checkpoints.db").exists()
+
+    config.checkpoint_enabled = False
+    assert open_checkpoint(config, str(tmp_path / "a.mp3")) is None
+
+
+@pytest.mark.asyncio
+async def test_completed_run_is_not_replayed_by_a_rescan(tmp_path, segments, monkeypatch):
+    audio = tmp_path / "set.mp3"
+    audio.write_bytes(b"audio" * 1000)
+    monkeypatch.setattr(
+        "tracklistify.core.base.validate_input", lambda path: (path, True)
+    )
+    config = get_config()
+    config.temp_dir = str(tmp_path / "tmp")
+    config.cache_dir = str(tmp_path / "cache")
+    config.checkpoint_enabled = True
+    config.checkpoint_max_age = 3600
+    config.primary_provider = "fake"
+
+    async def run(provider):
+        AsyncApp._instance = None
+        AsyncApp._initialized = False
+        app = AsyncApp(config=config)
+        app.split_audio = Mock(return_value=segments)
+        app.identification_manager = make_manager(provider)
+        try:
+            await app.analyze(str(audio))
+        finally:
+            await app.cleanup()
+
+    # An interrupted run keeps its checkpoint: only the failure is re-queried
+    await run(FlakyProvider(failing={100}))
+    resumed = FlakyProvider()
+    await run(resumed)
+    assert resumed.calls == [100]
+
+    # That run completed, so a rescan asks the provider about every segment
+    rescan = FlakyProvider()
+    await run(rescan)
+    assert rescan.calls == [0, 50, 100, 150]
+
+    AsyncApp._instance = None
+    AsyncApp._initialized = False
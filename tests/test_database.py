@@ -0,0 +1,239 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import database
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    return tmp_path / "test.db"
+
+
+def test_insert_set_with_tracks_returns_ids(temp_db):
+    tracks = [
+        {"position": 1, "artist": "A", "title": "One", "start_time": 0.0},
+        {"position": 2, "artist": "B", "title": "Two", "start_time": 180.0, "confidence": 0.8},
+    ]
+
+    set_id, track_ids = database.insert_set_with_tracks({"name": "Mix", "audio_file": "mix.mp3"}, tracks)
+
+    assert database.get_set(set_id)["name"] == "Mix"
+    rows = database.get_tracks_by_set_with_relations(set_id)
+    assert [r["id"] for r in rows] == track_ids
+    assert [r["title"] for r in rows] == ["One", "Two"]
+    assert rows[0]["liked"] == 0
+
+
+def test_insert_set_with_tracks_rolls_back_on_error(temp_db):
+    tracks = [
+        {"position": 1, "artist": "A", "title": "One"},
+        {"position": 2, "artist": "B", "title": object()},  # not bindable -> fails mid-batch
+    ]
+
+    with pytest.raises(Exception):
+        database.insert_set_with_tracks({"name": "Broken"}, tracks)
+
+    assert database.get_all_sets() == []
+    conn = database.get_conn()
+    assert conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0] == 0
+    conn.close()
+
+
+def test_init_db_applies_migrations_once(temp_db):
+    conn = database.get_conn()
+    assert database.get_schema_version(conn) == database.SCHEMA_VERSION
+    assert database.migrate(conn) == []
+    conn.close()
+
+    database.init_db()  # no-op on an up-to-date database
+
+
+def test_migrations_upgrade_legacy_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "legacy.db"))
+    conn = database.get_conn()
+    conn.execute("CREATE TABLE sets (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, source_file TEXT, created_at TEXT, audio_file TEXT)")
+    conn.execute("INSERT INTO sets (name) VALUES ('Old Set')")
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+
+    conn = database.get_conn()
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(sets)").fetchall()}
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(tracks)").fetchall()}
+    assert {"artists", "event", "is_b2b", "tags"} <= cols
+    assert "idx_tracks_set_position" in indexes
+    assert conn.execute("SELECT name FROM sets").fetchone()[0] == "Old Set"
+    assert database.get_schema_version(conn) == database.SCHEMA_VERSION
+    conn.close()
+
+
+def test_writer_group_commit_isolates_failing_operation(temp_db):
+    writer = database.get_writer()
+    set_id, _ = database.insert_set_with_tracks({"name": "Mix"}, [])
+
+    def _fail(conn):
+        conn.execute("UPDATE sets SET name = 'Half written' WHERE id = ?", (set_id,))
+        raise RuntimeError("boom")
+
+    futures = [
+        writer.submit(lambda conn: conn.execute("INSERT INTO folders (name) VALUES ('A')").lastrowid),
+        writer.submit(_fail),
+        writer.submit(lambda conn: conn.execute("INSERT INTO folders (name) VALUES ('B')").lastrowid),
+    ]
+
+    assert futures[0].result(timeout=5) and futures[2].result(timeout=5)
+    with pytest.raises(RuntimeError):
+        futures[1].result(timeout=5)
+    assert database.get_set(set_id)["name"] == "Mix"
+
+
+def test_write_helpers_go_through_writer(temp_db):
+    set_id, track_ids = database.insert_set_with_tracks(
+        {"name": "Mix"}, [{"position": 1, "artist": "A", "title": "One"}]
+    )
+
+    database.toggle_track_like(track_ids[0], True)
+    database.toggle_track_purchase(track_ids[0], True)
+
+    liked = database.get_liked_tracks()
+    assert [t["id"] for t in liked] == track_ids
+    assert database.get_purchased_tracks()[0]["purchased"] == 1
+    assert database.delete_set(set_id) is True
+    assert database.delete_set(set_id) is False
+
+
+def test_query_cache_serves_hits_until_tables_change(temp_db):
+    set_id, track_ids = database.insert_set_with_tracks(
+        {"name": "Mix"}, [{"position": 1, "artist": "A", "title": "One"}]
+    )
+    before = database.get_query_cache_stats()["queries"].get("get_liked_tracks", {"hits": 0, "misses": 0})
+
+    assert database.get_liked_tracks() == []
+    assert database.get_liked_tracks() == []
+    database.toggle_track_like(track_ids[0], True)
+    liked = database.get_liked_tracks()
+
+    stats = database.get_query_cache_stats()["queries"]["get_liked_tracks"]
+    assert [t["id"] for t in liked] == track_ids
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["misses"] - before["misses"] == 2
+
+
+def test_query_cache_returns_independent_copies(temp_db):
+    database.insert_set_with_tracks({"name": "Mix"}, [])
+
+    database.get_all_sets()[0]["name"] = "Mutated"
+
+    assert database.get_all_sets()[0]["name"] == "Mix"
+
+
+def test_query_cache_sees_writes_from_other_processes(temp_db):
+    database.insert_set_with_tracks({"name": "Mix"}, [])
+    assert [s["name"] for s in database.get_all_sets()] == ["Mix"]
+
+    # A second process (e.g. the external job worker) imports a set
+    script = (
+        "import database, sys\n"
+        "database.DB_PATH = sys.argv[1]\n"
+        "database.insert_set_with_tracks({'name': 'Other'}, [])\n"
+        "database.close_writer()\n"
+    )
+    subprocess.run([sys.executable, "-c", script, str(temp_db)], cwd=ROOT_DIR, check=True, timeout=60)
+
+    assert sorted(s["name"] for s in database.get_all_sets()) == ["Mix", "Other"]
+
+
+def test_catalog_deduplicates_tracks_across_sets(temp_db):
+    _, first = database.insert_set_with_tracks(
+        {"name": "Set 1"}, [{"position": 1, "artist": "Åme feat. Henrik", "title": "Rej", "cover": "c.jpg"}]
+    )
+    _, second = database.insert_set_with_tracks(
+        {"name": "Set 2"}, [{"position": 1, "artist": "ame ft Henrik", "title": "REJ"}]
+    )
+
+    conn = database.get_conn()
+    catalog = conn.execute("SELECT * FROM catalog_tracks").fetchall()
+    links = {r["id"]: r["catalog_id"] for r in conn.execute("SELECT id, catalog_id FROM tracks")}
+    conn.close()
+
+    assert len(catalog) == 1
+    assert catalog[0]["artist"] == "Åme feat. Henrik"
+    assert catalog[0]["cover_url"] == "c.jpg"
+    assert links[first[0]] == links[second[0]] == catalog[0]["id"]
+
+
+def test_stream_cache_is_shared_through_catalog(temp_db):
+    _, first = database.insert_set_with_tracks({"name": "Set 1"}, [{"position": 1, "artist": "A", "title": "Song"}])
+    _, second = database.insert_set_with_tracks({"name": "Set 2"}, [{"position": 1, "artist": "a", "title": "song"}])
+
+    database.save_cached_stream(first[0], "https://example.com/a.m4a")
+
+    assert database.get_cached_stream(second[0]) == "https://example.com/a.m4a"
+
+
+def test_catalog_migration_backfills_existing_tracks(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "v2.db"))
+    conn = database.get_conn()
+    for version, _, func in database.MIGRATIONS[:2]:
+        func(conn.cursor())
+    conn.execute("PRAGMA user_version = 2")
+    conn.execute("INSERT INTO sets (id, name) VALUES (1, 'Old')")
+    conn.executemany(
+        "INSERT INTO tracks (set_id, position, artist, title) VALUES (1, ?, ?, ?)",
+        [(1, "Artist", "Track"), (2, "artist", "track"), (3, "Artist", "Track"), (4, None, None)],
+    )
+    conn.commit()
+    conn.close()
+
+    database.init_db()
+
+    conn = database.get_conn()
+    catalog = conn.execute("SELECT id, artist, title FROM catalog_tracks").fetchall()
+    linked = [r[0] for r in conn.execute("SELECT catalog_id FROM tracks ORDER BY position")]
+    conn.close()
+    assert [(r["artist"], r["title"]) for r in catalog] == [("Artist", "Track")]
+    assert linked == [catalog[0]["id"]] * 3 + [None]
+
+
+def test_job_queue_claim_is_exclusive_and_survives_restart(temp_db):
+    first = database.enqueue_job("url", "https://example.com/a", {"name": "A"}, "A")
+    second = database.enqueue_job("url", "https://example.com/b", None, "B")
+
+    claimed = database.claim_job("worker-1", lease_seconds=60)
+    other = database.claim_job("worker-2", lease_seconds=60)
+
+    assert claimed["id"] == first and claimed["metadata"] == {"name": "A"}
+    assert other["id"] == second
+    assert database.claim_job("worker-3", lease_seconds=60) is None
+    assert database.heartbeat_job(first, "worker-2", 60) is None  # not the lease owner
+    assert database.heartbeat_job(first, "worker-1", 60, phase="analyzing", progress=50) is False
+
+    database.request_job_cancel(first)
+    assert database.heartbeat_job(first, "worker-1", 60) is True
+
+    assert database.finish_job(first, "worker-1", "completed", "done", 100, "Fertig.", result={"set_id": 7})
+    done = database.get_jobs(("completed",))
+    assert done[0]["result"] == {"set_id": 7}
+
+
+def test_job_queue_recovers_expired_leases(temp_db):
+    job_id = database.enqueue_job("file", "/tmp/set.mp3")
+    database.claim_job("crashed-worker", lease_seconds=-1)
+
+    assert database.recover_stale_jobs() == (1, 0)
+    assert database.get_jobs(("pending",))[0]["id"] == job_id
+
+    for _ in range(database.JOB_MAX_ATTEMPTS - 1):
+        database.claim_job("crashed-worker", lease_seconds=-1)
+        database.recover_stale_jobs()
+    assert database.get_jobs(("error",))[0]["id"] == job_id
@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import database
+from services import importer
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    download_dir = tmp_path / "downloads"
+    download_dir.mkdir()
+    monkeypatch.setattr(importer, "JSON_OUTPUT_DIR", str(output_dir))
+    monkeypatch.setattr(importer, "DOWNLOAD_DIR", str(download_dir))
+    monkeypatch.setattr(importer, "IMPORT_JSON_CLEANUP_MODE", "none")
+    return output_dir, download_dir
+
+
+def _export(title, artist="DJ"):
+    return json.dumps({
+        "mix_info": {"title": title, "artist": artist},
+        "tracks": [{"artist": "A", "title": "Song", "start": 0, "end": 10}],
+    })
+
+
+def test_only_new_or_changed_files_are_read(env, monkeypatch):
+    output_dir, _ = env
+    (output_dir / "one.json").write_text(_export("One"))
+    (output_dir / "broken.json").write_text('{"mix_info": ')
+
+    assert len(importer.import_json_files()) == 1
+
+    reads = []
+    real_loader = importer.load_json_value
+    monkeypatch.setattr(importer, "load_json_value", lambda raw: reads.append(raw) or real_loader(raw))
+
+    # Nothing changed: nothing is read, nothing imported
+    assert importer.import_json_files() == []
+    assert reads == []
+
+    # The broken file is retried once it has been rewritten
+    (output_dir / "broken.json").write_text(_export("Two"))
+    assert len(importer.import_json_files()) == 1
+    assert len(reads) == 1
+
+    # Same export under a new name is a duplicate
+    (output_dir / "copy.json").write_text(_export("One"))
+    assert importer.import_json_files() == []
+
+    manifest = database.get_import_manifest()
+    assert {Path(p).name: e["status"] for p, e in manifest.items()} == {
+        "one.json": "imported", "broken.json": "imported", "copy.json": "duplicate",
+    }
+    (output_dir / "copy.json").unlink()
+    importer.import_json_files()
+    assert len(database.get_import_manifest()) == 2
+
+
+def test_audio_index_matches_like_full_scan(env):
+    _, download_dir = env
+    for name in ["Sunrise Session 2023.mp3", "sunrise.m4a", "Other Mix.mp3"]:
+        (download_dir / name).write_bytes(b"x")
+
+    assert importer._guess_audio_file_from_title("Sunrise_Session") == str(download_dir / "Sunrise Session 2023.mp3")
+    assert importer._guess_audio_file_from_title("Nothing Here") is None
+
+    # New downloads are picked up (directory mtime changes)
+    (download_dir / "Nothing Here.mp3").write_bytes(b"x")
+    os.utime(download_dir, None)
+    assert importer._guess_audio_file_from_title("nothing here") == str(download_dir / "Nothing Here.mp3")
+
+
+def test_audio_index_matches_title_inside_a_word(env):
+    _, download_dir = env
+    (download_dir / "boilerroom berlin.mp3").write_bytes(b"x")
+
+    # No shared word, but the title is part of the name (+5), as in a full scan
+    assert importer._guess_audio_file_from_title("room") == str(download_dir / "boilerroom berlin.mp3")
+    assert importer._audio_index.match("room", str(download_dir), min_score=5) == str(download_dir / "boilerroom berlin.mp3")
+
+
+def test_audio_index_skips_generated_files(env):
+    _, download_dir = env
+    for name in ["Sunrise.mp3.stream.opus", "Sunrise.mp3.peaks", "Sunrise.mp3.123.tmp"]:
+        (download_dir / name).write_bytes(b"x")
+
+    assert importer._guess_audio_file_from_title("Sunrise") is None
+
+    (download_dir / "Sunrise.mp3").write_bytes(b"x")
+    os.utime(download_dir, None)
+    assert importer._guess_audio_file_from_title("Sunrise") == str(download_dir / "Sunrise.mp3")
+
+
+def test_single_file_import_and_late_audio(env):
+    output_dir, download_dir = env
+    path = output_dir / "late.json"
+    path.write_text(_export("Warehouse Night", artist="Someone"))
+
+    (set_id,) = importer.import_json_paths([path])
+    assert importer.import_json_paths([path]) == []
+    assert database.get_set(set_id)["audio_file"] is None
+
+    (download_dir / "Warehouse Night (Live).mp3").write_bytes(b"x")
+    (download_dir / "Night Drive.mp3").write_bytes(b"x")  # one shared word is not enough here
+    assert importer.attach_missing_audio(str(download_dir)) == [set_id]
+    assert database.get_set(set_id)["audio_file"] == str(download_dir / "Warehouse Night (Live).mp3")
@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from services import import_watcher
+from services.import_watcher import ImportWatcher
+
+
+class Recorder:
+    def __init__(self):
+        self.imported = []
+        self.sweeps = 0
+        self.audio_dirs = []
+        self.changed = threading.Event()
+
+    def import_paths(self, paths):
+        self.imported.extend(os.path.basename(p) for p in paths)
+        self.changed.set()
+        return list(range(len(paths)))
+
+    def sweep(self):
+        self.sweeps += 1
+        self.changed.set()
+        return []
+
+    def attach_audio(self, directory):
+        self.audio_dirs.append(directory)
+        self.changed.set()
+
+
+def _wait(predicate, timeout=3):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watched(request, tmp_path):
+    if request.param == "inotify" and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    json_dir, audio_dir = tmp_path / "output", tmp_path / "downloads"
+    json_dir.mkdir()
+    audio_dir.mkdir()
+    rec = Recorder()
+    watcher = ImportWatcher(
+        json_dir=json_dir, audio_dirs=[audio_dir], debounce=0.1,
+        force_polling=request.param == "polling",
+        import_paths=rec.import_paths, sweep=rec.sweep, attach_audio=rec.attach_audio,
+    ).start()
+    assert _wait(lambda: rec.sweeps == 1 and rec.audio_dirs)  # catch-up sweep at start
+    rec.audio_dirs.clear()
+    yield watcher, rec, json_dir, audio_dir
+    watcher.stop()
+
+
+def test_imports_new_files_once_written(watched):
+    watcher, rec, json_dir, audio_dir = watched
+
+    start = time.monotonic()
+    (json_dir / "set.json").write_text("{}")
+    (json_dir / "notes.md").write_text("ignored")
+    (json_dir / "half.json.tmp").write_text("{")
+    assert _wait(lambda: rec.imported == ["set.json"])
+    assert time.monotonic() - start < 1.5
+
+    (audio_dir / "Some Set.mp3").write_bytes(b"x")
+    assert _wait(lambda: rec.audio_dirs == [str(audio_dir)])
+    assert rec.imported == ["set.json"] and rec.sweeps == 1
+
+
+def test_generated_files_next_to_audio_are_ignored(watched):
+    watcher, rec, json_dir, audio_dir = watched
+
+    (audio_dir / "Some Set.mp3.stream.opus").write_bytes(b"x")
+    (audio_dir / "Some Set.mp3.peaks").write_bytes(b"x")
+    time.sleep(0.6)
+    assert rec.audio_dirs == [] and watcher.stats["events"] == 0
+
+    (audio_dir / "Other Set.opus").write_bytes(b"x")
+    assert _wait(lambda: rec.audio_dirs == [str(audio_dir)])
+
+
+def test_burst_is_debounced_into_one_batch(watched):
+    watcher, rec, json_dir, _ = watched
+    path = json_dir / "growing.json"
+    with open(path, "w") as f:
+        for _ in range(3):
+            f.write("{}")
+            f.flush()
+            time.sleep(0.03)
+    for i in range(3):
+        (json_dir / f"burst{i}.json").write_text("{}")
+
+    assert _wait(lambda: len(rec.imported) == 4)
+    time.sleep(0.3)
+    assert sorted(rec.imported) == ["burst0.json", "burst1.json", "burst2.json", "growing.json"]
+
+
+def test_full_queue_falls_back_to_sweep(tmp_path, monkeypatch):
+    monkeypatch.setattr(import_watcher, "WATCH_QUEUE_SIZE", 2)
+    rec = Recorder()
+    watcher = ImportWatcher(json_dir=tmp_path, audio_dirs=[], debounce=0, import_paths=rec.import_paths,
+                            sweep=rec.sweep, attach_audio=rec.attach_audio)
+    for i in range(4):
+        path = tmp_path / f"{i}.json"
+        path.write_text("{}")
+        watcher._pending[str(path)] = watcher._stat(str(path)) + (0,)
+    watcher._flush(time.monotonic())
+
+    assert watcher.stats["dropped"] == 2
+    watcher._handle([watcher.queue.get_nowait(), watcher.queue.get_nowait()])
+    assert rec.imported == ["0.json", "1.json"] and rec.sweeps == 0
+
+    # The sweep that covers the dropped files is queued as soon as there is room
+    watcher._flush(time.monotonic())
+    watcher._handle([watcher.queue.get_nowait()])
+    assert rec.sweeps == 1
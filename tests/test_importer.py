@@ -1,6 +1,5 @@
 import json
 import os
-import sqlite3
 import sys
 from pathlib import Path
 
@@ -10,50 +9,14 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
+import database
 from services import importer
 
 
 def _setup_temp_db(tmp_path, monkeypatch):
     db_path = tmp_path / "db.sqlite"
-
-    def _get_conn():
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    monkeypatch.setattr(importer, "get_conn", _get_conn)
-
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE sets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            source_file TEXT,
-            created_at TEXT,
-            audio_file TEXT
-        )
-        """
-    )
-    cur.execute(
-        """
-        CREATE TABLE tracks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            set_id INTEGER NOT NULL,
-            position INTEGER,
-            artist TEXT,
-            title TEXT,
-            confidence REAL,
-            start_time REAL,
-            end_time REAL,
-            flag INTEGER DEFAULT 0
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-
+    monkeypatch.setattr(database, "DB_PATH", str(db_path))
+    database.init_db()
     return db_path
 
 
@@ -67,11 +30,12 @@ def _write_json_file(directory, filename, data):
 def test_import_json_files_missing_directory(tmp_path, monkeypatch):
     monkeypatch.setattr(importer, "JSON_OUTPUT_DIR", tmp_path / "missing")
 
-    result = importer.import_json_files()
+    result = importer.import_json_report()
 
     assert result["status"] == "missing_directory"
     assert result["new_set_ids"] == []
     assert "Output directory not found" in result["message"]
+    assert importer.import_json_files() == []
 
 
 def test_import_json_files_no_new_files(tmp_path, monkeypatch):
@@ -85,7 +49,7 @@ def test_import_json_files_no_new_files(tmp_path, monkeypatch):
     }
     json_path = _write_json_file(output_dir, "duplicate.json", data)
 
-    conn = importer.get_conn()
+    conn = database.get_conn()
     conn.execute(
         "INSERT INTO sets (name, source_file, created_at, audio_file) VALUES (?, ?, ?, ?)",
         ("Existing", os.path.abspath(json_path), "2024-01-01", None),
@@ -93,7 +57,7 @@ def test_import_json_files_no_new_files(tmp_path, monkeypatch):
     conn.commit()
     conn.close()
 
-    result = importer.import_json_files()
+    result = importer.import_json_report()
 
     assert result["status"] == "no_new_files"
     assert result["new_set_ids"] == []
@@ -115,13 +79,13 @@ def test_import_json_files_success_with_cleanup(tmp_path, monkeypatch):
     }
     json_path = _write_json_file(output_dir, "fresh.json", data)
 
-    result = importer.import_json_files()
+    result = importer.import_json_report()
 
     assert result["status"] == "imported"
     assert len(result["new_set_ids"]) == 1
     assert result["cleanup_actions"]
 
-    conn = importer.get_conn()
+    conn = database.get_conn()
     cur = conn.cursor()
     cur.execute("SELECT COUNT(*) FROM sets")
     assert cur.fetchone()[0] == 1
@@ -1,70 +1,39 @@
 import json
-import os
-import sqlite3
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+import database
 from services import importer
 
 
-def _setup_temp_db(db_path: str) -> None:
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE sets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            source_file TEXT,
-            created_at TEXT,
-            audio_file TEXT,
-            artists TEXT,
-            event TEXT,
-            is_b2b INTEGER DEFAULT 0,
-            tags TEXT
-        )
-        """
-    )
-    cur.execute(
-        """
-        CREATE TABLE tracks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            set_id INTEGER NOT NULL,
-            position INTEGER,
-            artist TEXT,
-            title TEXT,
-            confidence REAL,
-            start_time REAL,
-            end_time REAL,
-            flag INTEGER DEFAULT 0
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
-
-
-def _patch_get_conn(monkeypatch, db_path):
-    monkeypatch.setattr(importer, "get_conn", lambda: sqlite3.connect(db_path))
+def _setup_temp_db(monkeypatch, db_path) -> None:
+    monkeypatch.setattr(database, "DB_PATH", str(db_path))
+    database.init_db()
+
+
+def _count(table):
+    conn = database.get_conn()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
 
 
 def test_missing_output_dir_returns_message(monkeypatch, tmp_path):
-    db_path = tmp_path / "db.sqlite"
-    _setup_temp_db(db_path)
-    _patch_get_conn(monkeypatch, db_path)
+    _setup_temp_db(monkeypatch, tmp_path / "db.sqlite")
 
-    result = importer.import_json_files(output_dir=tmp_path / "missing", cleanup=True)
+    result = importer.import_json_report(output_dir=tmp_path / "missing", cleanup=True)
 
-    assert result["imported"] == 0
-    assert any("Kein Output-Ordner" in msg for msg in result["messages"])
+    assert result["new_set_ids"] == []
+    assert "Output directory not found" in result["message"]
+    assert importer.import_json_files(output_dir=tmp_path / "missing", cleanup=True) == []
 
 
 def test_imports_file_and_cleans_up(monkeypatch, tmp_path):
-    db_path = tmp_path / "db.sqlite"
-    _setup_temp_db(db_path)
-    _patch_get_conn(monkeypatch, db_path)
+    _setup_temp_db(monkeypatch, tmp_path / "db.sqlite")
+    monkeypatch.setattr(importer, "IMPORT_JSON_CLEANUP_MODE", "delete")
 
     output_dir = tmp_path / "output"
     output_dir.mkdir()
@@ -77,30 +46,37 @@ def test_imports_file_and_cleans_up(monkeypatch, tmp_path):
     json_path = output_dir / "mix.json"
     json_path.write_text(json.dumps(payload), encoding="utf-8")
 
-    result = importer.import_json_files(output_dir=str(output_dir), cleanup=True)
+    result = importer.import_json_report(output_dir=str(output_dir), cleanup=True)
 
-    assert result["imported"] == 1
+    assert len(result["new_set_ids"]) == 1
     assert result["errors"] == []
     assert not json_path.exists()
 
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM sets")
-    assert cur.fetchone()[0] == 1
-    cur.execute("SELECT COUNT(*) FROM tracks")
-    assert cur.fetchone()[0] == 1
-    conn.close()
+    assert _count("sets") == 1
+    assert _count("tracks") == 1
+
+
+def test_cleanup_false_keeps_imported_files(monkeypatch, tmp_path):
+    _setup_temp_db(monkeypatch, tmp_path / "db.sqlite")
+    monkeypatch.setattr(importer, "IMPORT_JSON_CLEANUP_MODE", "delete")
+
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    json_path = output_dir / "mix.json"
+    json_path.write_text(json.dumps({"mix_info": {"title": "Keep", "artist": "DJ"}, "tracks": []}), encoding="utf-8")
+
+    assert len(importer.import_json_files(output_dir=output_dir, cleanup=False)) == 1
+    assert json_path.exists()
 
 
 def test_empty_directory_reports_no_new_files(monkeypatch, tmp_path):
-    db_path = tmp_path / "db.sqlite"
-    _setup_temp_db(db_path)
-    _patch_get_conn(monkeypatch, db_path)
+    _setup_temp_db(monkeypatch, tmp_path / "db.sqlite")
 
     output_dir = tmp_path / "output"
     output_dir.mkdir()
 
-    result = importer.import_json_files(output_dir=output_dir, cleanup=True)
+    result = importer.import_json_report(output_dir=output_dir, cleanup=True)
 
-    assert result["imported"] == 0
-    assert any("Keine neuen JSON Dateien" in msg for msg in result["messages"])
+    assert result["new_set_ids"] == []
+    assert result["status"] == "no_new_files"
+    assert "No new files" in result["message"]
@@ -0,0 +1,380 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import database
+import job_manager
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "jobs.db"))
+    database.init_db()
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_pipeline_overlaps_downloads_and_applies_backpressure(temp_db, monkeypatch):
+    manager = job_manager.JobManager(download_workers=3, analysis_workers=1, analysis_backlog=1)
+    lock = threading.Lock()
+    downloading = {"now": 0, "max": 0}
+    analysed = []
+
+    def fake_download(job):
+        with lock:
+            downloading["now"] += 1
+            downloading["max"] = max(downloading["max"], downloading["now"])
+        time.sleep(0.2)
+        with lock:
+            downloading["now"] -= 1
+        return f"/tmp/{job['id']}.mp3"
+
+    def fake_analysis(job, audio_path):
+        time.sleep(0.1)
+        assert manager.analysis_queue.qsize() <= 1
+        job["set_id"] = job["id"]
+        analysed.append(audio_path)
+
+    monkeypatch.setattr(manager, "_download_stage", fake_download)
+    monkeypatch.setattr(manager, "_analysis_stage", fake_analysis)
+
+    for i in range(5):
+        manager.add_job("file", f"/tmp/{i}.mp3", {"title": f"Set {i}"})
+    manager.start_worker()
+    try:
+        assert _wait_for(lambda: len(database.get_jobs(("completed",))) == 5)
+    finally:
+        manager.stop_worker()
+
+    assert downloading["max"] >= 2
+    assert len(analysed) == 5
+    assert manager.get_status()["active"] is None
+
+
+def test_failed_download_is_recorded_and_skips_analysis(temp_db, monkeypatch):
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+    analysed = []
+
+    def broken_download(job):
+        raise RuntimeError("Download fehlgeschlagen.")
+
+    monkeypatch.setattr(manager, "_download_stage", broken_download)
+    monkeypatch.setattr(manager, "_analysis_stage", lambda job, path: analysed.append(path))
+
+    manager.add_job("url", "https://example.com/set")
+    manager.start_worker()
+    try:
+        assert _wait_for(lambda: database.get_jobs(("error",)))
+    finally:
+        manager.stop_worker()
+
+    assert database.get_jobs(("error",))[0]["error"] == "Download fehlgeschlagen."
+    assert analysed == []
+
+
+def test_idle_worker_wakes_on_add_job_without_polling(temp_db, monkeypatch):
+    monkeypatch.setattr(job_manager, "JOB_IDLE_POLL_SECONDS", 30)
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+    monkeypatch.setattr(manager, "_download_stage", lambda job: "/tmp/set.mp3")
+    monkeypatch.setattr(manager, "_analysis_stage", lambda job, path: None)
+
+    manager.start_worker()
+    try:
+        time.sleep(0.2)  # worker is now parked on the condition
+        manager.add_job("file", "/tmp/set.mp3")
+        assert _wait_for(lambda: database.get_jobs(("completed",)), timeout=2)
+    finally:
+        manager.stop_worker()
+
+
+def test_stop_active_cancels_running_job_cooperatively(temp_db, monkeypatch):
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+    analysed = []
+    started = threading.Event()
+
+    def slow_download(job):
+        started.set()
+        if manager._cancel_event(job).wait(10):
+            raise job_manager.JobCancelled("Abgebrochen.")
+        return "/tmp/set.mp3"
+
+    monkeypatch.setattr(manager, "_download_stage", slow_download)
+    monkeypatch.setattr(manager, "_analysis_stage", lambda job, path: analysed.append(path))
+
+    manager.add_job("url", "https://example.com/set")
+    manager.start_worker()
+    try:
+        assert started.wait(5)
+        assert manager.stop_active()
+        assert _wait_for(lambda: database.get_jobs(("cancelled",)), timeout=2)
+    finally:
+        manager.stop_worker()
+
+    job = database.get_jobs(("cancelled",))[0]
+    assert job["error"] is None
+    assert analysed == []
+    assert manager.get_status()["history"][-1]["status"] == "cancelled"
+
+
+def test_lost_lease_cancels_job_and_stops_heartbeat(temp_db, monkeypatch):
+    monkeypatch.setattr(job_manager, "JOB_HEARTBEAT_INTERVAL", 0.05)
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+    started = threading.Event()
+    cancelled = threading.Event()
+    heartbeats = []
+    heartbeat_job = database.heartbeat_job
+
+    def counting_heartbeat(job_id, *args, **kwargs):
+        heartbeats.append(job_id)
+        return heartbeat_job(job_id, *args, **kwargs)
+
+    def slow_download(job):
+        started.set()
+        if manager._cancel_event(job).wait(10):
+            cancelled.set()
+            raise job_manager.JobCancelled("Abgebrochen.")
+        return "/tmp/set.mp3"
+
+    monkeypatch.setattr(database, "heartbeat_job", counting_heartbeat)
+    monkeypatch.setattr(manager, "_download_stage", slow_download)
+    monkeypatch.setattr(manager, "_analysis_stage", lambda job, path: None)
+
+    job_id = manager.add_job("url", "https://example.com/set")
+    manager.start_worker()
+    try:
+        assert started.wait(5)
+        # Lease expired and another worker reclaimed the job
+        conn = database.get_conn()
+        with conn:
+            conn.execute("UPDATE jobs SET worker_id = 'other-worker' WHERE id = ?", (job_id,))
+        conn.close()
+        assert cancelled.wait(5)
+        seen = len(heartbeats)
+        time.sleep(0.3)
+        assert len(heartbeats) == seen
+    finally:
+        manager.stop_worker()
+
+    # The new owner's row is left alone
+    conn = database.get_conn()
+    row = conn.execute("SELECT worker_id, status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    assert tuple(row) == ("other-worker", "running")
+
+
+def test_event_bus_resumes_from_sequence_and_detects_gaps():
+    bus = job_manager.JobEventBus(maxlen=3)
+    for i in range(5):
+        bus.publish("log", {"i": i})
+
+    assert [seq for seq, _, _ in bus.since(3)] == [4, 5]
+    assert bus.since(2)[0] == (3, "log", {"i": 2})
+    assert bus.since(5) == []
+    assert bus.since(1) is None  # event 2 already left the buffer
+    assert bus.since(99) is None  # sequence from an earlier process
+
+
+def test_pipeline_publishes_job_events(temp_db, monkeypatch):
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+
+    def fake_download(job):
+        job["phase"] = "downloading"
+        for progress in (10, 10.2, 10.4, 50):
+            job["progress"] = progress
+        job["log"] = "Downloading: 50%"
+        return "/tmp/set.mp3"
+
+    monkeypatch.setattr(manager, "_download_stage", fake_download)
+    monkeypatch.setattr(manager, "_analysis_stage", lambda job, path: None)
+
+    job_id = manager.add_job("url", "https://example.com/set")
+    manager.start_worker()
+    try:
+        assert _wait_for(lambda: database.get_jobs(("completed",)))
+        assert _wait_for(lambda: manager.events.since(0)[-1][1] == "finished")
+    finally:
+        manager.stop_worker()
+
+    events = [(event, data) for _, event, data in manager.events.since(0)]
+    assert events[0] == ("queued", {"job_id": job_id, "type": "url", "label": "Neues Set"})
+    assert [d["progress"] for e, d in events if e == "progress"] == [10, 50, 100]
+    assert ("phase", {"job_id": job_id, "status": "running", "phase": "downloading"}) in events
+    assert ("log", {"job_id": job_id, "log": "Downloading: 50%"}) in events
+    assert events[-1][1]["status"] == "completed"
+
+
+def test_remote_watch_publishes_the_jobs_actual_state(temp_db):
+    manager = job_manager.JobManager()
+    running_id = database.enqueue_job("url", "https://example.com/a", label="A")
+    pending_id = database.enqueue_job("url", "https://example.com/b", label="B")
+    database.claim_job("other-worker", 60)
+    known = {}
+
+    def step():
+        seq = manager.events.seq
+        manager._publish_remote_changes(known, manager.get_status())
+        return [(event, data) for _, event, data in manager.events.since(seq)]
+
+    assert step() == [
+        ("started", {"job_id": running_id, "label": "A", "phase": "queued", "progress": 0, "log": "Warte auf Start..."}),
+        ("queued", {"job_id": pending_id, "type": "url", "label": "B"}),
+    ]
+    assert step() == []
+
+    database.claim_job("other-worker", 60)
+    database.finish_job(running_id, "other-worker", "completed", "done", 100, "Fertig", result={"set_id": 7})
+    events = step()
+    assert ("started", {"job_id": pending_id, "label": "B", "phase": "queued", "progress": 0,
+                        "log": "Warte auf Start..."}) in events
+    assert ("finished", {"job_id": running_id, "label": "A", "status": "completed", "log": "Fertig",
+                         "set_id": 7}) in events
+
+
+def test_queue_events_endpoint_streams_snapshot_and_resumes(temp_db, monkeypatch):
+    monkeypatch.setenv("TRACKLISTIFY_JOB_WORKER", "external")
+    import app as flask_app
+
+    manager = job_manager.JobManager()
+    monkeypatch.setattr(flask_app, "job_manager", manager)
+    monkeypatch.setattr(manager, "ensure_remote_watch", lambda: None)
+    client = flask_app.app.test_client()
+
+    response = client.get("/api/queue/events", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    stream = iter(response.response)
+    snapshot = next(stream).decode()
+    assert snapshot.startswith("id: 0\nevent: snapshot\n")
+
+    job_id = manager.add_job("file", "/tmp/set.mp3", {"title": "Live Set"})
+    queued = next(stream).decode()
+    assert queued.startswith("id: 1\nevent: queued\n")
+    assert f'"job_id": {job_id}' in queued
+    response.close()
+
+    resumed = client.get("/api/queue/events", headers={"Last-Event-ID": "0"}, buffered=False)
+    assert next(iter(resumed.response)).decode() == queued
+    resumed.close()
+
+
+def test_source_key_normalises_urls():
+    key = job_manager.source_key
+    assert key("https://youtu.be/dQw4w9WgXcQ?si=abc") == "youtube:dQw4w9WgXcQ"
+    assert key("https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=40") == "youtube:dQw4w9WgXcQ"
+    assert key("https://www.youtube.com/live/dQw4w9WgXcQ") == "youtube:dQw4w9WgXcQ"
+    assert key("https://www.mixcloud.com/dj/some-mix/?utm_source=x") == key("http://mixcloud.com/dj/some-mix#t=1")
+    assert key("https://example.com/set?b=2&a=1") == "example.com/set?a=1&b=2"
+
+
+def test_duplicate_url_attaches_to_queued_job_or_existing_set(temp_db):
+    manager = job_manager.JobManager()
+    job_id = manager.add_job("url", "https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    assert manager.add_job("url", "https://youtu.be/dQw4w9WgXcQ?si=share") == job_id
+    assert len(database.get_jobs(("pending",))) == 1
+
+    set_id, _ = database.insert_set_with_tracks({"name": "Set", "source_key": "youtube:abcdefghijk"}, [])
+    dup_id = manager.add_job("url", "https://youtu.be/abcdefghijk")
+    dup = database.get_jobs(("completed",))[0]
+    assert dup["id"] == dup_id
+    assert dup["result"] == {"set_id": set_id, "track_ids": [], "duplicate": True}
+
+    forced = manager.add_job("url", "https://youtu.be/abcdefghijk", force=True)
+    assert forced not in (job_id, dup_id)
+    assert len(database.get_jobs(("pending",))) == 2
+
+
+def test_downloaded_audio_with_known_hash_reuses_set(temp_db, tmp_path, monkeypatch):
+    audio = tmp_path / "upload.mp3"
+    audio.write_bytes(b"same audio")
+    set_id, _ = database.insert_set_with_tracks(
+        {"name": "Original", "content_hash": job_manager.file_sha256(str(audio))}, []
+    )
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+    analysed = []
+    monkeypatch.setattr(manager, "_download_stage", lambda job: str(audio))
+    monkeypatch.setattr(manager, "_analysis_stage", lambda job, path: analysed.append(path))
+
+    manager.add_job("file", str(audio))
+    manager.start_worker()
+    try:
+        assert _wait_for(lambda: database.get_jobs(("completed",)))
+    finally:
+        manager.stop_worker()
+
+    job = database.get_jobs(("completed",))[0]
+    assert job["result"]["set_id"] == set_id
+    assert job["result"]["duplicate"] is True
+    assert analysed == []
+    assert audio.exists()  # uploads are never deleted, only our own downloads
+
+
+def test_job_metrics_are_recorded_per_phase_and_exposed(temp_db, monkeypatch):
+    monkeypatch.setenv("TRACKLISTIFY_JOB_WORKER", "external")
+    import app as flask_app
+
+    manager = job_manager.JobManager(download_workers=1, analysis_workers=1)
+
+    def fake_download(job):
+        job["phase"] = "downloading"
+        time.sleep(0.1)
+        manager._metrics(job).add("bytes_downloaded", 2048)
+        return "/tmp/set.mp3"
+
+    def fake_analysis(job, audio_path):
+        job["phase"] = "analyzing"
+        metrics = manager._metrics(job)
+        for _ in range(3):
+            metrics.add("segments")
+            metrics.observe("provider", 0.02)
+        job["phase"] = "importing"
+        with metrics.timed("db_write"):
+            job["set_id"], job["track_ids"] = database.insert_set_with_tracks({"name": "Set"}, [])
+
+    monkeypatch.setattr(manager, "_download_stage", fake_download)
+    monkeypatch.setattr(manager, "_analysis_stage", fake_analysis)
+    monkeypatch.setattr(flask_app, "job_manager", manager)
+
+    for i in range(2):
+        manager.add_job("file", f"/tmp/{i}.mp3", {"title": f"Set {i}"})
+    manager.start_worker()
+    try:
+        assert _wait_for(lambda: len(database.get_jobs(("completed",))) == 2)
+    finally:
+        manager.stop_worker()
+
+    data = flask_app.app.test_client().get("/api/queue/metrics?limit=10").get_json()
+    assert len(data["jobs"]) == 2
+    metrics = data["jobs"][0]["metrics"]
+    assert metrics["phases"]["downloading"] >= 0.1
+    assert {"analyzing", "importing"} <= set(metrics["phases"])
+    assert metrics["counters"]["bytes_downloaded"] == 2048
+    assert metrics["counters"]["segments"] == 3
+    assert metrics["timers"]["provider"]["count"] == 3
+    assert metrics["timers"]["db_write"]["count"] == 1
+    summary = data["summary"]
+    assert summary["jobs"] == 2
+    assert summary["phases"]["downloading"]["p95"] >= 0.1
+    assert summary["counters"]["segments"] == 6
+
+
+def test_job_metrics_history_is_bounded(temp_db, monkeypatch):
+    monkeypatch.setattr(database, "JOB_METRICS_KEEP", 3)
+    for i in range(5):
+        job_id = database.enqueue_job("file", f"/tmp/{i}.mp3")
+        database.claim_job("w", 60)
+        database.finish_job(job_id, "w", "completed", "done", 100, "Fertig.", metrics={"wall": i})
+
+    assert [j["metrics"]["wall"] for j in database.get_job_metrics(10)] == [4, 3, 2]
@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from services import peaks
+
+
+def _chunks(samples, size):
+    for i in range(0, samples.size, size):
+        yield samples[i:i + size]
+
+
+def test_peaks_match_reference_regardless_of_chunking():
+    rng = np.random.default_rng(1)
+    samples = rng.integers(-32768, 32767, 256 * 100 + 17, dtype=np.int16)
+
+    levels = peaks.compute_peaks(_chunks(samples, 1000))
+    again = peaks.compute_peaks(_chunks(samples, 4096 * 3 + 1))
+
+    spp, lo, hi = levels[0]
+    assert spp == 256 and lo.size == 101  # trailing partial block kept
+    assert lo[3] == samples[768:1024].min() >> 8
+    assert hi[-1] == samples[25600:].max() >> 8
+    for (_, a_lo, a_hi), (_, b_lo, b_hi) in zip(levels, again):
+        assert np.array_equal(a_lo, b_lo) and np.array_equal(a_hi, b_hi)
+
+    # Coarser levels are reductions of the finest one
+    assert [lvl[0] for lvl in levels] == [256, 1024, 4096, 16384]
+    assert levels[1][1][0] == lo[:4].min() and levels[1][2][0] == hi[:4].max()
+    assert [lvl[1].size for lvl in levels] == [101, 26, 7, 2]
+
+
+def test_encode_and_read_roundtrip(tmp_path):
+    samples = (np.sin(np.linspace(0, 60, 256 * 64)) * 20000).astype(np.int16)
+    levels = peaks.compute_peaks([samples])
+    path = tmp_path / "set.mp3.peaks"
+    path.write_bytes(peaks.encode_peaks(levels))
+
+    data = peaks.read_peaks(path)
+    assert data["sample_rate"] == peaks.SAMPLE_RATE
+    for (spp, lo, hi), level in zip(levels, data["levels"]):
+        assert level["samples_per_peak"] == spp
+        assert np.array_equal(level["min"], lo) and np.array_equal(level["max"], hi)
+
+    path.write_bytes(b"nope" + path.read_bytes()[4:])
+    with pytest.raises(peaks.PeaksError):
+        peaks.read_peaks(path)
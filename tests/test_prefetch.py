@@ -0,0 +1,75 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from services.prefetch import StreamPrefetcher
+
+
+def _wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_resolves_uncached_tracks_in_set_order():
+    resolved = []
+    prefetcher = StreamPrefetcher(
+        resolve=lambda tid: resolved.append(tid) or f"http://stream/{tid}",
+        is_cached=lambda tid: tid == 2,
+        has_room=lambda: True,
+        per_set=4,
+    )
+
+    assert prefetcher.prefetch([1, 2, 3, 4, 5, 6]) == 4
+    assert _wait_until(lambda: prefetcher.pending() == 0 and len(resolved) == 3)
+    assert resolved == [1, 3, 4]
+    assert prefetcher.stats["cached"] == 1
+
+
+def test_waits_for_room_and_prefers_newest_set():
+    room = threading.Event()
+    resolved = []
+    prefetcher = StreamPrefetcher(
+        resolve=lambda tid: resolved.append(tid) or "http://x",
+        is_cached=lambda tid: False,
+        has_room=room.is_set,
+    )
+
+    prefetcher.prefetch([1, 2])
+    time.sleep(0.1)
+    assert resolved == []  # busy pool: nothing starts
+
+    prefetcher.prefetch([10, 11, 2])  # replaces what is left of the first set
+    room.set()
+    assert _wait_until(lambda: len(resolved) == 4)
+    assert resolved[1:] == [10, 11, 2]
+
+
+def test_opening_another_set_drops_the_previous_one():
+    room = threading.Event()
+    resolved = []
+    prefetcher = StreamPrefetcher(
+        resolve=lambda tid: resolved.append(tid) or "http://x",
+        is_cached=lambda tid: False,
+        has_room=room.is_set,
+        per_set=3,
+    )
+
+    for first in range(0, 50, 10):
+        prefetcher.prefetch([first + 1, first + 2, first + 3, first + 4])
+        time.sleep(0.05)
+    assert prefetcher.pending() <= 3  # bounded by one set
+
+    room.set()
+    assert _wait_until(lambda: prefetcher.pending() == 0 and len(resolved) == 4)
+    # Only the track a worker had already taken, then the last set
+    assert resolved == [1, 41, 42, 43]
+    assert prefetcher.stats["dropped"] == 2 + 3 * 3
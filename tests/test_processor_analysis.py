@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import database
+from services import processor
+from tracklistify.core import base
+from tracklistify.core.track import Track
+from tracklistify.core.types import AnalysisResult
+
+
+class FakeJob:
+    def __init__(self, payload):
+        self.id = "job-1"
+        self.type = "file"
+        self.payload = payload
+        self.metadata = {}
+        self.phase = "queued"
+        self.status = "processing"
+        self.progress = 0
+        self.error = None
+        self.log = []
+
+    def log_msg(self, message):
+        self.log.append(message)
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "processor.db"))
+    database.init_db()
+
+
+def _fake_app(tracks):
+    class FakeApp:
+        def __init__(self, config=None):
+            self.executor = type("Executor", (), {"shutdown": lambda self, wait=True: None})()
+
+        async def analyze(self, input_path, progress_callback=None):
+            progress_callback("identify", 0.5, "Identifying segment 2/4")
+            return AnalysisResult(
+                tracks=tracks,
+                mix_info={"title": "Live Set", "artist": "DJ Test"},
+                audio_path=input_path,
+                source_path=input_path,
+                segment_count=4,
+            )
+
+        async def cleanup(self):
+            pass
+
+    return FakeApp
+
+
+def test_in_process_analysis_imports_tracks_without_json_roundtrip(temp_db, tmp_path, monkeypatch):
+    audio = tmp_path / "set.mp3"
+    audio.write_bytes(b"audio")
+    tracks = [Track(song_name="Song", artist="Artist", time_in_mix="00:03:00", confidence=90.0)]
+    monkeypatch.setattr(processor, "ANALYSIS_MODE", "inprocess")
+    monkeypatch.setattr(base, "AsyncApp", _fake_app(tracks))
+    monkeypatch.setattr(processor.importer, "import_json_files", lambda: pytest.fail("JSON import used"))
+
+    job = FakeJob(str(audio))
+    assert processor.process_job(job) == {"new_sets": 1}
+
+    set_row = database.get_all_sets()[0]
+    assert set_row["name"] == "DJ Test - Live Set"
+    assert set_row["audio_file"] == str(audio)
+    track = database.get_tracks_by_set_with_relations(set_row["id"])[0]
+    assert (track["artist"], track["title"], track["start_time"]) == ("Artist", "Song", 180.0)
+    assert "Identifying segment 2/4" in job.log
+    assert job.phase == "importing"
+
+
+def test_in_process_analysis_without_tracks_fails_job(temp_db, tmp_path, monkeypatch):
+    audio = tmp_path / "set.mp3"
+    audio.write_bytes(b"audio")
+    monkeypatch.setattr(processor, "ANALYSIS_MODE", "inprocess")
+    monkeypatch.setattr(base, "AsyncApp", _fake_app([]))
+
+    job = FakeJob(str(audio))
+    with pytest.raises(RuntimeError):
+        processor.process_job(job)
+
+    assert job.status == "failed"
+    assert job.error == "Analyzer found no tracks in 4 segments"
+    assert database.get_all_sets() == []
@@ -0,0 +1,63 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import app as flask_app
+import database
+from services import renditions
+
+
+def _accept(value):
+    return parse_accept_header(value, MIMEAccept)
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "set.mp3"
+    path.write_bytes(b"original" * 100)
+    return str(path)
+
+
+def test_choose_stream_file(audio):
+    low = renditions.rendition_path(audio)
+    # No rendition yet: always the original
+    assert renditions.choose_stream_file(audio, "low") == (audio, False)
+
+    Path(low).write_bytes(b"opus")
+    assert renditions.choose_stream_file(audio, "low") == (low, False)
+    assert renditions.choose_stream_file(audio, "original") == (audio, False)
+    assert renditions.choose_stream_file(audio, None, _accept("*/*"), "audio/mpeg") == (audio, True)
+    assert renditions.choose_stream_file(
+        audio, None, _accept("audio/ogg, audio/mpeg;q=0.5"), "audio/mpeg"
+    ) == (low, True)
+
+    # A rendition older than the audio is stale
+    os.utime(low, (1, 1))
+    assert renditions.choose_stream_file(audio, "low") == (audio, False)
+
+
+def test_stream_route_serves_rendition(audio, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    _, (track_id,) = database.insert_set_with_tracks(
+        {"name": "Set", "audio_file": audio}, [{"position": 1, "artist": "A", "title": "One"}]
+    )
+    Path(renditions.rendition_path(audio)).write_bytes(b"opus")
+    client = flask_app.app.test_client()
+
+    rv = client.get(f"/api/stream/{track_id}?quality=low")
+    assert rv.data == b"opus" and rv.mimetype == "audio/ogg"
+
+    rv = client.get(f"/api/stream/{track_id}", headers={"Accept": "audio/ogg;q=1, */*;q=0.1"})
+    assert rv.data == b"opus" and "Accept" in rv.headers["Vary"]
+
+    rv = client.get(f"/api/stream/{track_id}")
+    assert rv.mimetype == "audio/mpeg" and rv.data.startswith(b"original")
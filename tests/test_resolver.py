@@ -0,0 +1,64 @@
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from services import resolver
+
+
+def _fake_search(delays, cancelled):
+    """Search stub: answers query i after delays[i] seconds (None = no result)."""
+
+    def search(query, cancel_event):
+        delay, url = delays[query]
+        if cancel_event.wait(delay):
+            cancelled.append(query)
+            return None
+        return url
+
+    return search
+
+
+def test_prefers_higher_ranked_hit_within_window():
+    cancelled = []
+    search = _fake_search({"topic": (0.2, "http://topic"), "official": (5, "http://official"),
+                           "plain": (0.05, "http://plain")}, cancelled)
+
+    start = time.monotonic()
+    url = resolver.race_queries(["topic", "official", "plain"], search=search, window=0.5)
+
+    assert url == "http://topic"
+    assert time.monotonic() - start < 1
+    time.sleep(0.1)
+    assert cancelled == ["official"]
+
+
+def test_takes_fastest_hit_when_better_ones_are_slow():
+    cancelled = []
+    search = _fake_search({"topic": (5, "http://topic"), "official": (0.05, None),
+                           "plain": (0.1, "http://plain")}, cancelled)
+
+    start = time.monotonic()
+    url = resolver.race_queries(["topic", "official", "plain"], search=search, window=0.3)
+
+    assert url == "http://plain"
+    assert time.monotonic() - start < 1
+    time.sleep(0.1)
+    assert cancelled == ["topic"]
+
+
+def test_returns_immediately_when_best_rank_answers_first():
+    search = _fake_search({"topic": (0.05, "http://topic"), "plain": (5, "http://plain")}, [])
+
+    start = time.monotonic()
+    assert resolver.race_queries(["topic", "plain"], search=search, window=2) == "http://topic"
+    assert time.monotonic() - start < 0.5
+
+
+def test_no_hits_returns_none_after_timeout():
+    search = _fake_search({"topic": (5, "http://topic"), "plain": (0.01, None)}, [])
+    assert resolver.race_queries(["topic", "plain"], search=search, timeout=0.2) is None
+
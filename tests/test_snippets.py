@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import database
+from services import snippets
+
+
+@pytest.fixture
+def set_tracks(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    audio = tmp_path / "set.mp3"
+    audio.write_bytes(b"\0" * 1024)
+    _, track_ids = database.insert_set_with_tracks({"name": "Set", "audio_file": str(audio)}, [
+        {"position": 1, "artist": "A", "title": "One", "start_time": 0.0},
+        {"position": 2, "artist": "B", "title": "Two", "start_time": 12.5},
+        {"position": 3, "artist": "C", "title": "Three", "start_time": 300.0},
+    ])
+    return track_ids
+
+
+def test_snippets_are_cut_once_per_start_time(set_tracks, tmp_path):
+    cuts = []
+
+    def fake_cut(audio_path, dest, start, duration):
+        cuts.append((start, duration))
+        Path(dest).write_bytes(b"x" * 10)
+
+    first, second, last = set_tracks
+    assert snippets.ensure_snippet(first, directory=tmp_path, cut=fake_cut) == f"{first}_0.mp3"
+    assert snippets.ensure_snippet(first, directory=tmp_path, cut=fake_cut) == f"{first}_0.mp3"
+    assert snippets.ensure_snippet(second, directory=tmp_path, cut=fake_cut) == f"{second}_12500.mp3"
+    snippets.ensure_snippet(last, directory=tmp_path, cut=fake_cut)
+
+    # Track one ends where track two starts; the last track has no end
+    assert cuts == [(0.0, 12.5), (12.5, 30.0), (300.0, 30.0)]
+
+    with pytest.raises(snippets.SnippetError):
+        snippets.ensure_snippet(9999, directory=tmp_path, cut=fake_cut)
+
+
+def test_prune_cache_evicts_least_recently_used(tmp_path):
+    now = time.time()
+    for i, name in enumerate(["old.mp3", "recent.mp3", "newest.mp3"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now + i, now + i))
+    os.utime(tmp_path / "old.mp3", (now + 10, now + 10))  # served again
+
+    assert snippets.prune_cache(max_bytes=200, directory=tmp_path) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["newest.mp3", "old.mp3"]
+
+
+def test_deleting_a_set_removes_its_snippets(set_tracks, tmp_path, monkeypatch):
+    import app as flask_app
+
+    monkeypatch.setattr(snippets, "SNIPPET_DIR", str(tmp_path / "snippets"))
+    os.makedirs(snippets.SNIPPET_DIR)
+    first, second, _ = set_tracks
+    names = [f"{first}_0.mp3", f"{first}_4000.mp3", f"{second}_12500.mp3"]
+    other = f"{first}0_0.mp3"  # another track whose id merely starts with the same digits
+    for name in names + [other]:
+        (tmp_path / "snippets" / name).write_bytes(b"x")
+    conn = database.get_conn()
+    set_id = conn.execute("SELECT set_id FROM tracks WHERE id = ?", (first,)).fetchone()[0]
+    conn.close()
+
+    rv = flask_app.app.test_client().delete(f"/api/sets/{set_id}")
+
+    assert rv.get_json()["deleted"]
+    assert os.listdir(snippets.SNIPPET_DIR) == [other]
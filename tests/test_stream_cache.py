@@ -0,0 +1,89 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import database
+from services.stream_cache import StreamUrlCache, query_key, url_expiry
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    return tmp_path / "test.db"
+
+
+def _yt_url(expire, n=1):
+    return f"https://rr1.googlevideo.com/videoplayback?expire={int(expire)}&id={n}&itag=140"
+
+
+def test_url_expiry_parsing():
+    assert url_expiry(_yt_url(1700000000)) == 1700000000
+    assert url_expiry("https://cdn.example.com/a.mp3?Expires=1700000123&Signature=x") == 1700000123
+    assert url_expiry("https://manifest.googlevideo.com/api/manifest/hls/expire/1700000456/ei/x") == 1700000456
+    assert url_expiry("https://example.com/a.m4a") is None
+    assert query_key("  Artist  -   Title ") == query_key("artist - title")
+
+
+def test_entries_expire_with_their_url(temp_db):
+    cache = StreamUrlCache(refresh_ahead=0, margin=60)
+    calls = []
+
+    def resolve():
+        calls.append(1)
+        return _yt_url(time.time() + 30 if len(calls) == 1 else time.time() + 7200, len(calls))
+
+    # Dies within the safety margin: stored, but never served from the cache
+    cache.get_query("a - b", resolve)
+    second = cache.get_query("A - B", resolve)
+    assert len(calls) == 2
+    assert cache.get_query("a - b", resolve) == second
+    assert len(calls) == 2
+
+    row = database.get_stream_cache_entry(query_key("a - b"))
+    assert row["expires_at"] == url_expiry(second)
+
+
+def test_refreshes_ahead_of_expiry_in_background(temp_db):
+    cache = StreamUrlCache(refresh_ahead=3600, margin=60)
+    _, (track_id,) = database.insert_set_with_tracks({"name": "Set"}, [{"position": 1, "artist": "A", "title": "Song"}])
+    soon = _yt_url(time.time() + 1200, 1)
+    database.save_cached_stream(track_id, soon, url_expiry(soon))
+
+    refreshed = threading.Event()
+    fresh = _yt_url(time.time() + 21600, 2)
+
+    def resolve():
+        refreshed.set()
+        return fresh
+
+    assert cache.get_track(track_id, resolve) == soon  # served immediately
+    assert refreshed.wait(2)
+    deadline = time.monotonic() + 2
+    while database.get_cached_stream(track_id) != fresh and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert database.get_cached_stream(track_id) == fresh
+    assert cache.get_track(track_id, lambda: pytest.fail("should be cached")) == fresh
+
+
+def test_freshness_follows_refresh_ahead(temp_db):
+    cache = StreamUrlCache(refresh_ahead=3600, margin=60)
+    _, (near, far, missing) = database.insert_set_with_tracks(
+        {"name": "Set"}, [{"position": i, "artist": "A", "title": f"Song {i}"} for i in range(3)]
+    )
+    soon, later = _yt_url(time.time() + 1200, 1), _yt_url(time.time() + 21600, 2)
+    database.save_cached_stream(near, soon, url_expiry(soon))
+    database.save_cached_stream(far, later, url_expiry(later))
+
+    # Still served, but due for a refresh: the prefetcher must not skip it
+    assert database.get_cached_stream(near) == soon
+    assert not cache.track_is_fresh(near)
+    assert cache.track_is_fresh(far)
+    assert not cache.track_is_fresh(missing)
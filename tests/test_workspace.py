@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+from tracklistify.utils.workspace import (
+    OWNER_FILE,
+    Workspace,
+    active_workspaces,
+    sweep_stale_workspaces,
+    workspace_usage,
+)
+
+
+def test_workspaces_are_private_and_tracked(tmp_path):
+    first, second = Workspace(tmp_path), Workspace(tmp_path)
+    (first.subdir("segments") / "segment_0_30.mp3").write_bytes(b"a" * 4000)
+    (second.subdir("segments") / "segment_0_30.mp3").write_bytes(b"b" * 1000)
+
+    assert first.path != second.path
+    assert first.disk_usage() >= 4000
+    assert {w["path"] for w in active_workspaces()} >= {str(first.path), str(second.path)}
+    assert workspace_usage(tmp_path)["workspaces"] == 2
+
+    freed = first.cleanup()
+
+    assert freed >= 4000
+    assert first.peak_bytes >= 4000
+    assert workspace_usage(tmp_path)["workspaces"] == 1
+    assert (second.path / "segments" / "segment_0_30.mp3").read_bytes() == b"b" * 1000
+    second.cleanup()
+
+
+def test_context_manager_reclaims_space(tmp_path):
+    with Workspace(tmp_path) as workspace:
+        path = workspace.path
+        (path / "download.mp3").write_bytes(b"x" * 100)
+    assert not path.exists()
+
+
+def test_sweep_removes_workspaces_of_dead_processes(tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    orphan = tmp_path / "workspaces" / "run-orphan"
+    orphan.mkdir(parents=True)
+    (orphan / OWNER_FILE).write_text(str(dead.pid))
+    alive = tmp_path / "workspaces" / "run-alive"
+    alive.mkdir()
+    (alive / OWNER_FILE).write_text(str(os.getppid()))
+
+    assert sweep_stale_workspaces(tmp_path) == 1
+    assert not orphan.exists()
+    assert alive.exists()
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from services import ytdlp_pool
+
+
+class FakeYDL:
+    created = []
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, opts):
+        self.opts = opts
+        FakeYDL.created.append(self)
+
+    def extract_info(self, target, download=False):
+        with FakeYDL.lock:
+            FakeYDL.running += 1
+            FakeYDL.max_running = max(FakeYDL.max_running, FakeYDL.running)
+        try:
+            if target.startswith("slow:"):
+                time.sleep(0.5)
+            if target == "missing":
+                raise RuntimeError("no results")
+            return {"entries": [{"url": f"https://stream/{target}", "id": target}]}
+        finally:
+            with FakeYDL.lock:
+                FakeYDL.running -= 1
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeYDL.created, FakeYDL.running, FakeYDL.max_running = [], 0, 0
+    monkeypatch.setattr(ytdlp_pool.yt_dlp, "YoutubeDL", FakeYDL)
+    return ytdlp_pool.YDLPool(size=2)
+
+
+def test_instances_are_reused_per_profile(pool):
+    for i in range(5):
+        assert pool.stream_url(f"ytsearch1:q{i}") == f"https://stream/ytsearch1:q{i}"
+    pool.extract("scsearch1:dj", "flat")
+
+    assert len(FakeYDL.created) == 2
+    assert FakeYDL.created[0].opts["format"] == "bestaudio"
+    assert FakeYDL.created[1].opts["extract_flat"] is True
+    assert pool.stats["reused"] == 4
+
+
+def test_concurrency_is_bounded(pool):
+    threads = [threading.Thread(target=pool.stream_url, args=(f"slow:{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert FakeYDL.max_running == 2
+    assert len(FakeYDL.created) <= 2
+
+
+def test_timeouts_and_errors(pool):
+    with pytest.raises(ytdlp_pool.ExtractorTimeout):
+        pool.extract("slow:x", "stream", timeout=0.1)
+    assert pool.stream_url("missing") is None
+    assert pool.stats["timeouts"] == 1 and pool.stats["errors"] == 1
+
+    cancel = threading.Event()
+    cancel.set()
+    assert pool.stream_url("slow:y", cancel_event=cancel) is None
+
+
+def test_timeout_does_not_count_queue_wait(monkeypatch):
+    FakeYDL.created, FakeYDL.running, FakeYDL.max_running = [], 0, 0
+    monkeypatch.setattr(ytdlp_pool.yt_dlp, "YoutubeDL", FakeYDL)
+    pool = ytdlp_pool.YDLPool(size=1)
+
+    blocker = threading.Thread(target=pool.stream_url, args=("slow:a",))
+    blocker.start()
+    time.sleep(0.05)
+    # Queued behind the slow lookup for longer than its own timeout
+    assert pool.stream_url("ytsearch1:quick", timeout=0.3) == "https://stream/ytsearch1:quick"
+    blocker.join()
+    assert pool.stats["timeouts"] == 0
+
+
+def test_raced_calls_cannot_take_the_whole_pool(monkeypatch):
+    FakeYDL.created, FakeYDL.running, FakeYDL.max_running = [], 0, 0
+    monkeypatch.setattr(ytdlp_pool.yt_dlp, "YoutubeDL", FakeYDL)
+    pool = ytdlp_pool.YDLPool(size=3, race_slots=2)
+    cancel = threading.Event()
+
+    # A lost race: four searches, all abandoned while still extracting
+    racers = [threading.Thread(target=pool.stream_url, args=(f"slow:{i}",),
+                               kwargs={"cancel_event": cancel, "race": True}) for i in range(4)]
+    for t in racers:
+        t.start()
+    time.sleep(0.05)
+    cancel.set()
+    for t in racers:
+        t.join()
+
+    assert pool.racing == 2 and not pool.race_headroom(1)
+    start = time.monotonic()
+    assert pool.stream_url("https://youtu.be/x", timeout=0.3) == "https://stream/https://youtu.be/x"
+    assert time.monotonic() - start < 0.3
+
+    time.sleep(0.6)
+    assert pool.racing == 0 and pool.race_headroom(2)